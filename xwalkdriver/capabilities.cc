@@ -84,6 +84,26 @@ Status ParseLogPath(const base::Value& option, Capabilities* capabilities) {
   return Status(kOk);
 }
 
+Status ParseLogBufferSize(const base::Value& option,
+                          Capabilities* capabilities) {
+  const base::DictionaryValue* buffer_size = NULL;
+  if (!option.GetAsDictionary(&buffer_size))
+    return Status(kUnknownError, "must be a dictionary");
+  if (buffer_size->HasKey("entries")) {
+    int entries;
+    if (!buffer_size->GetInteger("entries", &entries) || entries < 0)
+      return Status(kUnknownError, "'entries' must be a non-negative integer");
+    capabilities->log_buffer_entries = entries;
+  }
+  if (buffer_size->HasKey("bytes")) {
+    int bytes;
+    if (!buffer_size->GetInteger("bytes", &bytes) || bytes < 0)
+      return Status(kUnknownError, "'bytes' must be a non-negative integer");
+    capabilities->log_buffer_bytes = bytes;
+  }
+  return Status(kOk);
+}
+
 Status ParseDeviceBridgePort(const base::Value& option,
                              Capabilities* capabilities) {
   if (!option.GetAsInteger(&capabilities->device_bridge_port))
@@ -267,6 +287,7 @@ Status ParseXwalkOptions(
   parser_map["args"] = base::Bind(&IgnoreCapability);
   parser_map["binary"] = base::Bind(&IgnoreCapability);
   parser_map["extensions"] = base::Bind(&IgnoreCapability);
+  parser_map["logBufferSize"] = base::Bind(&ParseLogBufferSize);
   if (is_android) {
     capabilities->device_bridge_port = 5037;
     parser_map["androidActivity"] =
@@ -429,7 +450,9 @@ std::string Switches::ToString() const {
 
 Capabilities::Capabilities()
     : detach(false),
-      force_devtools_screenshot(false) {}
+      force_devtools_screenshot(false),
+      log_buffer_entries(WebDriverLog::kDefaultMaxEntries),
+      log_buffer_bytes(WebDriverLog::kDefaultMaxBytes) {}
 
 Capabilities::~Capabilities() {}
 
@@ -114,6 +114,10 @@ struct Capabilities {
 
   LoggingPrefs logging_prefs;
 
+  // Limits of the entries buffered by each log, 0 meaning no limit.
+  size_t log_buffer_entries;
+  size_t log_buffer_bytes;
+
   // If set, enable minidump for xwalk crashes and save to this directory.
   std::string minidump_path;
 
@@ -5,6 +5,7 @@
 #include "base/values.h"
 #include "testing/gtest/include/gtest/gtest.h"
 #include "xwalk/test/xwalkdriver/capabilities.h"
+#include "xwalk/test/xwalkdriver/logging.h"
 #include "xwalk/test/xwalkdriver/xwalk/log.h"
 #include "xwalk/test/xwalkdriver/xwalk/status.h"
 
@@ -335,6 +336,26 @@ TEST(ParseCapabilities, LoggingPrefsNotDict) {
   ASSERT_FALSE(status.IsOk());
 }
 
+TEST(ParseCapabilities, LogBufferSize) {
+  Capabilities capabilities;
+  ASSERT_EQ(WebDriverLog::kDefaultMaxEntries, capabilities.log_buffer_entries);
+  base::DictionaryValue caps;
+  caps.SetInteger("xwalkOptions.logBufferSize.entries", 10);
+  caps.SetInteger("xwalkOptions.logBufferSize.bytes", 0);
+  Status status = capabilities.Parse(caps);
+  ASSERT_TRUE(status.IsOk());
+  ASSERT_EQ(10u, capabilities.log_buffer_entries);
+  ASSERT_EQ(0u, capabilities.log_buffer_bytes);
+}
+
+TEST(ParseCapabilities, LogBufferSizeNegative) {
+  Capabilities capabilities;
+  base::DictionaryValue caps;
+  caps.SetInteger("xwalkOptions.logBufferSize.entries", -1);
+  Status status = capabilities.Parse(caps);
+  ASSERT_FALSE(status.IsOk());
+}
+
 TEST(ParseCapabilities, ExcludeSwitches) {
   Capabilities capabilities;
   base::ListValue exclude_switches;
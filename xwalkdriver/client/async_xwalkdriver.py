@@ -0,0 +1,372 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Asyncio counterparts of XwalkDriver and WebElement.
+
+Commands are sent over non-blocking keep-alive connections, so a single event
+loop can drive many sessions concurrently. Requires Python 3.5 or later.
+"""
+
+import asyncio
+
+import json_codec
+from command_executor import _BuildRequest, _Method, Command
+from xwalkdriver import _ExceptionForResponse, _NewSessionParams
+
+
+class _AsyncConnectionPool(object):
+  """A bounded pool of keep-alive stream connections to one server."""
+
+  def __init__(self, host, port, max_size, timeout):
+    self._host = host
+    self._port = port
+    self._timeout = timeout
+    self._idle = []
+    self._semaphore = asyncio.Semaphore(max_size)
+
+  async def _Open(self):
+    return await asyncio.wait_for(
+        asyncio.open_connection(self._host, self._port), self._timeout)
+
+  async def _SendAndReceive(self, reader, writer, method, path, body):
+    """Sends one request and reads its response.
+
+    Returns:
+      A (status, reason, headers, data) tuple, or None if the server closed
+      the connection before responding.
+    """
+    data = body.encode('utf-8') if body is not None else b''
+    head = ['%s %s HTTP/1.1' % (method, path),
+            'Host: %s:%d' % (self._host, self._port),
+            'Connection: keep-alive',
+            'Content-Length: %d' % len(data)]
+    if body is not None:
+      head.append('Content-Type: application/json;charset=UTF-8')
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('ascii') + data)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+      return None
+    _, status, reason = status_line.decode('latin-1').rstrip(
+        '\r\n').split(' ', 2)
+    headers = {}
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+      name, value = line.decode('latin-1').split(':', 1)
+      headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+      data = await self._ReadChunkedBody(reader)
+    elif 'content-length' in headers:
+      data = await reader.readexactly(int(headers['content-length']))
+    else:
+      data = await reader.read()
+    return int(status), reason, headers, data
+
+  async def _ReadChunkedBody(self, reader):
+    """Reads a body sent with chunked transfer coding, up to its last chunk."""
+    chunks = []
+    while True:
+      size_line = await reader.readline()
+      if not size_line:
+        raise asyncio.IncompleteReadError(b''.join(chunks), None)
+      size = int(size_line.split(b';', 1)[0].strip(), 16)
+      if size == 0:
+        break
+      chunks.append(await reader.readexactly(size))
+      await reader.readexactly(2)  # The CRLF after the chunk data.
+    # Skip the trailer, which ends with an empty line.
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+    return b''.join(chunks)
+
+  async def Request(self, method, path, body):
+    """Sends a request and returns a (status, reason, location, data) tuple.
+
+    Idempotent GET requests sent on a reused connection that the server has
+    dropped are retried on the next idle connection, and so on until one
+    succeeds or a new connection is opened, whose errors are raised.
+    """
+    async with self._semaphore:
+      while True:
+        reused = bool(self._idle)
+        if reused:
+          reader, writer = self._idle.pop()
+        else:
+          reader, writer = await self._Open()
+        try:
+          result = await asyncio.wait_for(
+              self._SendAndReceive(reader, writer, method, path, body),
+              self._timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+          writer.close()
+          if reused and method == _Method.GET:
+            continue
+          raise
+        except:
+          writer.close()
+          raise
+        if result is None:
+          writer.close()
+          if reused and method == _Method.GET:
+            continue
+          raise ConnectionError('Server closed the connection')
+        status, reason, headers, data = result
+        if headers.get('connection', '').lower() == 'close':
+          writer.close()
+        else:
+          self._idle.append((reader, writer))
+        return status, reason, headers.get('location'), data
+
+  def Close(self):
+    """Closes all idle connections."""
+    for _, writer in self._idle:
+      writer.close()
+    self._idle = []
+
+
+class AsyncCommandExecutor(object):
+  """Executes commands against a XwalkDriver server without blocking."""
+
+  def __init__(self, server_url, max_connections=8, timeout=30, codec=None):
+    self._server_url = server_url
+    self._codec = codec or json_codec.GetDefaultCodec()
+    port = int(server_url.split(':')[2].split('/')[0])
+    self._pool = _AsyncConnectionPool(
+        '127.0.0.1', port, max_connections, timeout)
+
+  async def Execute(self, command, params, default=None, object_hook=None):
+    """Executes a command and returns the decoded response.
+
+    |default| and |object_hook| are as for CommandExecutor.Execute.
+    """
+    status, reason, location, data = await self._pool.Request(
+        *_BuildRequest(command, params, self._codec, default))
+
+    if status == 303:
+      status, reason, _, data = await self._pool.Request(
+          _Method.GET, location, None)
+    if status != 200:
+      raise RuntimeError('Server returned error: ' + reason)
+
+    return self._codec.Decode(data.decode('utf-8'), object_hook)
+
+  def Close(self):
+    self._pool.Close()
+
+
+class AsyncWebElement(object):
+  """Represents an HTML element in an AsyncXwalkDriver session."""
+  def __init__(self, xwalkdriver, id_):
+    self._xwalkdriver = xwalkdriver
+    self._id = id_
+
+  async def _Execute(self, command, params=None):
+    if params is None:
+      params = {}
+    params['id'] = self._id
+    return await self._xwalkdriver.ExecuteCommand(command, params)
+
+  async def FindElement(self, strategy, target):
+    return await self._Execute(
+        Command.FIND_CHILD_ELEMENT, {'using': strategy, 'value': target})
+
+  async def FindElements(self, strategy, target):
+    return await self._Execute(
+        Command.FIND_CHILD_ELEMENTS, {'using': strategy, 'value': target})
+
+  async def GetText(self):
+    return await self._Execute(Command.GET_ELEMENT_TEXT)
+
+  async def HoverOver(self):
+    await self._Execute(Command.HOVER_OVER_ELEMENT)
+
+  async def Click(self):
+    await self._Execute(Command.CLICK_ELEMENT)
+
+  async def SingleTap(self):
+    await self._Execute(Command.TOUCH_SINGLE_TAP)
+
+  async def Clear(self):
+    await self._Execute(Command.CLEAR_ELEMENT)
+
+  async def SendKeys(self, *values):
+    typing = []
+    for value in values:
+      if isinstance(value, int):
+        value = str(value)
+      typing.extend(value)
+    await self._Execute(Command.SEND_KEYS_TO_ELEMENT, {'value': typing})
+
+  async def GetLocation(self):
+    return await self._Execute(Command.GET_ELEMENT_LOCATION)
+
+
+class AsyncXwalkDriver(object):
+  """Controls a single Xwalk session from an asyncio event loop.
+
+  Use Create() instead of the constructor, since starting the session
+  requires a round trip to the server:
+
+    driver = await AsyncXwalkDriver.Create(server_url)
+    await driver.Load('http://www.google.com')
+    await driver.Quit()
+  """
+
+  def __init__(self, executor, session_id, owns_executor=False):
+    self._executor = executor
+    self._session_id = session_id
+    # Whether Quit closes the executor, which is not shared with others.
+    self._owns_executor = owns_executor
+
+  @classmethod
+  async def Create(cls, server_url, executor=None, **kwargs):
+    """Starts a new session.
+
+    Args:
+      server_url: URL of the XwalkDriver server.
+      executor: an AsyncCommandExecutor to share with other sessions, or None
+                to create a new one, which is closed by Quit.
+      kwargs: Xwalk options, as accepted by XwalkDriver.
+    """
+    owns_executor = executor is None
+    if owns_executor:
+      executor = AsyncCommandExecutor(server_url)
+    driver = cls(executor, None, owns_executor)
+    try:
+      response = await driver._ExecuteCommand(
+          Command.NEW_SESSION, _NewSessionParams(**kwargs))
+    except:
+      if owns_executor:
+        executor.Close()
+      raise
+    driver._session_id = response['sessionId']
+    return driver
+
+  def _EncodeObject(self, value):
+    """Encodes objects from client side for xwalkdriver side."""
+    if isinstance(value, AsyncWebElement):
+      return {'ELEMENT': value._id}
+    raise TypeError('%r is not JSON serializable' % value)
+
+  def _DecodeObject(self, value):
+    """Decodes objects from xwalkdriver side for client side."""
+    if (len(value) == 1 and 'ELEMENT' in value
+        and isinstance(value['ELEMENT'], str)):
+      return AsyncWebElement(self, value['ELEMENT'])
+    return value
+
+  async def _ExecuteCommand(self, command, params={}):
+    response = await self._executor.Execute(
+        command, params, self._EncodeObject, self._DecodeObject)
+    if response['status'] != 0:
+      raise _ExceptionForResponse(response)
+    return response
+
+  async def ExecuteCommand(self, command, params={}):
+    params = dict(params, sessionId=self._session_id)
+    response = await self._ExecuteCommand(command, params)
+    return response['value']
+
+  async def GetWindowHandles(self):
+    return await self.ExecuteCommand(Command.GET_WINDOW_HANDLES)
+
+  async def SwitchToWindow(self, handle_or_name):
+    await self.ExecuteCommand(
+        Command.SWITCH_TO_WINDOW, {'name': handle_or_name})
+
+  async def GetCurrentWindowHandle(self):
+    return await self.ExecuteCommand(Command.GET_CURRENT_WINDOW_HANDLE)
+
+  async def CloseWindow(self):
+    await self.ExecuteCommand(Command.CLOSE)
+
+  async def Load(self, url):
+    await self.ExecuteCommand(Command.GET, {'url': url})
+
+  async def ExecuteScript(self, script, *args):
+    return await self.ExecuteCommand(
+        Command.EXECUTE_SCRIPT, {'script': script, 'args': list(args)})
+
+  async def ExecuteAsyncScript(self, script, *args):
+    return await self.ExecuteCommand(
+        Command.EXECUTE_ASYNC_SCRIPT, {'script': script, 'args': list(args)})
+
+  async def SwitchToFrame(self, id_or_name):
+    await self.ExecuteCommand(Command.SWITCH_TO_FRAME, {'id': id_or_name})
+
+  async def SwitchToFrameByIndex(self, index):
+    await self.SwitchToFrame(index)
+
+  async def SwitchToMainFrame(self):
+    await self.SwitchToFrame(None)
+
+  async def GetTitle(self):
+    return await self.ExecuteCommand(Command.GET_TITLE)
+
+  async def GetPageSource(self):
+    return await self.ExecuteCommand(Command.GET_PAGE_SOURCE)
+
+  async def FindElement(self, strategy, target):
+    return await self.ExecuteCommand(
+        Command.FIND_ELEMENT, {'using': strategy, 'value': target})
+
+  async def FindElements(self, strategy, target):
+    return await self.ExecuteCommand(
+        Command.FIND_ELEMENTS, {'using': strategy, 'value': target})
+
+  async def SetTimeout(self, type, timeout):
+    return await self.ExecuteCommand(
+        Command.SET_TIMEOUT, {'type' : type, 'ms': timeout})
+
+  async def GetCurrentUrl(self):
+    return await self.ExecuteCommand(Command.GET_CURRENT_URL)
+
+  async def GoBack(self):
+    return await self.ExecuteCommand(Command.GO_BACK)
+
+  async def GoForward(self):
+    return await self.ExecuteCommand(Command.GO_FORWARD)
+
+  async def Refresh(self):
+    return await self.ExecuteCommand(Command.REFRESH)
+
+  async def GetCookies(self):
+    return await self.ExecuteCommand(Command.GET_COOKIES)
+
+  async def AddCookie(self, cookie):
+    await self.ExecuteCommand(Command.ADD_COOKIE, {'cookie': cookie})
+
+  async def DeleteCookie(self, name):
+    await self.ExecuteCommand(Command.DELETE_COOKIE, {'name': name})
+
+  async def DeleteAllCookies(self):
+    await self.ExecuteCommand(Command.DELETE_ALL_COOKIES)
+
+  async def IsAlertOpen(self):
+    return await self.ExecuteCommand(Command.GET_ALERT)
+
+  async def IsLoading(self):
+    return await self.ExecuteCommand(Command.IS_LOADING)
+
+  async def Quit(self):
+    """Quits the browser and ends the session.
+
+    Also closes the connections of the executor if Create made it.
+    """
+    try:
+      await self.ExecuteCommand(Command.QUIT)
+    finally:
+      if self._owns_executor:
+        self._executor.Close()
+
+  async def GetLog(self, type):
+    return await self.ExecuteCommand(Command.GET_LOG, {'type': type})
+
+  async def GetAvailableLogTypes(self):
+    return await self.ExecuteCommand(Command.GET_AVAILABLE_LOG_TYPES)
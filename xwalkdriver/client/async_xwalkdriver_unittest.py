@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tests for async_xwalkdriver.py. Requires Python 3.5 or later."""
+
+import asyncio
+import json
+import unittest
+
+import async_xwalkdriver
+from command_executor import Command
+
+# Responses larger than this are chunked by server/xwalkdriver_server.cc.
+_CHUNKED_RESPONSE_THRESHOLD = 256 * 1024
+_RESPONSE_CHUNK_SIZE = 64 * 1024
+
+
+class _FakeServer(object):
+  """Answers every request with a script result, keeping connections alive.
+
+  Responses over the threshold are sent with chunked transfer encoding, as
+  server/xwalkdriver_server.cc sends them.
+  """
+
+  def __init__(self, result_size):
+    self._result_size = result_size
+    self._server = None
+    self._handlers = []
+    self.connections = 0
+
+  async def Start(self):
+    self._server = await asyncio.start_server(
+        self._HandleConnection, '127.0.0.1', 0)
+    return 'http://127.0.0.1:%d' % self._server.sockets[0].getsockname()[1]
+
+  async def Stop(self):
+    """Stops listening and waits for the closed connections to be handled."""
+    self._server.close()
+    await self._server.wait_closed()
+    await asyncio.gather(*self._handlers)
+
+  async def _HandleConnection(self, reader, writer):
+    self.connections += 1
+    done = asyncio.Future()
+    self._handlers.append(done)
+    try:
+      while True:
+        length = None
+        line = await reader.readline()
+        if not line:
+          return
+        while line not in (b'\r\n', b''):
+          name, _, value = line.decode('latin-1').partition(':')
+          if name.lower() == 'content-length':
+            length = int(value)
+          line = await reader.readline()
+        await reader.readexactly(length or 0)
+        self._WriteResponse(writer)
+        await writer.drain()
+    finally:
+      writer.close()
+      done.set_result(None)
+
+  def _WriteResponse(self, writer):
+    body = json.dumps({'status': 0, 'sessionId': 'id',
+                       'value': 'x' * self._result_size}).encode('utf-8')
+    head = ('HTTP/1.1 200 OK\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            'Connection: keep-alive\r\n')
+    if len(body) <= _CHUNKED_RESPONSE_THRESHOLD:
+      writer.write(('%sContent-Length: %d\r\n\r\n' % (
+          head, len(body))).encode('ascii') + body)
+      return
+    writer.write(('%sTransfer-Encoding: chunked\r\n\r\n' % head).encode(
+        'ascii'))
+    for offset in range(0, len(body), _RESPONSE_CHUNK_SIZE):
+      chunk = body[offset:offset + _RESPONSE_CHUNK_SIZE]
+      writer.write(('%X\r\n' % len(chunk)).encode('ascii') + chunk + b'\r\n')
+    writer.write(b'0\r\n\r\n')
+
+
+class AsyncCommandExecutorTest(unittest.TestCase):
+
+  def _Run(self, result_size, commands):
+    """Executes |commands| script commands and returns their results."""
+
+    async def Run():
+      server = _FakeServer(result_size)
+      executor = async_xwalkdriver.AsyncCommandExecutor(
+          await server.Start(), timeout=10)
+      try:
+        results = []
+        for _ in range(commands):
+          response = await executor.Execute(
+              Command.EXECUTE_SCRIPT,
+              {'sessionId': 'id', 'script': 'return 1', 'args': []})
+          results.append(response['value'])
+        return results, server.connections
+      finally:
+        executor.Close()
+        await server.Stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+      return loop.run_until_complete(Run())
+    finally:
+      loop.close()
+
+  def testContentLengthResponse(self):
+    results, connections = self._Run(1024, 2)
+    self.assertEqual(['x' * 1024] * 2, results)
+    self.assertEqual(1, connections)
+
+  def testChunkedResponseOverThreshold(self):
+    size = _CHUNKED_RESPONSE_THRESHOLD + 12345
+    results, connections = self._Run(size, 3)
+    self.assertEqual(['x' * size] * 3, results)
+    # The connection is kept alive across chunked responses.
+    self.assertEqual(1, connections)
+
+
+class AsyncXwalkDriverTest(unittest.TestCase):
+
+  def _QuitAndGetIdleConnections(self, share_executor):
+    """Starts and quits a session, returning the executor's idle sockets."""
+
+    async def Run():
+      server = _FakeServer(0)
+      url = await server.Start()
+      executor = None
+      if share_executor:
+        executor = async_xwalkdriver.AsyncCommandExecutor(url)
+      try:
+        driver = await async_xwalkdriver.AsyncXwalkDriver.Create(
+            url, executor=executor)
+        await driver.Quit()
+        return len(driver._executor._pool._idle)
+      finally:
+        if executor:
+          executor.Close()
+        await server.Stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+      return loop.run_until_complete(Run())
+    finally:
+      loop.close()
+
+  def testQuitClosesOwnExecutor(self):
+    self.assertEqual(0, self._QuitAndGetIdleConnections(False))
+
+  def testQuitKeepsSharedExecutorOpen(self):
+    self.assertEqual(1, self._QuitAndGetIdleConnections(True))
+
+
+if __name__ == '__main__':
+  unittest.main()
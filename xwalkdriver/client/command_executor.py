@@ -2,8 +2,21 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
-import httplib
-import json
+try:
+  import httplib
+except ImportError:
+  # Python 3, used by async_xwalkdriver.
+  import http.client as httplib
+import socket
+import threading
+import time
+
+import json_codec
+import response_stream
+
+
+# time.monotonic isn't available on Python 2.
+_Now = getattr(time, 'monotonic', time.time)
 
 
 class _Method(object):
@@ -67,6 +80,8 @@ class Command(object):
   GET_COOKIES = (_Method.GET, '/session/:sessionId/cookie')
   ADD_COOKIE = (_Method.POST, '/session/:sessionId/cookie')
   DELETE_ALL_COOKIES = (_Method.DELETE, '/session/:sessionId/cookie')
+  DELETE_ALL_BROWSER_COOKIES = (
+      _Method.DELETE, '/session/:sessionId/browser_cookies')
   DELETE_COOKIE = (_Method.DELETE, '/session/:sessionId/cookie/:name')
   SWITCH_TO_FRAME = (_Method.POST, '/session/:sessionId/frame')
   SWITCH_TO_PARENT_FRAME = (_Method.POST, '/session/:sessionId/frame/parent')
@@ -132,6 +147,7 @@ class Command(object):
   TOUCH_DOUBLE_TAP = (_Method.POST, '/session/:sessionId/touch/doubleclick')
   TOUCH_LONG_PRESS = (_Method.POST, '/session/:sessionId/touch/longclick')
   TOUCH_FLICK = (_Method.POST, '/session/:sessionId/touch/flick')
+  PERFORM_ACTIONS = (_Method.POST, '/session/:sessionId/actions')
   GET_LOG = (_Method.POST, '/session/:sessionId/log')
   GET_AVAILABLE_LOG_TYPES = (_Method.GET, '/session/:sessionId/log/types')
   GET_SESSION_LOGS = (_Method.POST, '/logs')
@@ -139,35 +155,310 @@ class Command(object):
 
   # Custom Xwalk commands.
   IS_LOADING = (_Method.GET, '/session/:sessionId/is_loading')
+  BATCH = (_Method.POST, '/session/:sessionId/batch')
+  REGISTER_SCRIPT = (_Method.POST, '/session/:sessionId/script/register')
+  EXECUTE_REGISTERED_SCRIPT = (
+      _Method.POST, '/session/:sessionId/script/:handle/execute')
+  GET_ELEMENTS_SNAPSHOT = (
+      _Method.POST, '/session/:sessionId/elements/snapshot')
+  WAIT_FOR_ELEMENT = (_Method.POST, '/session/:sessionId/wait/element')
+  WAIT_FOR_CONDITION = (_Method.POST, '/session/:sessionId/wait/condition')
+  WAIT_FOR_NOT_LOADING = (_Method.POST, '/session/:sessionId/wait/not_loading')
+  TAKE_HEAP_SNAPSHOT = (
+      _Method.GET, '/session/:sessionId/chromium/heap_snapshot')
+  TAKE_HEAP_SNAPSHOT_TO_FILE = (
+      _Method.POST, '/session/:sessionId/chromium/heap_snapshot_file')
+  READ_HEAP_SNAPSHOT_FILE = (
+      _Method.POST, '/session/:sessionId/chromium/heap_snapshot_file/:id/read')
+  DELETE_HEAP_SNAPSHOT_FILE = (
+      _Method.DELETE, '/session/:sessionId/chromium/heap_snapshot_file/:id')
+
+
+def _SubstituteUrl(command, params):
+  """Returns the path of a command, with placeholders substituted.
+
+  The substituted values are removed from |params|.
+  """
+  url_parts = command[1].split('/')
+  substituted_parts = []
+  for part in url_parts:
+    if part.startswith(':'):
+      key = part[1:]
+      substituted_parts += [params[key]]
+      del params[key]
+    else:
+      substituted_parts += [part]
+  return '/'.join(substituted_parts)
+
+
+def _BuildRequest(command, params, codec, default=None):
+  """Builds the HTTP request for a command.
+
+  Args:
+    command: the command to execute.
+    params: the command parameters.
+    codec: the JsonCodec to encode the body with.
+    default: called to encode objects JSON can't represent, or None.
+
+  Returns:
+    A (method, path, body) tuple.
+  """
+  path = _SubstituteUrl(command, params)
+  body = None
+  if command[0] == _Method.POST:
+    body = codec.Encode(params, default)
+  return command[0], path, body
+
+
+class _ConnectionPool(object):
+  """A bounded, thread-safe pool of keep-alive connections to one server."""
+
+  def __init__(self, host, port, max_size, idle_timeout, timeout):
+    self._host = host
+    self._port = port
+    self._max_size = max_size
+    self._idle_timeout = idle_timeout
+    self._timeout = timeout
+    # Idle connections as (connection, last_used) pairs, most recent last.
+    self._idle = []
+    self._checked_out = 0
+    self._closed = False
+    self._cond = threading.Condition()
+
+  def _EvictIdle(self, now):
+    """Closes connections unused for longer than the idle timeout.
+
+    Must be called with |_cond| held.
+    """
+    while self._idle and now - self._idle[0][1] > self._idle_timeout:
+      self._idle.pop(0)[0].close()
+
+  def Acquire(self):
+    """Checks out a connection, blocking while the pool is exhausted.
+
+    Returns:
+      A (connection, reused) tuple, where |reused| tells whether the
+      connection has served a previous request.
+    """
+    with self._cond:
+      while True:
+        self._EvictIdle(time.time())
+        if self._idle:
+          self._checked_out += 1
+          return self._idle.pop()[0], True
+        if self._checked_out < self._max_size:
+          self._checked_out += 1
+          break
+        self._cond.wait()
+    return httplib.HTTPConnection(
+        self._host, self._port, timeout=self._timeout), False
+
+  def Release(self, connection, reusable=True):
+    """Returns a checked out connection to the pool.
+
+    Args:
+      connection: the connection returned by Acquire.
+      reusable: False if the connection is in an unknown state and must be
+                closed instead of kept alive.
+    """
+    with self._cond:
+      self._checked_out -= 1
+      keep = reusable and not self._closed
+      if keep:
+        self._idle.append((connection, time.time()))
+      self._cond.notify()
+    if not keep:
+      connection.close()
+
+  def Close(self):
+    """Closes all idle connections.
+
+    Connections still checked out are closed when they are released.
+    """
+    with self._cond:
+      self._closed = True
+      for connection, _ in self._idle:
+        connection.close()
+      self._idle = []
+
+
+class _CountingReader(object):
+  """Wraps a response, counting the bytes read from it."""
+
+  def __init__(self, response):
+    self._response = response
+    self.count = 0
+
+  def read(self, *args):
+    data = self._response.read(*args)
+    self.count += len(data)
+    return data
 
 
 class CommandExecutor(object):
-  def __init__(self, server_url):
+  """Executes commands against a XwalkDriver server.
+
+  Every executor keeps its own pool of keep-alive connections, so its
+  |max_connections| limit isn't shared with other executors of the same
+  server. An executor may safely be used from several threads.
+  """
+
+  # Errors raised when a pooled connection was closed by the server.
+  _STALE_CONNECTION_ERRORS = (httplib.BadStatusLine, httplib.CannotSendRequest,
+                              socket.error)
+
+  def __init__(self, server_url, max_connections=8, idle_timeout=30,
+               codec=None, metrics=None, recorder=None):
+    """Initializes the executor.
+
+    Args:
+      server_url: the URL of the server, such as http://127.0.0.1:9515.
+      max_connections: the most connections to keep open to the server.
+      idle_timeout: seconds after which idle connections are closed.
+      codec: the JsonCodec to use, or None for the default one.
+      metrics: a command_metrics.MetricsRegistry to record the timings of
+               every command in, or None.
+      recorder: a traffic_recorder.TrafficRecorder to record every command
+                in, or None.
+    """
     self._server_url = server_url
+    self._codec = codec or json_codec.GetDefaultCodec()
+    self._metrics = metrics
+    self._recorder = recorder
     port = int(server_url.split(':')[2].split('/')[0])
-    self._http_client = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
-
-  def Execute(self, command, params):
-    url_parts = command[1].split('/')
-    substituted_parts = []
-    for part in url_parts:
-      if part.startswith(':'):
-        key = part[1:]
-        substituted_parts += [params[key]]
-        del params[key]
-      else:
-        substituted_parts += [part]
-
-    body = None
-    if command[0] == _Method.POST:
-      body = json.dumps(params)
-    self._http_client.request(command[0], '/'.join(substituted_parts), body)
-    response = self._http_client.getresponse()
+    self._pool = _ConnectionPool(
+        '127.0.0.1', port, max_connections, idle_timeout, 30)
+
+  def Close(self):
+    """Closes the connections kept alive to the server."""
+    self._pool.Close()
+
+  def _Open(self, method, path, body):
+    """Sends a request on a pooled connection, without reading the body.
+
+    Idempotent GET requests sent on a reused connection that the server has
+    dropped are retried on the next idle connection, and so on until one
+    succeeds or a new connection is opened, whose errors are raised.
 
+    Returns:
+      A (connection, response) tuple. The connection must be released once
+      the response has been read.
+    """
+    headers = {'Connection': 'keep-alive'}
+    while True:
+      connection, reused = self._pool.Acquire()
+      try:
+        connection.request(method, path, body, headers)
+        return connection, connection.getresponse()
+      except self._STALE_CONNECTION_ERRORS:
+        self._pool.Release(connection, reusable=False)
+        if reused and method == _Method.GET:
+          continue
+        raise
+      except:
+        self._pool.Release(connection, reusable=False)
+        raise
+
+  def _Request(self, method, path, body):
+    """Sends a request on a pooled connection and reads the whole response.
+
+    Returns:
+      A (status, reason, location, data) tuple.
+    """
+    connection, response = self._Open(method, path, body)
+    try:
+      data = response.read()
+    except:
+      self._pool.Release(connection, reusable=False)
+      raise
+    self._pool.Release(connection, reusable=not response.will_close)
+    return (response.status, response.reason,
+            response.getheader('location'), data)
+
+  def Execute(self, command, params, default=None, object_hook=None):
+    """Executes a command and returns the decoded response.
+
+    Args:
+      command: the command to execute.
+      params: the command parameters.
+      default: called to encode objects JSON can't represent, or None.
+      object_hook: called with every decoded JSON object, and returns the
+                   value to use in its place, or None.
+    """
+    start = _Now()
+    method, path, body = _BuildRequest(command, params, self._codec, default)
+    sent = _Now()
+    sent_time = time.time()
+    status, reason, location, data = self._Request(method, path, body)
+    if status == 303:
+      status, reason, _, data = self._Request(_Method.GET, location, None)
+    if status != 200:
+      if self._recorder is not None:
+        self._recorder.Record(command, method, path, body, sent_time,
+                              _Now() - sent, status, None, None, len(data))
+      raise RuntimeError('Server returned error: ' + reason)
+
+    received = _Now()
+    response = self._codec.Decode(data, object_hook)
+    if self._metrics is not None:
+      self._metrics.Record(command, sent - start, received - sent,
+                           _Now() - received, len(body or ''), len(data))
+    if self._recorder is not None:
+      self._recorder.Record(
+          command, method, path, body, sent_time, received - sent, status,
+          response.get('status'), response.get('sessionId'), len(data), data)
+    return response
+
+  def Stream(self, command, params, default=None, object_hook=None):
+    """Executes a command and returns its response undecoded.
+
+    The connection is held until the returned StreamedResponse is closed, so
+    large values can be decoded as they arrive instead of being buffered.
+
+    Args:
+      command: the command to execute.
+      params: the command parameters.
+      default: called to encode objects JSON can't represent, or None.
+      object_hook: called with every decoded JSON object, or None.
+
+    Returns:
+      A response_stream.StreamedResponse.
+    """
+    start = _Now()
+    method, path, body = _BuildRequest(command, params, self._codec, default)
+    sent = _Now()
+    sent_time = time.time()
+    connection, response = self._Open(method, path, body)
     if response.status == 303:
-      self._http_client.request(_Method.GET, response.getheader('location'))
-      response = self._http_client.getresponse()
+      location = response.getheader('location')
+      response.read()
+      self._pool.Release(connection, reusable=not response.will_close)
+      connection, response = self._Open(_Method.GET, location, None)
     if response.status != 200:
-      raise RuntimeError('Server returned error: ' + response.reason)
+      reason = response.reason
+      data = response.read()
+      self._pool.Release(connection, reusable=not response.will_close)
+      if self._recorder is not None:
+        self._recorder.Record(command, method, path, body, sent_time,
+                              _Now() - sent, response.status, None, None,
+                              len(data))
+      raise RuntimeError('Server returned error: ' + reason)
+
+    received = _Now()
+    stream = _CountingReader(response)
 
-    return json.loads(response.read())
+    def OnClose(consumed):
+      self._pool.Release(
+          connection, reusable=consumed and not response.will_close)
+      if self._metrics is not None:
+        # Decoding a streamed response overlaps with reading it.
+        self._metrics.Record(command, sent - start, received - sent,
+                             _Now() - received, len(body or ''), stream.count)
+      if self._recorder is not None:
+        self._recorder.Record(
+            command, method, path, body, sent_time, _Now() - sent,
+            response.status, streamed.status, streamed.session_id,
+            stream.count)
+    streamed = response_stream.StreamedResponse(
+        stream, self._codec, object_hook, OnClose)
+    return streamed
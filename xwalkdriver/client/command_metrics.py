@@ -0,0 +1,185 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Per-command latency and traffic metrics for the XwalkDriver client.
+
+A CommandExecutor given a MetricsRegistry records, for every command, the
+time spent encoding the request, waiting on the server and decoding the
+response, and the number of bytes sent and received.
+"""
+
+import collections
+import json
+import threading
+
+from command_executor import Command
+
+PHASES = ('serialize', 'network', 'deserialize', 'total')
+
+CommandTiming = collections.namedtuple(
+    'CommandTiming',
+    ['command', 'serialize', 'network', 'deserialize', 'bytes_out',
+     'bytes_in'])
+
+_command_names = None
+
+
+def GetCommandName(command):
+  """Returns the name of a Command attribute, such as 'FIND_ELEMENT'."""
+  global _command_names
+  if _command_names is None:
+    _command_names = dict((value, name)
+                          for name, value in vars(Command).items()
+                          if isinstance(value, tuple))
+  return _command_names.get(command, '%s %s' % command)
+
+
+class Histogram(object):
+  """Counts durations in exponentially sized buckets.
+
+  Bucket i holds durations below 2**i microseconds, so percentiles are
+  accurate to within a factor of two.
+  """
+
+  _BUCKETS = 32
+
+  def __init__(self):
+    self.count = 0
+    self.sum = 0.0
+    self.min = None
+    self.max = None
+    self._buckets = [0] * self._BUCKETS
+
+  def Add(self, seconds):
+    self.count += 1
+    self.sum += seconds
+    if self.min is None or seconds < self.min:
+      self.min = seconds
+    if self.max is None or seconds > self.max:
+      self.max = seconds
+    micros = int(seconds * 1e6)
+    self._buckets[min(micros.bit_length(), self._BUCKETS - 1)] += 1
+
+  def Mean(self):
+    if not self.count:
+      return 0.0
+    return self.sum / self.count
+
+  def Percentile(self, percent):
+    """Returns an upper bound, in seconds, of the given percentile."""
+    if not self.count:
+      return 0.0
+    rank = self.count * percent / 100.0
+    seen = 0
+    for i, count in enumerate(self._buckets):
+      seen += count
+      if seen >= rank:
+        return min((2 ** i) / 1e6, self.max)
+    return self.max
+
+  def ToDict(self):
+    return {
+        'count': self.count,
+        'sum': self.sum,
+        'min': self.min,
+        'max': self.max,
+        'mean': self.Mean(),
+        'p50': self.Percentile(50),
+        'p90': self.Percentile(90),
+        'p99': self.Percentile(99),
+        'buckets': list(self._buckets),
+    }
+
+
+class _CommandStats(object):
+  def __init__(self):
+    self.histograms = dict((phase, Histogram()) for phase in PHASES)
+    self.bytes_out = 0
+    self.bytes_in = 0
+
+  def ToDict(self):
+    stats = dict((phase, histogram.ToDict())
+                 for phase, histogram in self.histograms.items())
+    stats['bytes_out'] = self.bytes_out
+    stats['bytes_in'] = self.bytes_in
+    return stats
+
+
+class MetricsRegistry(object):
+  """Collects command timings from any number of executors and threads."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._stats = {}
+    self._listeners = []
+
+  def AddListener(self, listener):
+    """Calls |listener| with a CommandTiming after every command.
+
+    Listeners are called on the thread that executed the command, outside of
+    the registry lock.
+    """
+    with self._lock:
+      self._listeners = self._listeners + [listener]
+
+  def RemoveListener(self, listener):
+    with self._lock:
+      self._listeners = [l for l in self._listeners if l != listener]
+
+  def Record(self, command, serialize, network, deserialize, bytes_out,
+             bytes_in):
+    """Records a command execution. Durations are in seconds."""
+    timing = CommandTiming(GetCommandName(command), serialize, network,
+                           deserialize, bytes_out, bytes_in)
+    with self._lock:
+      stats = self._stats.get(timing.command)
+      if stats is None:
+        stats = self._stats[timing.command] = _CommandStats()
+      stats.histograms['serialize'].Add(serialize)
+      stats.histograms['network'].Add(network)
+      stats.histograms['deserialize'].Add(deserialize)
+      stats.histograms['total'].Add(serialize + network + deserialize)
+      stats.bytes_out += bytes_out
+      stats.bytes_in += bytes_in
+      listeners = self._listeners
+    for listener in listeners:
+      listener(timing)
+
+  def Reset(self):
+    with self._lock:
+      self._stats = {}
+
+  def ToDict(self):
+    """Returns the stats of every command, keyed by command name."""
+    with self._lock:
+      return dict((name, stats.ToDict())
+                  for name, stats in self._stats.items())
+
+  def DumpJson(self, file_obj):
+    json.dump(self.ToDict(), file_obj, indent=2, sort_keys=True)
+
+  def FormatSummary(self):
+    """Returns a table of the commands, most total time first."""
+    rows = sorted(self.ToDict().items(),
+                  key=lambda item: item[1]['total']['sum'], reverse=True)
+    lines = ['%-28s %7s %9s %8s %8s %8s %8s %8s %8s %9s %9s' % (
+        'command', 'count', 'total(s)', 'mean(ms)', 'p90(ms)', 'p99(ms)',
+        'ser(ms)', 'net(ms)', 'dec(ms)', 'out(KiB)', 'in(KiB)')]
+    for name, stats in rows:
+      total = stats['total']
+      lines.append('%-28s %7d %9.2f %8.2f %8.2f %8.2f %8.2f %8.2f %8.2f '
+                   '%9.1f %9.1f' % (
+          name, total['count'], total['sum'], total['mean'] * 1e3,
+          total['p90'] * 1e3, total['p99'] * 1e3,
+          stats['serialize']['mean'] * 1e3, stats['network']['mean'] * 1e3,
+          stats['deserialize']['mean'] * 1e3,
+          stats['bytes_out'] / 1024.0, stats['bytes_in'] / 1024.0))
+    return '\n'.join(lines)
+
+
+_default_registry = MetricsRegistry()
+
+
+def GetDefaultRegistry():
+  return _default_registry
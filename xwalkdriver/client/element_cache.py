@@ -0,0 +1,35 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import collections
+import threading
+
+
+class ElementCache(object):
+  """A thread-safe LRU cache of element lookup results."""
+
+  def __init__(self, max_size):
+    assert max_size > 0
+    self._max_size = max_size
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+
+  def Get(self, key):
+    """Returns the cached value for |key|, or None."""
+    with self._lock:
+      value = self._entries.pop(key, None)
+      if value is not None:
+        self._entries[key] = value
+      return value
+
+  def Put(self, key, value):
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = value
+      if len(self._entries) > self._max_size:
+        self._entries.popitem(last=False)
+
+  def Clear(self):
+    with self._lock:
+      self._entries.clear()
@@ -0,0 +1,46 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""JSON encoding and decoding of command bodies.
+
+simplejson, whose C extension is faster than the json module on Python 2, is
+used when installed. Any module with a json-compatible dumps/loads API may be
+plugged in instead.
+"""
+
+import json
+
+try:
+  import simplejson
+except ImportError:
+  simplejson = None
+
+
+class JsonCodec(object):
+  """Encodes and decodes command bodies with a json-compatible module."""
+
+  def __init__(self, module=json):
+    self._module = module
+
+  def Encode(self, value, default=None):
+    """Encodes |value|, calling |default| for objects JSON can't represent."""
+    return self._module.dumps(value, default=default, separators=(',', ':'))
+
+  def Decode(self, data, object_hook=None):
+    """Decodes |data|, passing each decoded object through |object_hook|."""
+    return self._module.loads(data, object_hook=object_hook)
+
+
+_default_codec = JsonCodec(simplejson or json)
+
+
+def GetDefaultCodec():
+  """Returns the codec using the fastest available JSON module."""
+  return _default_codec
+
+
+def SetDefaultCodec(codec):
+  """Sets the codec used by executors created without an explicit codec."""
+  global _default_codec
+  _default_codec = codec
@@ -0,0 +1,360 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Analysis of the 'performance' log.
+
+Entries of the performance log wrap DevTools Network, Page and Timeline
+events as JSON strings. An EventStore decodes them once, as they are read
+from the server, into typed columns that the summaries below are computed
+from:
+
+  store = performance_log.EventStore()
+  store.Collect(driver)
+  store.NetworkRequests().WriteCsv(open('requests.csv', 'wb'))
+"""
+
+import array
+import csv
+
+import json_codec
+
+
+class Table(object):
+  """A summary, stored as one list per column."""
+
+  def __init__(self, columns):
+    self.columns = list(columns)
+    self._data = dict((column, []) for column in self.columns)
+
+  def __len__(self):
+    return len(self._data[self.columns[0]]) if self.columns else 0
+
+  def AddRow(self, row):
+    """Appends a row, given as a dict. Missing columns are None."""
+    for column in self.columns:
+      self._data[column].append(row.get(column))
+
+  def Column(self, column):
+    return self._data[column]
+
+  def Rows(self):
+    """Yields each row as a tuple, in the order of |columns|."""
+    for i in range(len(self)):
+      yield tuple(self._data[column][i] for column in self.columns)
+
+  def ToArrays(self):
+    """Returns the columns, as a dict from column name to list of values."""
+    return dict((column, list(values)) for column, values in self._data.items())
+
+  def WriteCsv(self, file_obj):
+    """Writes the table to a binary file object, as UTF-8 encoded CSV."""
+    writer = csv.writer(file_obj)
+    writer.writerow([_EncodeCell(column) for column in self.columns])
+    for row in self.Rows():
+      writer.writerow([_EncodeCell(cell) for cell in row])
+
+
+def _EncodeCell(cell):
+  # The csv module of Python 2 can't write non-ASCII unicode strings.
+  if isinstance(cell, unicode):
+    return cell.encode('utf-8')
+  return cell
+
+
+# Timeline record types, by the category their time is reported under.
+_TIMELINE_CATEGORIES = {
+    'EvaluateScript': 'script',
+    'FunctionCall': 'script',
+    'EventDispatch': 'script',
+    'TimerFire': 'script',
+    'FireAnimationFrame': 'script',
+    'XHRReadyStateChange': 'script',
+    'XHRLoad': 'script',
+    'GCEvent': 'gc',
+    'ParseHTML': 'parse',
+    'RecalculateStyles': 'layout',
+    'Layout': 'layout',
+    'Paint': 'paint',
+    'PaintSetup': 'paint',
+    'Rasterize': 'paint',
+    'CompositeLayers': 'paint',
+    'DecodeImage': 'paint',
+    'ResizeImage': 'paint',
+}
+
+_NETWORK_COLUMNS = (
+    'webview', 'request_id', 'url', 'method', 'resource_type', 'status',
+    'mime_type', 'from_cache', 'failed', 'start', 'duration_ms', 'dns_ms',
+    'connect_ms', 'ssl_ms', 'send_ms', 'wait_ms', 'receive_ms',
+    'encoded_bytes')
+
+_PAGE_LOAD_COLUMNS = (
+    'webview', 'url', 'start', 'dom_content_loaded_ms', 'load_ms')
+
+# The phases of a Network resource timing, as (column, start key, end key).
+_TIMING_PHASES = (
+    ('dns_ms', 'dnsStart', 'dnsEnd'),
+    ('connect_ms', 'connectStart', 'connectEnd'),
+    ('ssl_ms', 'sslStart', 'sslEnd'),
+    ('send_ms', 'sendStart', 'sendEnd'),
+    ('wait_ms', 'sendEnd', 'receiveHeadersEnd'),
+)
+
+# Missing values of float and integer columns.
+_NO_FLOAT = float('nan')
+_NO_INT = -1
+
+
+def _Float(value):
+  return _NO_FLOAT if value is None else value
+
+
+def _Int(value):
+  return _NO_INT if value is None else value
+
+
+def _FromFloat(value):
+  return None if value != value else value
+
+
+def _FromInt(value):
+  return None if value == _NO_INT else value
+
+
+def _Milliseconds(start, end):
+  if start is None or end is None:
+    return None
+  return (end - start) * 1000.0
+
+
+def _TimingPhase(timing, start_key, end_key):
+  """Returns the duration of a phase of a Network resource timing."""
+  start = timing.get(start_key, -1)
+  end = timing.get(end_key, -1)
+  if start < 0 or end < 0:
+    return None
+  return end - start
+
+
+class EventStore(object):
+  """Stores decoded performance log events in typed columns.
+
+  Only the fields the summaries need are kept: the params of each event are
+  dropped once decoded. Strings are stored in lists, numbers in arrays, where
+  a missing float is NaN and a missing integer is -1.
+
+  Event i has webview |webviews[i]|, DevTools method |methods[i]|, log entry
+  timestamp |timestamps[i]| in milliseconds and DevTools timestamp |times[i]|
+  in seconds.
+
+  Network events also have a row in the network columns, which gives their
+  event in |network_events|. Timeline records, including nested ones, have a
+  row in the record columns, which gives the event that recorded them in
+  |record_events|.
+  """
+
+  def __init__(self, codec=None):
+    self._codec = codec or json_codec.GetDefaultCodec()
+    self.webviews = []
+    self.methods = []
+    self.timestamps = array.array('d')
+    self.times = array.array('d')
+
+    self.network_events = array.array('l')
+    self.request_ids = []
+    self.loader_ids = []
+    self.urls = []
+    self.http_methods = []
+    self.resource_types = []
+    self.statuses = array.array('l')
+    self.mime_types = []
+    self.from_cache = array.array('b')
+    self.encoded_bytes = array.array('l')
+    self.phase_ms = dict((column, array.array('d'))
+                         for column, _, _ in _TIMING_PHASES)
+
+    self.record_events = array.array('l')
+    self.record_types = []
+    self.record_ms = array.array('d')
+    self.record_self_ms = array.array('d')
+
+  def __len__(self):
+    return len(self.methods)
+
+  def Add(self, entry):
+    """Adds a performance log entry."""
+    message = self._codec.Decode(entry['message'])
+    method = message['message']['method']
+    params = message['message'].get('params', {})
+    event = len(self.methods)
+    self.webviews.append(message.get('webview'))
+    self.methods.append(method)
+    self.timestamps.append(entry.get('timestamp', 0))
+    self.times.append(_Float(params.get('timestamp')))
+    if method.startswith('Network.'):
+      self._AddNetworkEvent(event, params)
+    elif method == 'Timeline.eventRecorded':
+      self._AddRecord(event, params.get('record', {}))
+
+  def _AddNetworkEvent(self, event, params):
+    request = params.get('request', {})
+    response = params.get('response', {})
+    timing = response.get('timing') or {}
+    self.network_events.append(event)
+    self.request_ids.append(params.get('requestId'))
+    self.loader_ids.append(params.get('loaderId'))
+    self.urls.append(request.get('url'))
+    self.http_methods.append(request.get('method'))
+    self.resource_types.append(params.get('type'))
+    self.statuses.append(_Int(response.get('status')))
+    self.mime_types.append(response.get('mimeType'))
+    self.from_cache.append(bool(response.get('fromDiskCache')))
+    self.encoded_bytes.append(_Int(params.get('encodedDataLength')))
+    for column, start_key, end_key in _TIMING_PHASES:
+      self.phase_ms[column].append(
+          _Float(_TimingPhase(timing, start_key, end_key)))
+
+  def _AddRecord(self, event, record):
+    """Adds a Timeline record and its children, and returns its duration."""
+    duration = record.get('endTime', record.get('startTime', 0)) - \
+        record.get('startTime', 0)
+    child_time = 0
+    for child in record.get('children', []):
+      child_time += self._AddRecord(event, child)
+    self.record_events.append(event)
+    self.record_types.append(record.get('type'))
+    self.record_ms.append(duration)
+    self.record_self_ms.append(max(0, duration - child_time))
+    return duration
+
+  def AddEntries(self, entries):
+    for entry in entries:
+      self.Add(entry)
+
+  def Collect(self, driver):
+    """Adds the entries of the performance log of a XwalkDriver.
+
+    The entries are decoded as they are received, and removed from the log.
+    """
+    self.AddEntries(driver.IterLog('performance'))
+
+  def NetworkRequests(self):
+    """Returns a Table with the timings of every network request.
+
+    Times are in milliseconds, except |start| which is the DevTools timestamp
+    of the request in seconds.
+    """
+    requests = {}
+    order = []
+    for row, event in enumerate(self.network_events):
+      webview = self.webviews[event]
+      method = self.methods[event]
+      key = (webview, self.request_ids[row])
+      request = requests.get(key)
+      if request is None:
+        request = requests[key] = {'webview': webview,
+                                   'request_id': key[1],
+                                   'failed': False}
+        order.append(key)
+      timestamp = _FromFloat(self.times[event])
+      encoded_bytes = _FromInt(self.encoded_bytes[row])
+      if method == 'Network.requestWillBeSent':
+        # Redirects reuse the request id, the last request is reported.
+        request['url'] = self.urls[row]
+        request['method'] = self.http_methods[row]
+        request['resource_type'] = self.resource_types[row]
+        if request.get('start') is None:
+          request['start'] = timestamp
+      elif method == 'Network.responseReceived':
+        request['resource_type'] = (self.resource_types[row] or
+                                    request.get('resource_type'))
+        request['status'] = _FromInt(self.statuses[row])
+        request['mime_type'] = self.mime_types[row]
+        request['from_cache'] = bool(self.from_cache[row])
+        request['response'] = timestamp
+        for column, _, _ in _TIMING_PHASES:
+          request[column] = _FromFloat(self.phase_ms[column][row])
+      elif method == 'Network.dataReceived':
+        request['encoded_bytes'] = (request.get('encoded_bytes') or 0) + \
+            (encoded_bytes or 0)
+      elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+        request['end'] = timestamp
+        request['failed'] = method == 'Network.loadingFailed'
+        if encoded_bytes is not None:
+          request['encoded_bytes'] = encoded_bytes
+
+    table = Table(_NETWORK_COLUMNS)
+    for key in order:
+      request = requests[key]
+      request['duration_ms'] = _Milliseconds(request.get('start'),
+                                             request.get('end'))
+      request['receive_ms'] = _Milliseconds(request.get('response'),
+                                            request.get('end'))
+      table.AddRow(request)
+    return table
+
+  def TimelineDurations(self):
+    """Returns a Table with the time spent in each Timeline record type.
+
+    Nested records are counted under their own type as well as within their
+    parent, so |self_ms| gives the time not spent in child records.
+    """
+    stats = {}
+    for record_type, duration, self_time in zip(
+        self.record_types, self.record_ms, self.record_self_ms):
+      stat = stats.setdefault(record_type, [0, 0.0, 0.0])
+      stat[0] += 1
+      stat[1] += duration
+      stat[2] += self_time
+
+    table = Table(('type', 'category', 'count', 'total_ms', 'self_ms'))
+    for record_type in sorted(stats, key=lambda t: -stats[t][2]):
+      count, total, self_time = stats[record_type]
+      table.AddRow({'type': record_type,
+                    'category': _TIMELINE_CATEGORIES.get(record_type, 'other'),
+                    'count': count, 'total_ms': total, 'self_ms': self_time})
+    return table
+
+  def TimelineCategories(self):
+    """Returns a Table with the self time of each category, such as paint."""
+    totals = {}
+    durations = self.TimelineDurations()
+    for category, self_time in zip(durations.Column('category'),
+                                   durations.Column('self_ms')):
+      totals[category] = totals.get(category, 0.0) + self_time
+    table = Table(('category', 'self_ms'))
+    for category in sorted(totals):
+      table.AddRow({'category': category, 'self_ms': totals[category]})
+    return table
+
+  def PageLoads(self):
+    """Returns a Table with the milestones of every main document load.
+
+    A load starts when a Document request is sent, and its milestones are
+    in milliseconds from then.
+    """
+    table = Table(_PAGE_LOAD_COLUMNS)
+    network_rows = dict((event, row)
+                        for row, event in enumerate(self.network_events))
+    current = {}
+    for event, method in enumerate(self.methods):
+      webview = self.webviews[event]
+      timestamp = _FromFloat(self.times[event])
+      load = current.get(webview)
+      if method == 'Network.requestWillBeSent':
+        row = network_rows[event]
+        if self.resource_types[row] == 'Document' and \
+            self.request_ids[row] == self.loader_ids[row]:
+          if load:
+            table.AddRow(load)
+          current[webview] = {'webview': webview,
+                              'url': self.urls[row],
+                              'start': timestamp}
+      elif load and method == 'Page.domContentEventFired':
+        load['dom_content_loaded_ms'] = _Milliseconds(load['start'], timestamp)
+      elif load and method == 'Page.loadEventFired':
+        load['load_ms'] = _Milliseconds(load['start'], timestamp)
+    for load in current.values():
+      table.AddRow(load)
+    return table
@@ -0,0 +1,315 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Incremental decoding of command responses.
+
+Large command values, such as screenshots, page sources and logs, are decoded
+as they arrive instead of after the whole response has been buffered.
+"""
+
+import base64
+import codecs
+import json
+import re
+
+_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE_SPECIAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+
+
+class _JsonReader(object):
+  """Reads JSON tokens from a byte stream a chunk at a time."""
+
+  def __init__(self, stream, chunk_size=_CHUNK_SIZE):
+    self._stream = stream
+    self._chunk_size = chunk_size
+    self._decoder = codecs.getincrementaldecoder('utf-8')()
+    self._buffer = u''
+    self._pos = 0
+
+  def _Fill(self):
+    """Appends the next chunk of the stream to the buffer.
+
+    Returns:
+      False if the stream has ended.
+    """
+    data = self._stream.read(self._chunk_size)
+    text = self._decoder.decode(data, not data)
+    self._buffer = self._buffer[self._pos:] + text
+    self._pos = 0
+    return bool(data)
+
+  def _Available(self, count):
+    """Returns whether |count| more characters can be read."""
+    while len(self._buffer) - self._pos < count:
+      if not self._Fill():
+        return False
+    return True
+
+  def _Ensure(self, count):
+    if not self._Available(count):
+      raise ValueError('unexpected end of response')
+
+  def Peek(self):
+    """Skips whitespace and returns the next character without consuming it."""
+    while True:
+      self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+      if self._pos < len(self._buffer):
+        return self._buffer[self._pos]
+      self._Ensure(1)
+
+  def Expect(self, char):
+    if self.Peek() != char:
+      raise ValueError('expected %r in response' % char)
+    self._pos += 1
+
+  def _Search(self, pattern, pieces):
+    """Advances past the next match of |pattern|, returning the match.
+
+    The characters skipped, including the match, are appended to |pieces| if
+    it isn't None.
+    """
+    while True:
+      match = pattern.search(self._buffer, self._pos)
+      if match:
+        if pieces is not None:
+          pieces.append(self._buffer[self._pos:match.end()])
+        self._pos = match.end()
+        return match
+      if pieces is not None:
+        pieces.append(self._buffer[self._pos:])
+      self._pos = len(self._buffer)
+      self._Ensure(1)
+
+  def _ScanString(self, pieces):
+    """Appends the rest of a string, up to its closing quote, to |pieces|."""
+    while True:
+      if self._Search(_STRING_SPECIAL, pieces).group() == '"':
+        return
+      self._Ensure(1)
+      pieces.append(self._buffer[self._pos])
+      self._pos += 1
+
+  def ReadRaw(self):
+    """Consumes the next value and returns its JSON text."""
+    first = self.Peek()
+    self._pos += 1
+    pieces = [first]
+    if first == '"':
+      self._ScanString(pieces)
+    elif first in '[{':
+      depth = 1
+      while depth:
+        char = self._Search(_STRUCTURE_SPECIAL, pieces).group()
+        if char == '"':
+          self._ScanString(pieces)
+        elif char in '[{':
+          depth += 1
+        else:
+          depth -= 1
+    else:
+      while True:
+        match = _SCALAR_END.search(self._buffer, self._pos)
+        end = match.start() if match else len(self._buffer)
+        pieces.append(self._buffer[self._pos:end])
+        self._pos = end
+        if match or not self._Fill():
+          break
+    return u''.join(pieces)
+
+  def _ReadEscape(self):
+    """Consumes an escape sequence after its backslash and decodes it."""
+    self._Ensure(1)
+    length = 1
+    if self._buffer[self._pos] == 'u':
+      self._Ensure(5)
+      length = 5
+      # A high surrogate is decoded together with the low surrogate after it.
+      code = int(self._buffer[self._pos + 1:self._pos + 5], 16)
+      if (0xd800 <= code < 0xdc00 and self._Available(11) and
+          self._buffer.startswith('\\u', self._pos + 5)):
+        length = 11
+    escape = self._buffer[self._pos:self._pos + length]
+    self._pos += length
+    return json.loads(u'"\\%s"' % escape)
+
+  def StreamString(self, write):
+    """Consumes a string, passing its decoded text to |write| in pieces."""
+    self.Expect('"')
+    while True:
+      match = _STRING_SPECIAL.search(self._buffer, self._pos)
+      end = match.start() if match else len(self._buffer)
+      if end > self._pos:
+        write(self._buffer[self._pos:end])
+      if not match:
+        self._pos = end
+        self._Ensure(1)
+        continue
+      self._pos = match.end()
+      if match.group() == '"':
+        return
+      write(self._ReadEscape())
+
+  def IterObject(self):
+    """Consumes an object, yielding each key.
+
+    The value of a key must be consumed before the next key is requested.
+    """
+    self.Expect('{')
+    if self.Peek() == '}':
+      self._pos += 1
+      return
+    while True:
+      key = json.loads(self.ReadRaw())
+      self.Expect(':')
+      yield key
+      if self.Peek() != ',':
+        self.Expect('}')
+        return
+      self._pos += 1
+
+  def IterArray(self):
+    """Consumes an array, yielding once per element.
+
+    Each element must be consumed before the next one is requested.
+    """
+    self.Expect('[')
+    if self.Peek() == ']':
+      self._pos += 1
+      return
+    while True:
+      yield
+      if self.Peek() != ',':
+        self.Expect(']')
+        return
+      self._pos += 1
+
+
+class StreamedResponse(object):
+  """A command response decoded while it is read from the server.
+
+  The 'status' and 'sessionId' members are available as attributes once the
+  response has been read with ReadValue or IterItems. The response must be
+  closed once it is no longer needed.
+  """
+
+  def __init__(self, stream, codec, object_hook=None, on_close=None):
+    """Initializes the response.
+
+    Args:
+      stream: a file-like object with a read(size) method.
+      codec: the JsonCodec to decode values with.
+      object_hook: passed to the codec for every decoded value, or None.
+      on_close: called on Close with whether the whole response was read.
+    """
+    self._stream = stream
+    self._reader = _JsonReader(stream)
+    self._codec = codec
+    self._object_hook = object_hook
+    self._on_close = on_close
+    self._done = False
+    self.status = None
+    self.session_id = None
+    self.value = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.Close()
+
+  def _Decode(self, raw):
+    return self._codec.Decode(raw, self._object_hook)
+
+  def _ReadMember(self, key):
+    value = self._Decode(self._reader.ReadRaw())
+    if key == 'status':
+      self.status = value
+    elif key == 'sessionId':
+      self.session_id = value
+    elif key == 'value':
+      self.value = value
+
+  def ReadValue(self, string_sink=None):
+    """Reads the response.
+
+    Args:
+      string_sink: if the value is a string, called with its text in pieces
+                   instead of storing it in |value|.
+
+    Returns:
+      The value, or None if it was passed to |string_sink|.
+    """
+    for key in self._reader.IterObject():
+      if key == 'value' and string_sink and self._reader.Peek() == '"':
+        self._reader.StreamString(string_sink)
+      else:
+        self._ReadMember(key)
+    self._done = True
+    return self.value
+
+  def IterItems(self):
+    """Reads the response, yielding the items of a list value one at a time.
+
+    A value that isn't a list, such as an error, is stored in |value|.
+    """
+    for key in self._reader.IterObject():
+      if key == 'value' and self._reader.Peek() == '[':
+        for _ in self._reader.IterArray():
+          yield self._Decode(self._reader.ReadRaw())
+      else:
+        self._ReadMember(key)
+    self._done = True
+
+  def AsDict(self):
+    return {'status': self.status, 'sessionId': self.session_id,
+            'value': self.value}
+
+  def Close(self):
+    """Releases the response.
+
+    A response that wasn't read to the end can't be reused.
+    """
+    if self._on_close is None:
+      return
+    if self._done:
+      self._stream.read()
+    on_close, self._on_close = self._on_close, None
+    on_close(self._done)
+
+
+class Base64Writer(object):
+  """Decodes base64 text passed to Write and writes the bytes to a file."""
+
+  def __init__(self, file_obj):
+    self._file = file_obj
+    self._pending = ''
+
+  def Write(self, text):
+    text = self._pending + str(text)
+    usable = len(text) - len(text) % 4
+    self._pending = text[usable:]
+    if usable:
+      self._file.write(base64.b64decode(text[:usable]))
+
+  def Flush(self):
+    if self._pending:
+      raise ValueError('truncated base64 data')
+
+
+class EncodingWriter(object):
+  """Encodes text passed to Write and writes the bytes to a file."""
+
+  def __init__(self, file_obj, encoding='utf-8'):
+    self._file = file_obj
+    self._encoder = codecs.getincrementalencoder(encoding)()
+
+  def Write(self, text):
+    self._file.write(self._encoder.encode(text))
+
+  def Flush(self):
+    self._file.write(self._encoder.encode(u'', True))
@@ -0,0 +1,224 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A pool of warm Xwalk sessions shared by worker threads."""
+
+import contextlib
+import threading
+import time
+
+from command_executor import Command
+import xwalkdriver
+
+
+def ResetSession(driver):
+  """Resets a session to a blank state without relaunching Xwalk.
+
+  Closes all windows but one, deletes the cookies of every site, clears the
+  local and session storage of the current page, restores the default
+  implicit wait, script and page load timeouts, then navigates to
+  about:blank.
+
+  Only the storage of the origin open in the remaining window is cleared:
+  local storage set by other origins, along with the HTTP cache, survives
+  the reset. The window size and position, the pressed modifier keys and the
+  mouse position are not reset either. Pass a |reset_func| to SessionPool
+  that handles them if workers depend on them.
+  """
+  handles = driver.GetWindowHandles()
+  for handle in handles[1:]:
+    driver.SwitchToWindow(handle)
+    driver.CloseWindow()
+  driver.SwitchToWindow(handles[0])
+  driver.SwitchToMainFrame()
+  driver.DeleteAllBrowserCookies()
+  for command in (Command.CLEAR_LOCAL_STORAGE, Command.CLEAR_SESSION_STORAGE):
+    try:
+      driver.ExecuteCommand(command)
+    except xwalkdriver.XwalkDriverException:
+      # Pages like about:blank have no storage.
+      pass
+  driver.SetTimeout('implicit', 0)
+  driver.SetTimeout('script', 0)
+  # A negative page load timeout restores the server's default.
+  driver.SetTimeout('page load', -1)
+  driver.Load('about:blank')
+
+
+class _PooledSession(object):
+  def __init__(self, driver, server_url):
+    self.driver = driver
+    self.server_url = server_url
+    self.uses = 0
+
+
+class SessionPool(object):
+  """Hands out warm Xwalk sessions to worker threads.
+
+  Sessions are spread over one or more XwalkDriver servers, and are reset
+  between uses instead of being relaunched. The default ResetSession deletes
+  all cookies but only clears the storage of the current origin, so sessions
+  are not fully isolated from their previous uses. A session is quit and
+  replaced once it has been used |max_uses| times, or if resetting it fails.
+
+  To hand sessions out to worker processes, pass GetSessionId() of an
+  acquired driver to the worker, which can drive it with XwalkDriver.Attach().
+  """
+
+  def __init__(self, server_urls, size, max_uses=None, reset_func=ResetSession,
+               **driver_kwargs):
+    """Creates an empty pool. Sessions are started on demand, or by WarmUp().
+
+    Args:
+      server_urls: URLs of the XwalkDriver servers to start sessions on.
+      size: maximum number of sessions.
+      max_uses: number of times a session is handed out before it is
+                replaced, or None for no limit.
+      reset_func: called with a released driver to reset its session.
+      driver_kwargs: Xwalk options, as accepted by XwalkDriver.
+    """
+    assert server_urls and size > 0
+    self._server_urls = list(server_urls)
+    self._size = size
+    self._max_uses = max_uses
+    self._reset_func = reset_func
+    self._driver_kwargs = driver_kwargs
+    self._cond = threading.Condition()
+    self._idle = []
+    self._leased = {}
+    self._sessions_per_server = dict((url, 0) for url in self._server_urls)
+    self._closed = False
+
+  def _SessionCount(self):
+    return sum(self._sessions_per_server.values())
+
+  def _ReserveServer(self):
+    """Returns the least loaded server, and counts a new session on it.
+
+    Must be called with |_cond| held.
+    """
+    server_url = min(self._server_urls,
+                     key=lambda url: self._sessions_per_server[url])
+    self._sessions_per_server[server_url] += 1
+    return server_url
+
+  def _UnreserveServer(self, server_url):
+    with self._cond:
+      self._sessions_per_server[server_url] -= 1
+      self._cond.notify()
+
+  def _StartSession(self, server_url):
+    try:
+      return _PooledSession(
+          xwalkdriver.XwalkDriver(server_url, **self._driver_kwargs),
+          server_url)
+    except:
+      self._UnreserveServer(server_url)
+      raise
+
+  def _QuitSession(self, session):
+    try:
+      session.driver.Quit()
+    except Exception:
+      pass
+    self._UnreserveServer(session.server_url)
+
+  def WarmUp(self):
+    """Starts sessions in parallel until the pool is full."""
+    with self._cond:
+      server_urls = [self._ReserveServer()
+                     for _ in range(self._size - self._SessionCount())]
+    errors = []
+    def StartIdleSession(server_url):
+      try:
+        session = self._StartSession(server_url)
+      except Exception as e:
+        errors.append(e)
+        return
+      with self._cond:
+        self._idle.append(session)
+        self._cond.notify()
+    threads = [threading.Thread(target=StartIdleSession, args=(url,))
+               for url in server_urls]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    if errors:
+      raise errors[0]
+
+  def Acquire(self, timeout=None):
+    """Returns a driver for a warm session, waiting for one if none is free.
+
+    Raises:
+      RuntimeError if no session is free within |timeout| seconds, or if the
+      pool is closed.
+    """
+    deadline = None
+    if timeout is not None:
+      deadline = time.time() + timeout
+    server_url = None
+    with self._cond:
+      while True:
+        if self._closed:
+          raise RuntimeError('Session pool is closed')
+        if self._idle:
+          session = self._idle.pop()
+          break
+        if self._SessionCount() < self._size:
+          server_url = self._ReserveServer()
+          break
+        if deadline is None:
+          self._cond.wait()
+        else:
+          remaining = deadline - time.time()
+          if remaining <= 0:
+            raise RuntimeError('Timed out waiting for a free session')
+          self._cond.wait(remaining)
+    if server_url:
+      session = self._StartSession(server_url)
+    session.uses += 1
+    with self._cond:
+      self._leased[id(session.driver)] = session
+    return session.driver
+
+  def Release(self, driver):
+    """Returns a driver to the pool, resetting or replacing its session."""
+    with self._cond:
+      session = self._leased.pop(id(driver))
+      recycle = not self._closed and (self._max_uses is None or
+                                      session.uses < self._max_uses)
+    if recycle:
+      try:
+        self._reset_func(driver)
+      except Exception:
+        recycle = False
+    if recycle:
+      with self._cond:
+        # The pool may have been closed while the session was reset.
+        recycle = not self._closed
+        if recycle:
+          self._idle.append(session)
+          self._cond.notify()
+    if not recycle:
+      self._QuitSession(session)
+
+  @contextlib.contextmanager
+  def Session(self, timeout=None):
+    """Acquires a driver for the duration of a with block."""
+    driver = self.Acquire(timeout)
+    try:
+      yield driver
+    finally:
+      self.Release(driver)
+
+  def Close(self):
+    """Quits all idle sessions. Leased sessions are quit when released."""
+    with self._cond:
+      self._closed = True
+      idle = self._idle
+      self._idle = []
+      self._cond.notify_all()
+    for session in idle:
+      self._QuitSession(session)
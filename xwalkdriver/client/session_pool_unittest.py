@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tests for session_pool.py against server/stub_server.py."""
+
+import os
+import sys
+import unittest
+
+_THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(_THIS_DIR, os.pardir, 'server'))
+
+import session_pool
+import stub_server
+
+
+class SessionPoolTest(unittest.TestCase):
+
+  def setUp(self):
+    self._server = stub_server.StubServer()
+    self._server.Start()
+
+  def tearDown(self):
+    self._server.Stop()
+
+  def _CreatePool(self, size=1, max_uses=None, reset_func=None):
+    pool = session_pool.SessionPool(
+        [self._server.GetUrl()], size, max_uses=max_uses,
+        reset_func=reset_func or session_pool.ResetSession)
+    self.addCleanup(pool.Close)
+    return pool
+
+  def testReleasedSessionIsReset(self):
+    pool = self._CreatePool()
+    with pool.Session() as driver:
+      driver.Load('http://example.com/')
+      session_id = driver.GetSessionId()
+    with pool.Session() as driver:
+      self.assertEqual(session_id, driver.GetSessionId())
+      self.assertEqual('about:blank', driver.GetCurrentUrl())
+    self.assertEqual(1, self._server.GetSessionCount())
+
+  def testSessionIsReplacedAfterMaxUses(self):
+    pool = self._CreatePool(max_uses=2)
+    session_ids = []
+    for _ in range(3):
+      with pool.Session() as driver:
+        session_ids.append(driver.GetSessionId())
+    self.assertEqual(session_ids[0], session_ids[1])
+    self.assertNotEqual(session_ids[1], session_ids[2])
+    self.assertEqual(1, self._server.GetSessionCount())
+
+  def testSessionIsReplacedIfResetFails(self):
+    def FailingReset(driver):
+      raise RuntimeError('reset failed')
+    pool = self._CreatePool(reset_func=FailingReset)
+    with pool.Session() as driver:
+      session_id = driver.GetSessionId()
+    self.assertEqual(0, self._server.GetSessionCount())
+    with pool.Session() as driver:
+      self.assertNotEqual(session_id, driver.GetSessionId())
+
+  def testAcquireTimesOutWhenFull(self):
+    pool = self._CreatePool()
+    driver = pool.Acquire()
+    self.assertRaises(RuntimeError, pool.Acquire, 0.1)
+    pool.Release(driver)
+
+  def testCloseQuitsIdleAndReleasedSessions(self):
+    pool = self._CreatePool(size=2)
+    pool.WarmUp()
+    driver = pool.Acquire()
+    self.assertEqual(2, self._server.GetSessionCount())
+    pool.Close()
+    self.assertEqual(1, self._server.GetSessionCount())
+    pool.Release(driver)
+    self.assertEqual(0, self._server.GetSessionCount())
+    self.assertRaises(RuntimeError, pool.Acquire)
+
+  def testSessionReleasedWhileClosingIsQuit(self):
+    def ResetAndClose(driver):
+      session_pool.ResetSession(driver)
+      pool.Close()
+    pool = self._CreatePool(reset_func=ResetAndClose)
+    with pool.Session():
+      pass
+    self.assertEqual(0, self._server.GetSessionCount())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,98 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Recording of the commands sent to a XwalkDriver server.
+
+A CommandExecutor given a TrafficRecorder appends a line of JSON to the
+recording for every command, with its request and timings. Responses are not
+kept, except for the session and element ids they return, which is what
+replay_traffic.py needs to re-execute the recorded sessions.
+"""
+
+import json
+import re
+import threading
+
+import command_metrics
+
+_ELEMENT_ID = re.compile(r'"ELEMENT"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def GetElementIds(data):
+  """Returns the ids of the elements in JSON text, in order."""
+  if not isinstance(data, str):
+    data = data.decode('utf-8')
+  return _ELEMENT_ID.findall(data)
+
+
+class TrafficRecorder(object):
+  """Appends executed commands to a recording file.
+
+  Each line is a JSON object with the keys:
+    c: the command name, such as 'FIND_ELEMENT'.
+    m, p, b: the HTTP method, path and body of the request.
+    t: the time the command was sent, in seconds since the epoch.
+    d: the time taken by the command, in seconds.
+    h: the HTTP status of the response.
+    s: the status of the response, or None if it wasn't read.
+    sid: the session id of the response.
+    n: the size of the response, in bytes.
+    e: the ids of the elements in the response, if any.
+  """
+
+  def __init__(self, path, flush=False):
+    """Initializes the recorder.
+
+    Args:
+      path: the file to append to.
+      flush: whether to flush the file after every command.
+    """
+    self._file = open(path, 'a')
+    self._flush = flush
+    self._lock = threading.Lock()
+
+  def Record(self, command, method, path, body, start, duration, http_status,
+             status, session_id, size, data=None):
+    """Records a command.
+
+    Args:
+      command: the command that was executed.
+      method: the HTTP method of the request.
+      path: the path of the request.
+      body: the body of the request, or None.
+      start: the time the request was sent, from time.time().
+      duration: the time taken by the command, in seconds.
+      http_status: the HTTP status of the response.
+      status: the status of the response, or None if it wasn't decoded.
+      session_id: the session id of the response, or None.
+      size: the size of the response, in bytes.
+      data: the undecoded response, to find element ids in, or None.
+    """
+    record = {
+        'c': command_metrics.GetCommandName(command),
+        'm': method, 'p': path, 'b': body,
+        't': round(start, 6), 'd': round(duration, 6),
+        'h': http_status, 's': status, 'sid': session_id, 'n': size,
+    }
+    if data:
+      element_ids = GetElementIds(data)
+      if element_ids:
+        record['e'] = element_ids
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with self._lock:
+      self._file.write(line)
+      if self._flush:
+        self._file.flush()
+
+  def Close(self):
+    with self._lock:
+      self._file.close()
+
+
+def ReadRecording(path):
+  """Yields the records of a recording file, as dicts."""
+  with open(path, 'r') as f:
+    for line in f:
+      if line.strip():
+        yield json.loads(line)
@@ -2,8 +2,12 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import contextlib
+
 import command_executor
 from command_executor import Command
+from element_cache import ElementCache
+import response_stream
 from webelement import WebElement
 
 
@@ -27,6 +31,8 @@ class NoSuchWindow(XwalkDriverException):
   pass
 class InvalidCookieDomain(XwalkDriverException):
   pass
+class Timeout(XwalkDriverException):
+  pass
 class ScriptTimeout(XwalkDriverException):
   pass
 class InvalidSelector(XwalkDriverException):
@@ -35,6 +41,8 @@ class SessionNotCreatedException(XwalkDriverException):
   pass
 class NoSuchSession(XwalkDriverException):
   pass
+class ServerBusy(XwalkDriverException):
+  pass
 
 def _ExceptionForResponse(response):
   exception_class_map = {
@@ -46,105 +54,286 @@ def _ExceptionForResponse(response):
     13: UnknownError,
     17: JavaScriptError,
     19: XPathLookupError,
+    21: Timeout,
     23: NoSuchWindow,
     24: InvalidCookieDomain,
     28: ScriptTimeout,
     32: InvalidSelector,
-    33: SessionNotCreatedException
+    33: SessionNotCreatedException,
+    105: ServerBusy
   }
   status = response['status']
   msg = response['value']['message']
   return exception_class_map.get(status, XwalkDriverException)(msg)
 
 
+# Commands after which cached element lookups may no longer be valid.
+_ELEMENT_CACHE_INVALIDATING_COMMANDS = frozenset([
+    Command.GET,
+    Command.GO_BACK,
+    Command.GO_FORWARD,
+    Command.REFRESH,
+    Command.SWITCH_TO_FRAME,
+    Command.SWITCH_TO_PARENT_FRAME,
+    Command.SWITCH_TO_WINDOW,
+    Command.CLOSE,
+    Command.QUIT,
+])
+
+# The most bytes of a heap snapshot file the server returns per read.
+_MAX_HEAP_SNAPSHOT_READ_LENGTH = 4 * 1024 * 1024
+
+
+def _NewSessionParams(xwalk_binary=None, android_package=None,
+                      xwalk_switches=None, xwalk_extensions=None,
+                      xwalk_log_path=None, debugger_address=None,
+                      browser_log_level=None, log_buffer_size=None):
+  """Returns the NEW_SESSION parameters for the given Xwalk options."""
+  options = {}
+  if android_package:
+    options['androidPackage'] = android_package
+  elif xwalk_binary:
+    options['binary'] = xwalk_binary
+
+  if xwalk_switches:
+    assert type(xwalk_switches) is list
+    options['args'] = xwalk_switches
+
+  if xwalk_extensions:
+    assert type(xwalk_extensions) is list
+    options['extensions'] = xwalk_extensions
+
+  if xwalk_log_path:
+    assert type(xwalk_log_path) is str
+    options['logPath'] = xwalk_log_path
+
+  if debugger_address:
+    assert type(debugger_address) is str
+    options['debuggerAddress'] = debugger_address
+
+  if log_buffer_size:
+    assert type(log_buffer_size) is dict
+    options['logBufferSize'] = log_buffer_size
+
+  logging_prefs = {}
+  log_levels = ['ALL', 'DEBUG', 'INFO', 'WARNING', 'SEVERE', 'OFF']
+  if browser_log_level:
+    assert browser_log_level in log_levels
+    logging_prefs['browser'] = browser_log_level
+
+  params = {
+    'desiredCapabilities': {
+      'xwalkOptions': options,
+      'loggingPrefs': logging_prefs
+    }
+  }
+  return params
+
+
+class BatchResult(object):
+  """The outcome of a single command executed as part of a batch."""
+
+  def __init__(self):
+    self._response = None
+
+  def _SetResponse(self, response):
+    self._response = response
+
+  def GetStatus(self):
+    """Returns the WebDriver status code, or None if not executed yet."""
+    if self._response is None:
+      return None
+    return self._response['status']
+
+  def Get(self):
+    """Returns the value of the command, or raises its error."""
+    if self._response is None:
+      raise XwalkDriverException('batch has not been executed')
+    if self._response['status'] != 0:
+      raise _ExceptionForResponse(self._response)
+    return self._response['value']
+
+
+class CommandBatch(object):
+  """Commands to be executed in order, in a single request to the server."""
+
+  def __init__(self, xwalkdriver):
+    self._xwalkdriver = xwalkdriver
+    self._commands = []
+
+  def Add(self, command, params=None):
+    """Queues a command and returns the BatchResult it will be stored in."""
+    if params is None:
+      params = {}
+    result = BatchResult()
+    self._commands.append((command, params, result))
+    return result
+
+  def Execute(self):
+    """Executes all queued commands in a single round trip."""
+    if not self._commands:
+      return
+    commands = []
+    for command, params, _ in self._commands:
+      params = dict(params, sessionId=self._xwalkdriver._session_id)
+      url = command_executor._SubstituteUrl(command, params)
+      commands.append({'method': command[0], 'url': url, 'parameters': params})
+    try:
+      responses = self._xwalkdriver.ExecuteCommand(
+          Command.BATCH, {'commands': commands})
+    finally:
+      if any(command in _ELEMENT_CACHE_INVALIDATING_COMMANDS
+             for command, _, _ in self._commands):
+        self._xwalkdriver._ClearElementCache()
+    for (_, _, result), response in zip(self._commands, responses):
+      result._SetResponse(response)
+      if response['status'] == 10:
+        self._xwalkdriver._ClearElementCache()
+    self._commands = []
+
+
 class XwalkDriver(object):
   """Starts and controls a single Xwalk instance on this machine."""
 
   def __init__(self, server_url, xwalk_binary=None, android_package=None,
                xwalk_switches=None, xwalk_extensions=None,
                xwalk_log_path=None, debugger_address=None,
-               browser_log_level=None):
-    self._executor = command_executor.CommandExecutor(server_url)
-
-    options = {}
-    if android_package:
-      options['androidPackage'] = android_package
-    elif xwalk_binary:
-      options['binary'] = xwalk_binary
-
-    if xwalk_switches:
-      assert type(xwalk_switches) is list
-      options['args'] = xwalk_switches
-
-    if xwalk_extensions:
-      assert type(xwalk_extensions) is list
-      options['extensions'] = xwalk_extensions
-
-    if xwalk_log_path:
-      assert type(xwalk_log_path) is str
-      options['logPath'] = xwalk_log_path
-
-    if debugger_address:
-      assert type(debugger_address) is str
-      options['debuggerAddress'] = debugger_address
-
-    logging_prefs = {}
-    log_levels = ['ALL', 'DEBUG', 'INFO', 'WARNING', 'SEVERE', 'OFF']
-    if browser_log_level:
-      assert browser_log_level in log_levels
-      logging_prefs['browser'] = browser_log_level
-
-    params = {
-      'desiredCapabilities': {
-        'xwalkOptions': options,
-        'loggingPrefs': logging_prefs
-      }
-    }
-
+               browser_log_level=None, element_cache_size=0, metrics=None,
+               log_buffer_size=None, recorder=None):
+    """Starts a new session.
+
+    If |element_cache_size| is positive, FindElement and FindElements return
+    the elements found by an earlier lookup with the same strategy and
+    target, for up to that many lookups. The cache is cleared on navigation,
+    on switching windows or frames and on StaleElementReference errors.
+
+    If |metrics| is a command_metrics.MetricsRegistry, the timings of every
+    command are recorded in it. If |recorder| is a
+    traffic_recorder.TrafficRecorder, every command is appended to its
+    recording.
+
+    |log_buffer_size| is a dict limiting the 'entries' and 'bytes' each log
+    buffers in the server, with 0 meaning no limit.
+    """
+    self._executor = command_executor.CommandExecutor(
+        server_url, metrics=metrics, recorder=recorder)
+    self._element_cache = None
+    if element_cache_size > 0:
+      self._element_cache = ElementCache(element_cache_size)
+    params = _NewSessionParams(
+        xwalk_binary, android_package, xwalk_switches, xwalk_extensions,
+        xwalk_log_path, debugger_address, browser_log_level, log_buffer_size)
     self._session_id = self._ExecuteCommand(
         Command.NEW_SESSION, params)['sessionId']
 
-  def _WrapValue(self, value):
-    """Wrap value from client side for xwalkdriver side."""
-    if isinstance(value, dict):
-      converted = {}
-      for key, val in value.items():
-        converted[key] = self._WrapValue(val)
-      return converted
-    elif isinstance(value, WebElement):
+  @classmethod
+  def Attach(cls, server_url, session_id, element_cache_size=0, metrics=None,
+             recorder=None):
+    """Returns a driver controlling an existing session.
+
+    This lets another thread or process drive a session it didn't create.
+    """
+    driver = cls.__new__(cls)
+    driver._executor = command_executor.CommandExecutor(
+        server_url, metrics=metrics, recorder=recorder)
+    driver._element_cache = None
+    if element_cache_size > 0:
+      driver._element_cache = ElementCache(element_cache_size)
+    driver._session_id = session_id
+    return driver
+
+  def GetSessionId(self):
+    return self._session_id
+
+  def _EncodeObject(self, value):
+    """Encodes objects from client side for xwalkdriver side.
+
+    Called by the JSON encoder only for objects it can't represent itself, so
+    parameters without elements are serialized without being copied.
+    """
+    if isinstance(value, WebElement):
       return {'ELEMENT': value._id}
-    elif isinstance(value, list):
-      return list(self._WrapValue(item) for item in value)
-    else:
-      return value
-
-  def _UnwrapValue(self, value):
-    """Unwrap value from xwalkdriver side for client side."""
-    if isinstance(value, dict):
-      if (len(value) == 1 and 'ELEMENT' in value
-          and isinstance(value['ELEMENT'], basestring)):
-        return WebElement(self, value['ELEMENT'])
-      else:
-        unwraped = {}
-        for key, val in value.items():
-          unwraped[key] = self._UnwrapValue(val)
-        return unwraped
-    elif isinstance(value, list):
-      return list(self._UnwrapValue(item) for item in value)
-    else:
-      return value
+    raise TypeError('%r is not JSON serializable' % value)
+
+  def _DecodeObject(self, value):
+    """Decodes objects from xwalkdriver side for client side.
+
+    Called by the JSON decoder for every object as it is decoded, so returned
+    elements are found without walking the response again.
+    """
+    if (len(value) == 1 and 'ELEMENT' in value
+        and isinstance(value['ELEMENT'], basestring)):
+      return WebElement(self, value['ELEMENT'])
+    return value
 
   def _ExecuteCommand(self, command, params={}):
-    params = self._WrapValue(params)
-    response = self._executor.Execute(command, params)
+    response = self._executor.Execute(
+        command, params, self._EncodeObject, self._DecodeObject)
     if response['status'] != 0:
       raise _ExceptionForResponse(response)
     return response
 
+  def _StreamCommand(self, command, params={}):
+    """Executes a command, returning its StreamedResponse."""
+    return self._executor.Stream(
+        command, dict(params, sessionId=self._session_id),
+        self._EncodeObject, self._DecodeObject)
+
+  def _ClearElementCache(self):
+    if self._element_cache is not None:
+      self._element_cache.Clear()
+
   def ExecuteCommand(self, command, params={}):
-    params['sessionId'] = self._session_id
-    response = self._ExecuteCommand(command, params)
-    return self._UnwrapValue(response['value'])
+    params = dict(params, sessionId=self._session_id)
+    try:
+      response = self._ExecuteCommand(command, params)
+    except StaleElementReference:
+      self._ClearElementCache()
+      raise
+    finally:
+      if command in _ELEMENT_CACHE_INVALIDATING_COMMANDS:
+        self._ClearElementCache()
+    return response['value']
+
+  def _FindElementCached(self, command, strategy, target):
+    params = {'using': strategy, 'value': target}
+    if self._element_cache is None:
+      return self.ExecuteCommand(command, params)
+    key = (command, strategy, target)
+    found = self._element_cache.Get(key)
+    if found is None:
+      found = self.ExecuteCommand(command, params)
+      # Don't cache empty results, the elements may be added later.
+      if found:
+        self._element_cache.Put(key, found)
+    if isinstance(found, list):
+      return list(found)
+    return found
+
+  def ExecuteBatch(self, commands):
+    """Executes a list of (command, params) tuples in a single round trip.
+
+    Returns:
+      A list of BatchResult, one per command.
+    """
+    batch = CommandBatch(self)
+    results = [batch.Add(command, params) for command, params in commands]
+    batch.Execute()
+    return results
+
+  @contextlib.contextmanager
+  def Batch(self):
+    """Returns a CommandBatch, which is executed when the block exits.
+
+    For example:
+      with driver.Batch() as batch:
+        texts = [batch.Add(Command.GET_ELEMENT_TEXT, {'id': element._id})
+                 for element in elements]
+      print [text.Get() for text in texts]
+    """
+    batch = CommandBatch(self)
+    yield batch
+    batch.Execute()
 
   def GetWindowHandles(self):
     return self.ExecuteCommand(Command.GET_WINDOW_HANDLES)
@@ -172,6 +361,19 @@ class XwalkDriver(object):
         Command.EXECUTE_ASYNC_SCRIPT,
         {'script': script, 'args': converted_args})
 
+  def RegisterScript(self, script):
+    """Registers a script with the session, returning its handle.
+
+    The script is sent once. ExecuteRegistered then only sends the handle,
+    and each page parses the script once, when it is first executed there.
+    """
+    return self.ExecuteCommand(Command.REGISTER_SCRIPT, {'script': script})
+
+  def ExecuteRegistered(self, handle, *args):
+    return self.ExecuteCommand(
+        Command.EXECUTE_REGISTERED_SCRIPT,
+        {'handle': handle, 'args': list(args)})
+
   def SwitchToFrame(self, id_or_name):
     self.ExecuteCommand(Command.SWITCH_TO_FRAME, {'id': id_or_name})
 
@@ -187,13 +389,125 @@ class XwalkDriver(object):
   def GetPageSource(self):
     return self.ExecuteCommand(Command.GET_PAGE_SOURCE)
 
-  def FindElement(self, strategy, target):
-    return self.ExecuteCommand(
-        Command.FIND_ELEMENT, {'using': strategy, 'value': target})
+  def SavePageSource(self, file_obj, encoding='utf-8'):
+    """Writes the page source to a binary file object as it is received."""
+    writer = response_stream.EncodingWriter(file_obj, encoding)
+    with self._StreamCommand(Command.GET_PAGE_SOURCE) as response:
+      response.ReadValue(writer.Write)
+    if response.status != 0:
+      raise _ExceptionForResponse(response.AsDict())
+    writer.Flush()
+
+  def SaveScreenshot(self, file_obj):
+    """Writes a PNG screenshot to a binary file object as it is received."""
+    writer = response_stream.Base64Writer(file_obj)
+    with self._StreamCommand(Command.SCREENSHOT) as response:
+      response.ReadValue(writer.Write)
+    if response.status != 0:
+      raise _ExceptionForResponse(response.AsDict())
+    writer.Flush()
+
+  def TakeHeapSnapshot(self):
+    """Returns a heap snapshot, parsed. Use SaveHeapSnapshot for large heaps."""
+    return self.ExecuteCommand(Command.TAKE_HEAP_SNAPSHOT)
+
+  def TakeHeapSnapshotToFile(self, compress=False):
+    """Takes a heap snapshot to a file on the server's machine.
+
+    The snapshot is written as it is received, gzip-compressed if |compress|,
+    and is never held in memory by the server. Returns a dict with the 'id' of
+    the file, its 'path' and 'size', the uncompressed 'snapshotSize' and
+    whether it is 'compressed'. The file is deleted when the session quits.
+    """
+    return self.ExecuteCommand(Command.TAKE_HEAP_SNAPSHOT_TO_FILE,
+                               {'compress': compress})
+
+  def ReadHeapSnapshotFile(self, snapshot, file_obj, chunk_size=1024 * 1024):
+    """Downloads a heap snapshot file to a binary file object, chunk by chunk.
+
+    |snapshot| is a dict returned by TakeHeapSnapshotToFile. The server reads
+    at most 4 MiB at a time, so larger chunk sizes are reduced to that.
+    """
+    chunk_size = min(chunk_size, _MAX_HEAP_SNAPSHOT_READ_LENGTH)
+    offset = 0
+    while offset < snapshot['size']:
+      writer = response_stream.Base64Writer(file_obj)
+      params = {'id': snapshot['id'], 'offset': offset, 'length': chunk_size}
+      with self._StreamCommand(Command.READ_HEAP_SNAPSHOT_FILE,
+                               params) as response:
+        response.ReadValue(writer.Write)
+      if response.status != 0:
+        raise _ExceptionForResponse(response.AsDict())
+      writer.Flush()
+      offset += chunk_size
+
+  def DeleteHeapSnapshotFile(self, snapshot):
+    self.ExecuteCommand(Command.DELETE_HEAP_SNAPSHOT_FILE,
+                        {'id': snapshot['id']})
+
+  def SaveHeapSnapshot(self, file_obj, compress=False,
+                       chunk_size=1024 * 1024):
+    """Takes a heap snapshot and writes it to a binary file object.
+
+    The snapshot is streamed through a file on the server and downloaded in
+    chunks of |chunk_size| bytes, so neither side holds it in memory. Returns
+    the dict TakeHeapSnapshotToFile returned.
+    """
+    snapshot = self.TakeHeapSnapshotToFile(compress)
+    try:
+      self.ReadHeapSnapshotFile(snapshot, file_obj, chunk_size)
+    finally:
+      self.DeleteHeapSnapshotFile(snapshot)
+    return snapshot
 
-  def FindElements(self, strategy, target):
+  def FindElement(self, strategy, target):
+    return self._FindElementCached(Command.FIND_ELEMENT, strategy, target)
+
+  def FindElements(self, strategy, target, with_fields=None):
+    """Finds elements, optionally reading some of their fields as well.
+
+    If |with_fields| is given, returns an (elements, snapshot) tuple as from
+    SnapshotElements, at the cost of a single round trip.
+    """
+    if with_fields is None:
+      return self._FindElementCached(Command.FIND_ELEMENTS, strategy, target)
+    result = self.ExecuteCommand(
+        Command.GET_ELEMENTS_SNAPSHOT,
+        {'using': strategy, 'value': target, 'fields': list(with_fields)})
+    return result['elements'], result['fields']
+
+  def SnapshotElements(self, elements, fields):
+    """Reads several fields of many elements in a single round trip.
+
+    Fields are 'tag_name', 'text', 'displayed', 'enabled', 'selected',
+    'location', 'size', 'rect' (the bounding client rect), 'value',
+    'attribute:<name>' and 'css:<property>'.
+
+    Returns:
+      A dict mapping each field to a list of values, one per element.
+    """
+    result = self.ExecuteCommand(
+        Command.GET_ELEMENTS_SNAPSHOT,
+        {'elements': list(elements), 'fields': list(fields)})
+    return result['fields']
+
+  def WaitForElement(self, strategy, target, timeout_ms, interval_ms=None):
+    """Waits on the server for an element to appear and returns it."""
+    params = {'using': strategy, 'value': target, 'ms': timeout_ms}
+    if interval_ms is not None:
+      params['interval'] = interval_ms
+    return self.ExecuteCommand(Command.WAIT_FOR_ELEMENT, params)
+
+  def WaitForCondition(self, script, timeout_ms, interval_ms=None, args=None):
+    """Waits on the server until |script| returns a truthy value."""
+    params = {'script': script, 'args': args or [], 'ms': timeout_ms}
+    if interval_ms is not None:
+      params['interval'] = interval_ms
+    return self.ExecuteCommand(Command.WAIT_FOR_CONDITION, params)
+
+  def WaitForNotLoading(self, timeout_ms):
     return self.ExecuteCommand(
-        Command.FIND_ELEMENTS, {'using': strategy, 'value': target})
+        Command.WAIT_FOR_NOT_LOADING, {'ms': timeout_ms})
 
   def SetTimeout(self, type, timeout):
     return self.ExecuteCommand(
@@ -242,6 +556,30 @@ class XwalkDriver(object):
   def TouchMove(self, x, y):
     self.ExecuteCommand(Command.TOUCH_MOVE, {'x': x, 'y': y})
 
+  def PerformActions(self, actions):
+    """Performs a sequence of input actions in a single round trip.
+
+    Each action is a dict with a 'type' and the parameters of the matching
+    command: 'mouseMove' ('element', 'xoffset', 'yoffset'), 'mouseDown' and
+    'mouseUp' ('button'), 'touchDown', 'touchMove' and 'touchUp' ('x', 'y'),
+    'sendKeys' ('value') and 'pause'. An optional 'duration', in
+    milliseconds, is waited for on the server after the action.
+
+    For example, a swipe:
+      driver.PerformActions(
+          [{'type': 'touchDown', 'x': 10, 'y': 100}] +
+          [{'type': 'touchMove', 'x': x, 'y': 100, 'duration': 16}
+           for x in range(20, 500, 10)] +
+          [{'type': 'touchUp', 'x': 500, 'y': 100}])
+    """
+    encoded_actions = []
+    for action in actions:
+      element = action.get('element')
+      if isinstance(element, WebElement):
+        action = dict(action, element=element._id)
+      encoded_actions.append(action)
+    self.ExecuteCommand(Command.PERFORM_ACTIONS, {'actions': encoded_actions})
+
   def GetCookies(self):
     return self.ExecuteCommand(Command.GET_COOKIES)
 
@@ -254,6 +592,10 @@ class XwalkDriver(object):
   def DeleteAllCookies(self):
     self.ExecuteCommand(Command.DELETE_ALL_COOKIES)
 
+  def DeleteAllBrowserCookies(self):
+    """Deletes the cookies of every site, not only of the current page."""
+    self.ExecuteCommand(Command.DELETE_ALL_BROWSER_COOKIES)
+
   def IsAlertOpen(self):
     return self.ExecuteCommand(Command.GET_ALERT)
 
@@ -295,11 +637,34 @@ class XwalkDriver(object):
     self.ExecuteCommand(Command.MAXIMIZE_WINDOW, {'windowHandle': 'current'})
 
   def Quit(self):
-    """Quits the browser and ends the session."""
-    self.ExecuteCommand(Command.QUIT)
-
-  def GetLog(self, type):
-    return self.ExecuteCommand(Command.GET_LOG, {'type': type})
+    """Quits the browser, ends the session and closes its connections."""
+    try:
+      self.ExecuteCommand(Command.QUIT)
+    finally:
+      self._executor.Close()
+
+  def GetLog(self, type, since=None, max_entries=None):
+    """Returns the entries of a log.
+
+    Without |since|, returns all entries and clears the log. With a |since|
+    cursor, starting at 0, returns a dict with the 'entries' from the cursor
+    on, the 'next' cursor to pass and the number of entries 'dropped' unread
+    because the server's buffer was full.
+    """
+    params = {'type': type}
+    if since is not None:
+      params['since'] = since
+    if max_entries is not None:
+      params['max_entries'] = max_entries
+    return self.ExecuteCommand(Command.GET_LOG, params)
+
+  def IterLog(self, type):
+    """Yields the entries of a log as they are received."""
+    with self._StreamCommand(Command.GET_LOG, {'type': type}) as response:
+      for entry in response.IterItems():
+        yield entry
+    if response.status != 0:
+      raise _ExceptionForResponse(response.AsDict())
 
   def GetAvailableLogTypes(self):
     return self.ExecuteCommand(Command.GET_AVAILABLE_LOG_TYPES)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tests for xwalkdriver.py against server/stub_server.py."""
+
+import os
+import StringIO
+import sys
+import unittest
+
+_THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(_THIS_DIR, os.pardir, 'server'))
+
+import stub_server
+import xwalkdriver
+
+
+class XwalkDriverTest(unittest.TestCase):
+
+  def setUp(self):
+    # Script results and screenshots over 256 KiB are sent with chunked
+    # transfer encoding.
+    self._server = stub_server.StubServer(
+        stub_server.StubConfig(script_result_kb=300, chunked=True))
+    self._server.Start()
+    self._driver = xwalkdriver.XwalkDriver(self._server.GetUrl())
+
+  def tearDown(self):
+    self._driver.Quit()
+    self._server.Stop()
+
+  def testChunkedResponse(self):
+    for _ in range(3):
+      self.assertEqual('x' * 300 * 1024,
+                       self._driver.ExecuteScript('return 1'))
+    self.assertEqual('stub', self._driver.GetTitle())
+
+  def testStreamedChunkedResponse(self):
+    screenshot = StringIO.StringIO()
+    self._driver.SaveScreenshot(screenshot)
+    self.assertEqual('\0' * 256 * 1024, screenshot.getvalue())
+    self.assertEqual('stub', self._driver.GetTitle())
+
+
+if __name__ == '__main__':
+  unittest.main()
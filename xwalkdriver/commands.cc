@@ -7,11 +7,11 @@
 #include <algorithm>
 #include <list>
 #include <utility>
+#include <vector>
 
 #include "base/bind.h"
 #include "base/bind_helpers.h"
 #include "base/logging.h"
-#include "base/memory/linked_ptr.h"
 #include "base/message_loop/message_loop.h"
 #include "base/message_loop/message_loop_proxy.h"
 #include "base/run_loop.h"
@@ -21,12 +21,13 @@
 #include "xwalk/test/xwalkdriver/capabilities.h"
 #include "xwalk/test/xwalkdriver/logging.h"
 #include "xwalk/test/xwalkdriver/session.h"
-#include "xwalk/test/xwalkdriver/session_thread_map.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
 #include "xwalk/test/xwalkdriver/util.h"
 #include "xwalk/test/xwalkdriver/xwalk/status.h"
 #include "xwalk/test/xwalkdriver/xwalk/xwalk.h"
 
 void ExecuteGetStatus(
+    SessionWorkerPool* session_worker_pool,
     const base::DictionaryValue& params,
     const std::string& session_id,
     const CommandCallback& callback) {
@@ -41,12 +42,13 @@ void ExecuteGetStatus(
   base::DictionaryValue info;
   info.Set("build", build.DeepCopy());
   info.Set("os", os.DeepCopy());
+  info.Set("sessions", session_worker_pool->GetStats().release());
   callback.Run(
       Status(kOk), scoped_ptr<base::Value>(info.DeepCopy()), std::string());
 }
 
 void ExecuteCreateSession(
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const Command& init_session_cmd,
     const base::DictionaryValue& params,
     const std::string& session_id,
@@ -54,20 +56,8 @@ void ExecuteCreateSession(
   std::string new_id = session_id;
   if (new_id.empty())
     new_id = GenerateId();
-  scoped_ptr<Session> session(new Session(new_id));
-  scoped_ptr<base::Thread> thread(new base::Thread(new_id.c_str()));
-  if (!thread->Start()) {
-    callback.Run(
-        Status(kUnknownError, "failed to start a thread for the new session"),
-        scoped_ptr<base::Value>(),
-        std::string());
-    return;
-  }
-
-  thread->message_loop()->PostTask(
-      FROM_HERE, base::Bind(&SetThreadLocalSession, base::Passed(&session)));
-  session_thread_map
-      ->insert(std::make_pair(new_id, make_linked_ptr(thread.release())));
+  session_worker_pool->AddSession(
+      new_id, scoped_ptr<Session>(new Session(new_id)));
   init_session_cmd.Run(params, new_id, callback);
 }
 
@@ -91,22 +81,21 @@ void OnSessionQuit(const base::WeakPtr<size_t>& quit_remaining_count,
 
 void ExecuteQuitAll(
     const Command& quit_command,
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const base::DictionaryValue& params,
     const std::string& session_id,
     const CommandCallback& callback) {
-  size_t quit_remaining_count = session_thread_map->size();
+  std::vector<std::string> session_ids = session_worker_pool->GetSessionIds();
+  size_t quit_remaining_count = session_ids.size();
   base::WeakPtrFactory<size_t> weak_ptr_factory(&quit_remaining_count);
   if (!quit_remaining_count) {
     callback.Run(Status(kOk), scoped_ptr<base::Value>(), session_id);
     return;
   }
   base::RunLoop run_loop;
-  for (SessionThreadMap::const_iterator iter = session_thread_map->begin();
-       iter != session_thread_map->end();
-       ++iter) {
+  for (size_t i = 0; i < session_ids.size(); ++i) {
     quit_command.Run(params,
-                     iter->first,
+                     session_ids[i],
                      base::Bind(&OnSessionQuit,
                                 weak_ptr_factory.GetWeakPtr(),
                                 run_loop.QuitClosure()));
@@ -122,12 +111,12 @@ void ExecuteQuitAll(
 
 namespace {
 
-void TerminateSessionThreadOnCommandThread(SessionThreadMap* session_thread_map,
-                                           const std::string& session_id) {
-  session_thread_map->erase(session_id);
+void RemoveSessionOnCommandThread(SessionWorkerPool* session_worker_pool,
+                                  const std::string& session_id) {
+  session_worker_pool->RemoveSession(session_id);
 }
 
-void ExecuteSessionCommandOnSessionThread(
+void ExecuteSessionCommandOnSessionWorker(
     const char* command_name,
     const SessionCommand& command,
     bool return_ok_without_session,
@@ -208,37 +197,33 @@ void ExecuteSessionCommandOnSessionThread(
 }  // namespace
 
 void ExecuteSessionCommand(
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const char* command_name,
     const SessionCommand& command,
     bool return_ok_without_session,
     const base::DictionaryValue& params,
     const std::string& session_id,
     const CommandCallback& callback) {
-  SessionThreadMap::iterator iter = session_thread_map->find(session_id);
-  if (iter == session_thread_map->end()) {
+  if (!session_worker_pool->HasSession(session_id)) {
     Status status(return_ok_without_session ? kOk : kNoSuchSession);
     callback.Run(status, scoped_ptr<base::Value>(), session_id);
-  } else {
-    iter->second->message_loop()
-        ->PostTask(FROM_HERE,
-                   base::Bind(&ExecuteSessionCommandOnSessionThread,
-                              command_name,
-                              command,
-                              return_ok_without_session,
-                              base::Passed(make_scoped_ptr(params.DeepCopy())),
-                              base::MessageLoopProxy::current(),
-                              callback,
-                              base::Bind(&TerminateSessionThreadOnCommandThread,
-                                         session_thread_map,
-                                         session_id)));
+    return;
+  }
+  bool posted = session_worker_pool->PostTask(
+      session_id,
+      base::Bind(&ExecuteSessionCommandOnSessionWorker,
+                 command_name,
+                 command,
+                 return_ok_without_session,
+                 base::Passed(make_scoped_ptr(params.DeepCopy())),
+                 base::MessageLoopProxy::current(),
+                 callback,
+                 base::Bind(&RemoveSessionOnCommandThread,
+                            session_worker_pool,
+                            session_id)));
+  if (!posted) {
+    callback.Run(Status(kServerBusy, "too many commands are queued"),
+                 scoped_ptr<base::Value>(),
+                 session_id);
   }
 }
-
-namespace internal {
-
-void CreateSessionOnSessionThreadForTesting(const std::string& id) {
-  SetThreadLocalSession(make_scoped_ptr(new Session(id)));
-}
-
-}  // namespace internal
@@ -11,7 +11,6 @@
 #include "base/memory/ref_counted.h"
 #include "base/memory/scoped_ptr.h"
 #include "xwalk/test/xwalkdriver/command.h"
-#include "xwalk/test/xwalkdriver/session_thread_map.h"
 
 namespace base {
 class DictionaryValue;
@@ -19,17 +18,19 @@ class Value;
 }
 
 struct Session;
+class SessionWorkerPool;
 class Status;
 
-// Gets status/info about XwalkDriver.
+// Gets status/info about XwalkDriver, and the load of the session workers.
 void ExecuteGetStatus(
+    SessionWorkerPool* session_worker_pool,
     const base::DictionaryValue& params,
     const std::string& session_id,
     const CommandCallback& callback);
 
 // Creates a new session.
 void ExecuteCreateSession(
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const Command& init_session_cmd,
     const base::DictionaryValue& params,
     const std::string& session_id,
@@ -38,7 +39,7 @@ void ExecuteCreateSession(
 // Quits all sessions.
 void ExecuteQuitAll(
     const Command& quit_command,
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const base::DictionaryValue& params,
     const std::string& session_id,
     const CommandCallback& callback);
@@ -49,9 +50,9 @@ typedef base::Callback<Status(
     scoped_ptr<base::Value>*)> SessionCommand;
 
 // Executes a given session command, after acquiring access to the appropriate
-// session.
+// session. Fails with kServerBusy if too many commands wait for a worker.
 void ExecuteSessionCommand(
-    SessionThreadMap* session_thread_map,
+    SessionWorkerPool* session_worker_pool,
     const char* command_name,
     const SessionCommand& command,
     bool return_ok_without_session,
@@ -59,8 +60,4 @@ void ExecuteSessionCommand(
     const std::string& session_id,
     const CommandCallback& callback);
 
-namespace internal {
-void CreateSessionOnSessionThreadForTesting(const std::string& id);
-}  // namespace internal
-
 #endif  // XWALK_TEST_XWALKDRIVER_COMMANDS_H_
@@ -2,9 +2,12 @@
 // Use of this source code is governed by a BSD-style license that can be
 // found in the LICENSE file.
 
+#include <list>
 #include <string>
+#include <vector>
 
 #include "base/bind.h"
+#include "base/bind_helpers.h"
 #include "base/callback.h"
 #include "base/compiler_specific.h"
 #include "base/files/file_path.h"
@@ -12,7 +15,8 @@
 #include "base/message_loop/message_loop.h"
 #include "base/run_loop.h"
 #include "base/synchronization/lock.h"
-#include "base/threading/thread.h"
+#include "base/synchronization/waitable_event.h"
+#include "base/time/time.h"
 #include "base/values.h"
 #include "testing/gtest/include/gtest/gtest.h"
 #include "third_party/webdriver/atoms.h"
@@ -20,10 +24,12 @@
 #include "xwalk/test/xwalkdriver/element_commands.h"
 #include "xwalk/test/xwalkdriver/session.h"
 #include "xwalk/test/xwalkdriver/session_commands.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
 #include "xwalk/test/xwalkdriver/window_commands.h"
 #include "xwalk/test/xwalkdriver/xwalk/status.h"
 #include "xwalk/test/xwalkdriver/xwalk/stub_web_view.h"
 #include "xwalk/test/xwalkdriver/xwalk/stub_xwalk.h"
+#include "xwalk/test/xwalkdriver/xwalk/ui_events.h"
 #include "xwalk/test/xwalkdriver/xwalk/web_view.h"
 
 namespace {
@@ -74,17 +80,15 @@ void OnQuitAll(const Status& status,
 }  // namespace
 
 TEST(CommandsTest, QuitAll) {
-  SessionThreadMap map;
-  Session session("id");
-  Session session2("id2");
-  map[session.id] = make_linked_ptr(new base::Thread("1"));
-  map[session2.id] = make_linked_ptr(new base::Thread("2"));
+  SessionWorkerPool pool(1, 0);
+  pool.AddSession("id", make_scoped_ptr(new Session("id")));
+  pool.AddSession("id2", make_scoped_ptr(new Session("id2")));
 
   int count = 0;
   Command cmd = base::Bind(&ExecuteStubQuit, &count);
   base::DictionaryValue params;
   base::MessageLoop loop;
-  ExecuteQuitAll(cmd, &map, params, std::string(), base::Bind(&OnQuitAll));
+  ExecuteQuitAll(cmd, &pool, params, std::string(), base::Bind(&OnQuitAll));
   ASSERT_EQ(2, count);
 }
 
@@ -119,14 +123,9 @@ void OnSimpleCommand(base::RunLoop* run_loop,
 }  // namespace
 
 TEST(CommandsTest, ExecuteSessionCommand) {
-  SessionThreadMap map;
-  linked_ptr<base::Thread> thread(new base::Thread("1"));
-  ASSERT_TRUE(thread->Start());
+  SessionWorkerPool pool(1, 0);
   std::string id("id");
-  thread->message_loop()->PostTask(
-      FROM_HERE,
-      base::Bind(&internal::CreateSessionOnSessionThreadForTesting, id));
-  map[id] = thread;
+  pool.AddSession(id, make_scoped_ptr(new Session(id)));
 
   base::DictionaryValue params;
   params.SetInteger("param", 5);
@@ -137,7 +136,7 @@ TEST(CommandsTest, ExecuteSessionCommand) {
   base::MessageLoop loop;
   base::RunLoop run_loop;
   ExecuteSessionCommand(
-      &map,
+      &pool,
       "cmd",
       cmd,
       false,
@@ -174,9 +173,9 @@ void OnNoSuchSessionIsOk(const Status& status,
 }  // namespace
 
 TEST(CommandsTest, ExecuteSessionCommandOnNoSuchSession) {
-  SessionThreadMap map;
+  SessionWorkerPool pool(1, 0);
   base::DictionaryValue params;
-  ExecuteSessionCommand(&map,
+  ExecuteSessionCommand(&pool,
                         "cmd",
                         base::Bind(&ShouldNotBeCalled),
                         false,
@@ -186,9 +185,9 @@ TEST(CommandsTest, ExecuteSessionCommandOnNoSuchSession) {
 }
 
 TEST(CommandsTest, ExecuteSessionCommandOnNoSuchSessionWhenItExpectsOk) {
-  SessionThreadMap map;
+  SessionWorkerPool pool(1, 0);
   base::DictionaryValue params;
-  ExecuteSessionCommand(&map,
+  ExecuteSessionCommand(&pool,
                         "cmd",
                         base::Bind(&ShouldNotBeCalled),
                         true,
@@ -211,15 +210,14 @@ void OnNoSuchSessionAndQuit(base::RunLoop* run_loop,
 }  // namespace
 
 TEST(CommandsTest, ExecuteSessionCommandOnJustDeletedSession) {
-  SessionThreadMap map;
-  linked_ptr<base::Thread> thread(new base::Thread("1"));
-  ASSERT_TRUE(thread->Start());
-  std::string id("id");
-  map[id] = thread;
+  SessionWorkerPool pool(1, 0);
+  // The session was deleted by a command quitting it, which also removes it
+  // from the pool once it reaches the command thread.
+  pool.AddSession("session", scoped_ptr<Session>());
 
   base::MessageLoop loop;
   base::RunLoop run_loop;
-  ExecuteSessionCommand(&map,
+  ExecuteSessionCommand(&pool,
                         "cmd",
                         base::Bind(&ShouldNotBeCalled),
                         false,
@@ -231,6 +229,43 @@ TEST(CommandsTest, ExecuteSessionCommandOnJustDeletedSession) {
 
 namespace {
 
+void SignalAndWait(base::WaitableEvent* signal, base::WaitableEvent* wait) {
+  signal->Signal();
+  wait->TimedWait(base::TimeDelta::FromSeconds(10));
+}
+
+void OnServerBusy(const Status& status,
+                  scoped_ptr<base::Value> value,
+                  const std::string& session_id) {
+  EXPECT_EQ(kServerBusy, status.code());
+  EXPECT_FALSE(value.get());
+  EXPECT_EQ("id", session_id);
+}
+
+}  // namespace
+
+TEST(CommandsTest, ExecuteSessionCommandWhenServerBusy) {
+  base::WaitableEvent started(false, false);
+  base::WaitableEvent release(false, false);
+  SessionWorkerPool pool(1, 1);
+  pool.AddSession("id", make_scoped_ptr(new Session("id")));
+  ASSERT_TRUE(pool.PostTask(
+      "id", base::Bind(&SignalAndWait, &started, &release)));
+  started.Wait();
+  ASSERT_TRUE(pool.PostTask("id", base::Bind(&base::DoNothing)));
+
+  ExecuteSessionCommand(&pool,
+                        "cmd",
+                        base::Bind(&ShouldNotBeCalled),
+                        false,
+                        base::DictionaryValue(),
+                        "id",
+                        base::Bind(&OnServerBusy));
+  release.Signal();
+}
+
+namespace {
+
 enum TestScenario {
   kElementExistsQueryOnce = 0,
   kElementExistsQueryTwice,
@@ -295,6 +330,14 @@ class FindElementWebView : public StubWebView {
                               const std::string& function,
                               const base::ListValue& args,
                               scoped_ptr<base::Value>* result) override {
+    if (function !=
+            webdriver::atoms::asString(webdriver::atoms::FIND_ELEMENT) &&
+        function !=
+            webdriver::atoms::asString(webdriver::atoms::FIND_ELEMENTS)) {
+      // Reports a DOM change to every check made while waiting.
+      result->reset(new base::FundamentalValue(true));
+      return Status(kOk);
+    }
     ++current_count_;
     if (scenario_ == kElementExistsTimeout ||
         (scenario_ == kElementExistsQueryTwice && current_count_ == 1)) {
@@ -496,6 +539,75 @@ TEST(CommandsTest, TimeoutInFindElement) {
 
 namespace {
 
+// Finds the element on the third find, and reports DOM changes to the first
+// and fourth checks made while waiting for it. Counts the calls that stop
+// observing the DOM once the wait is over.
+class DomChangeWebView : public StubWebView {
+ public:
+  DomChangeWebView()
+      : StubWebView("1"), find_count_(0), check_count_(0), stop_count_(0) {}
+  virtual ~DomChangeWebView() {}
+
+  int find_count() const { return find_count_; }
+  int check_count() const { return check_count_; }
+  int stop_count() const { return stop_count_; }
+
+  // Overridden from WebView:
+  virtual Status CallFunction(const std::string& frame,
+                              const std::string& function,
+                              const base::ListValue& args,
+                              scoped_ptr<base::Value>* result) override {
+    if (function ==
+            webdriver::atoms::asString(webdriver::atoms::FIND_ELEMENT)) {
+      ++find_count_;
+      if (find_count_ < 3) {
+        result->reset(base::Value::CreateNullValue());
+      } else {
+        base::DictionaryValue element;
+        element.SetString("ELEMENT", "1");
+        result->reset(element.DeepCopy());
+      }
+    } else if (function.find("disconnect()") != std::string::npos) {
+      ++stop_count_;
+      result->reset(base::Value::CreateNullValue());
+    } else {
+      ++check_count_;
+      result->reset(
+          new base::FundamentalValue(check_count_ == 1 || check_count_ == 4));
+    }
+    return Status(kOk);
+  }
+
+ private:
+  int find_count_;
+  int check_count_;
+  int stop_count_;
+};
+
+}  // namespace
+
+TEST(CommandsTest, FindElementWaitsForDomChanges) {
+  DomChangeWebView web_view;
+  Session session("id");
+  session.implicit_wait = base::TimeDelta::FromSeconds(10);
+  base::DictionaryValue params;
+  params.SetString("using", "id");
+  params.SetString("value", "a");
+  scoped_ptr<base::Value> result;
+  base::TimeTicks start_time = base::TimeTicks::Now();
+  ASSERT_EQ(
+      kOk,
+      ExecuteFindElement(5000, &session, &web_view, params, &result).code());
+  // The element is found well before the poll interval has elapsed once.
+  ASSERT_LT(base::TimeTicks::Now() - start_time,
+            base::TimeDelta::FromSeconds(5));
+  ASSERT_EQ(3, web_view.find_count());
+  ASSERT_EQ(4, web_view.check_count());
+  ASSERT_EQ(1, web_view.stop_count());
+}
+
+namespace {
+
 class ErrorCallFunctionWebView : public StubWebView {
  public:
   explicit ErrorCallFunctionWebView(StatusCode code)
@@ -546,3 +658,516 @@ TEST(CommandsTest, ErrorFindChildElement) {
       ExecuteFindChildElements(
           1, &session, &web_view, element_id, params, &result).code());
 }
+
+TEST(CommandsTest, SuccessfulWaitForElement) {
+  FindElementWebView web_view(true, kElementExistsQueryTwice);
+  Session session("id");
+  session.SwitchToSubFrame("frame_id5", std::string());
+  base::DictionaryValue params;
+  params.SetString("using", "id");
+  params.SetString("value", "a");
+  params.SetDouble("ms", 1000);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kOk,
+      ExecuteWaitForElement(1, &session, &web_view, params, &result).code());
+  base::DictionaryValue param;
+  param.SetString("id", "a");
+  base::ListValue expected_args;
+  expected_args.Append(param.DeepCopy());
+  web_view.Verify("frame_id5", &expected_args, result.get());
+}
+
+TEST(CommandsTest, TimeoutInWaitForElement) {
+  Session session("id");
+  FindElementWebView web_view(true, kElementExistsTimeout);
+  session.implicit_wait = base::TimeDelta::FromSeconds(10);
+  base::DictionaryValue params;
+  params.SetString("using", "id");
+  params.SetString("value", "a");
+  params.SetDouble("ms", 2);
+  params.SetDouble("interval", 1);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kNoSuchElement,
+      ExecuteWaitForElement(50, &session, &web_view, params, &result).code());
+}
+
+TEST(CommandsTest, WaitForElementRequiresTimeout) {
+  Session session("id");
+  FindElementWebView web_view(true, kElementExistsQueryOnce);
+  base::DictionaryValue params;
+  params.SetString("using", "id");
+  params.SetString("value", "a");
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kUnknownError,
+      ExecuteWaitForElement(1, &session, &web_view, params, &result).code());
+}
+
+namespace {
+
+class ConditionWebView : public StubWebView {
+ public:
+  explicit ConditionWebView(int true_after)
+      : StubWebView("1"), true_after_(true_after), count_(0) {}
+  virtual ~ConditionWebView() {}
+
+  int count() const { return count_; }
+
+  // Overridden from WebView:
+  virtual Status CallFunction(const std::string& frame,
+                              const std::string& function,
+                              const base::ListValue& args,
+                              scoped_ptr<base::Value>* result) override {
+    ++count_;
+    if (true_after_ >= 0 && count_ > true_after_)
+      result->reset(new base::StringValue("done"));
+    else
+      result->reset(new base::FundamentalValue(0));
+    return Status(kOk);
+  }
+
+ private:
+  int true_after_;
+  int count_;
+};
+
+}  // namespace
+
+TEST(CommandsTest, SuccessfulWaitForCondition) {
+  Session session("id");
+  ConditionWebView web_view(2);
+  base::DictionaryValue params;
+  params.SetString("script", "return window.ready;");
+  params.SetDouble("ms", 1000);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kOk,
+      ExecuteWaitForCondition(1, &session, &web_view, params, &result).code());
+  ASSERT_EQ(3, web_view.count());
+  base::StringValue expected("done");
+  ASSERT_TRUE(expected.Equals(result.get()));
+}
+
+TEST(CommandsTest, TimeoutInWaitForCondition) {
+  Session session("id");
+  ConditionWebView web_view(-1);
+  base::DictionaryValue params;
+  params.SetString("script", "return false;");
+  params.SetDouble("ms", 2);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kTimeout,
+      ExecuteWaitForCondition(1, &session, &web_view, params, &result).code());
+  ASSERT_LE(1, web_view.count());
+}
+
+TEST(CommandsTest, ErrorWaitForCondition) {
+  Session session("id");
+  ErrorCallFunctionWebView web_view(kJavaScriptError);
+  base::DictionaryValue params;
+  params.SetString("script", "throw 1;");
+  params.SetDouble("ms", 1000);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kJavaScriptError,
+      ExecuteWaitForCondition(1, &session, &web_view, params, &result).code());
+}
+
+namespace {
+
+class SnapshotWebView : public StubWebView {
+ public:
+  SnapshotWebView() : StubWebView("1"), call_count_(0) {}
+  virtual ~SnapshotWebView() {}
+
+  int call_count() const { return call_count_; }
+  const std::string& function() const { return function_; }
+  const base::ListValue* args() const { return args_.get(); }
+
+  // Overridden from WebView:
+  virtual Status CallFunction(const std::string& frame,
+                              const std::string& function,
+                              const base::ListValue& args,
+                              scoped_ptr<base::Value>* result) override {
+    ++call_count_;
+    function_ = function;
+    args_.reset(args.DeepCopy());
+    scoped_ptr<base::ListValue> tag_names(new base::ListValue());
+    tag_names->AppendString("div");
+    tag_names->AppendString("span");
+    scoped_ptr<base::DictionaryValue> columns(new base::DictionaryValue());
+    columns->Set("tag_name", tag_names.release());
+    result->reset(columns.release());
+    return Status(kOk);
+  }
+
+ private:
+  int call_count_;
+  std::string function_;
+  scoped_ptr<base::ListValue> args_;
+};
+
+}  // namespace
+
+TEST(CommandsTest, GetElementsSnapshot) {
+  Session session("id");
+  SnapshotWebView web_view;
+  base::ListValue* elements = new base::ListValue();
+  base::DictionaryValue element1;
+  element1.SetString("ELEMENT", "1");
+  elements->Append(element1.DeepCopy());
+  base::DictionaryValue element2;
+  element2.SetString("ELEMENT", "2");
+  elements->Append(element2.DeepCopy());
+  base::ListValue* fields = new base::ListValue();
+  fields->AppendString("tag_name");
+  fields->AppendString("text");
+  fields->AppendString("attribute:href");
+  base::DictionaryValue params;
+  params.Set("elements", elements);
+  params.Set("fields", fields);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kOk,
+      ExecuteGetElementsSnapshot(
+          1, &session, &web_view, params, &result).code());
+  ASSERT_EQ(1, web_view.call_count());
+
+  // Only the atoms needed by the fields are sent.
+  const std::string& function = web_view.function();
+  EXPECT_NE(std::string::npos, function.find(
+      webdriver::atoms::asString(webdriver::atoms::GET_TEXT)));
+  EXPECT_NE(std::string::npos, function.find(
+      webdriver::atoms::asString(webdriver::atoms::GET_ATTRIBUTE)));
+  EXPECT_EQ(std::string::npos, function.find(
+      webdriver::atoms::asString(webdriver::atoms::IS_DISPLAYED)));
+  base::ListValue expected_args;
+  expected_args.Append(elements->DeepCopy());
+  expected_args.Append(fields->DeepCopy());
+  EXPECT_TRUE(expected_args.Equals(web_view.args()));
+
+  base::DictionaryValue* snapshot;
+  ASSERT_TRUE(result->GetAsDictionary(&snapshot));
+  base::ListValue* result_elements;
+  ASSERT_TRUE(snapshot->GetList("elements", &result_elements));
+  EXPECT_TRUE(elements->Equals(result_elements));
+  base::ListValue* tag_names;
+  ASSERT_TRUE(snapshot->GetList("fields.tag_name", &tag_names));
+  std::string tag_name;
+  ASSERT_TRUE(tag_names->GetString(1, &tag_name));
+  EXPECT_EQ("span", tag_name);
+}
+
+TEST(CommandsTest, GetElementsSnapshotWithUnknownField) {
+  Session session("id");
+  SnapshotWebView web_view;
+  base::ListValue* fields = new base::ListValue();
+  fields->AppendString("colour");
+  base::DictionaryValue params;
+  params.Set("elements", new base::ListValue());
+  params.Set("fields", fields);
+  scoped_ptr<base::Value> result;
+  ASSERT_EQ(
+      kUnknownError,
+      ExecuteGetElementsSnapshot(
+          1, &session, &web_view, params, &result).code());
+  ASSERT_EQ(0, web_view.call_count());
+}
+
+namespace {
+
+// Defines registered scripts in a single document, like a page would.
+class RegisteredScriptWebView : public StubWebView {
+ public:
+  RegisteredScriptWebView() : StubWebView("1"), defined_(false) {}
+  virtual ~RegisteredScriptWebView() {}
+
+  void Navigate() { defined_ = false; }
+
+  const std::vector<std::string>& functions() const { return functions_; }
+
+  // Overridden from WebView:
+  virtual Status CallFunction(const std::string& frame,
+                              const std::string& function,
+                              const base::ListValue& args,
+                              scoped_ptr<base::Value>* result) override {
+    functions_.push_back(function);
+    if (function.find("return 1 + 1;") != std::string::npos)
+      defined_ = true;
+    if (defined_) {
+      result->reset(new base::FundamentalValue(2));
+    } else {
+      const std::string kHandlePrefix = "var handle = '";
+      std::string handle = function.substr(
+          function.find(kHandlePrefix) + kHandlePrefix.length(), 40);
+      scoped_ptr<base::DictionaryValue> missing(new base::DictionaryValue());
+      missing->SetString("$xwalkdriver_missing_script_", handle);
+      result->reset(missing.release());
+    }
+    return Status(kOk);
+  }
+
+ private:
+  bool defined_;
+  std::vector<std::string> functions_;
+};
+
+}  // namespace
+
+TEST(CommandsTest, ExecuteRegisteredScript) {
+  Session session("id");
+  RegisteredScriptWebView web_view;
+  base::DictionaryValue register_params;
+  register_params.SetString("script", "return 1 + 1;");
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kOk,
+            ExecuteRegisterScript(&session, register_params, &value).code());
+  std::string handle;
+  ASSERT_TRUE(value->GetAsString(&handle));
+  ASSERT_EQ(40u, handle.length());
+
+  // Registering the same script again returns the same handle.
+  ASSERT_EQ(kOk,
+            ExecuteRegisterScript(&session, register_params, &value).code());
+  std::string same_handle;
+  ASSERT_TRUE(value->GetAsString(&same_handle));
+  ASSERT_EQ(handle, same_handle);
+
+  base::DictionaryValue params;
+  params.SetString("handle", handle);
+  params.Set("args", new base::ListValue());
+  base::FundamentalValue expected(2);
+
+  // The first call defines the script in the document.
+  ASSERT_EQ(kOk, ExecuteExecuteRegisteredScript(
+      &session, &web_view, params, &value).code());
+  ASSERT_TRUE(expected.Equals(value.get()));
+  ASSERT_EQ(2u, web_view.functions().size());
+
+  // Later calls don't send the script again.
+  ASSERT_EQ(kOk, ExecuteExecuteRegisteredScript(
+      &session, &web_view, params, &value).code());
+  ASSERT_TRUE(expected.Equals(value.get()));
+  ASSERT_EQ(3u, web_view.functions().size());
+  ASSERT_EQ(std::string::npos,
+            web_view.functions()[2].find("return 1 + 1;"));
+
+  // A new document needs the script to be defined again.
+  web_view.Navigate();
+  ASSERT_EQ(kOk, ExecuteExecuteRegisteredScript(
+      &session, &web_view, params, &value).code());
+  ASSERT_TRUE(expected.Equals(value.get()));
+  ASSERT_EQ(5u, web_view.functions().size());
+}
+
+TEST(CommandsTest, ExecuteUnregisteredScript) {
+  Session session("id");
+  RegisteredScriptWebView web_view;
+  base::DictionaryValue params;
+  params.SetString("handle", "unknown");
+  params.Set("args", new base::ListValue());
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kUnknownError, ExecuteExecuteRegisteredScript(
+      &session, &web_view, params, &value).code());
+  ASSERT_EQ(0u, web_view.functions().size());
+}
+
+namespace {
+
+// Records the input events dispatched to it, in the batches they arrive in.
+class ActionsWebView : public StubWebView {
+ public:
+  ActionsWebView()
+      : StubWebView("1"), scroll_count_(0), dispatch_status_(kOk) {}
+  virtual ~ActionsWebView() {}
+
+  void set_dispatch_status(const Status& status) { dispatch_status_ = status; }
+  int scroll_count() const { return scroll_count_; }
+  const std::vector<std::list<MouseEvent> >& mouse_batches() const {
+    return mouse_batches_;
+  }
+  const std::vector<std::list<TouchEvent> >& touch_batches() const {
+    return touch_batches_;
+  }
+
+  // Overridden from WebView:
+  virtual Status CallFunction(const std::string& frame,
+                              const std::string& function,
+                              const base::ListValue& args,
+                              scoped_ptr<base::Value>* result) override {
+    // The page is scrolled down by 100 pixels.
+    scroll_count_++;
+    scoped_ptr<base::DictionaryValue> view(new base::DictionaryValue());
+    view->SetInteger("view_x", 0);
+    view->SetInteger("view_y", 100);
+    view->SetInteger("view_width", 1000);
+    view->SetInteger("view_height", 1000);
+    result->reset(view.release());
+    return Status(kOk);
+  }
+
+  virtual Status DispatchMouseEvents(const std::list<MouseEvent>& events,
+                                     const std::string& frame) override {
+    mouse_batches_.push_back(events);
+    return dispatch_status_;
+  }
+
+  virtual Status DispatchTouchEvents(
+      const std::list<TouchEvent>& events) override {
+    touch_batches_.push_back(events);
+    return dispatch_status_;
+  }
+
+ private:
+  int scroll_count_;
+  Status dispatch_status_;
+  std::vector<std::list<MouseEvent> > mouse_batches_;
+  std::vector<std::list<TouchEvent> > touch_batches_;
+};
+
+base::DictionaryValue* CreateAction(const std::string& type) {
+  base::DictionaryValue* action = new base::DictionaryValue();
+  action->SetString("type", type);
+  return action;
+}
+
+base::DictionaryValue* CreateMouseMove(int x_offset, int y_offset) {
+  base::DictionaryValue* action = CreateAction("mouseMove");
+  action->SetInteger("xoffset", x_offset);
+  action->SetInteger("yoffset", y_offset);
+  return action;
+}
+
+base::DictionaryValue* CreateTouchAction(const std::string& type,
+                                         int x,
+                                         int y) {
+  base::DictionaryValue* action = CreateAction(type);
+  action->SetInteger("x", x);
+  action->SetInteger("y", y);
+  return action;
+}
+
+}  // namespace
+
+TEST(CommandsTest, PerformActionsDispatchesUntimedActionsTogether) {
+  Session session("id");
+  ActionsWebView web_view;
+  base::ListValue* actions = new base::ListValue();
+  actions->Append(CreateMouseMove(10, 20));
+  actions->Append(CreateAction("mouseDown"));
+  actions->Append(CreateMouseMove(30, 0));
+  actions->Append(CreateAction("mouseUp"));
+  base::DictionaryValue params;
+  params.Set("actions", actions);
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kOk,
+            ExecutePerformActions(&session, &web_view, params, &value).code());
+
+  ASSERT_EQ(1u, web_view.mouse_batches().size());
+  const std::list<MouseEvent>& events = web_view.mouse_batches()[0];
+  ASSERT_EQ(4u, events.size());
+  std::list<MouseEvent>::const_iterator it = events.begin();
+  ASSERT_EQ(kMovedMouseEventType, it->type);
+  ASSERT_EQ(10, it->x);
+  ASSERT_EQ(20, it->y);
+  ++it;
+  ASSERT_EQ(kPressedMouseEventType, it->type);
+  ASSERT_EQ(kLeftMouseButton, it->button);
+  ++it;
+  ASSERT_EQ(kMovedMouseEventType, it->type);
+  ASSERT_EQ(40, it->x);
+  ASSERT_EQ(20, it->y);
+  ++it;
+  ASSERT_EQ(kReleasedMouseEventType, it->type);
+  ASSERT_EQ(40, it->x);
+  ASSERT_EQ(20, it->y);
+  ASSERT_EQ(40, session.mouse_position.x);
+  ASSERT_EQ(20, session.mouse_position.y);
+}
+
+TEST(CommandsTest, PerformActionsSplitsGestureAtDurations) {
+  Session session("id");
+  ActionsWebView web_view;
+  base::ListValue* actions = new base::ListValue();
+  actions->Append(CreateTouchAction("touchDown", 100, 200));
+  base::DictionaryValue* timed_move = CreateTouchAction("touchMove", 110, 200);
+  timed_move->SetInteger("duration", 1);
+  actions->Append(timed_move);
+  actions->Append(CreateTouchAction("touchMove", 120, 200));
+  actions->Append(CreateTouchAction("touchUp", 120, 200));
+  base::DictionaryValue params;
+  params.Set("actions", actions);
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kOk,
+            ExecutePerformActions(&session, &web_view, params, &value).code());
+
+  // The coordinates are scrolled into view once, for the whole gesture.
+  ASSERT_EQ(1, web_view.scroll_count());
+  ASSERT_EQ(0u, web_view.mouse_batches().size());
+  ASSERT_EQ(2u, web_view.touch_batches().size());
+  const std::list<TouchEvent>& first = web_view.touch_batches()[0];
+  ASSERT_EQ(2u, first.size());
+  ASSERT_EQ(kTouchStart, first.front().type);
+  ASSERT_EQ(100, first.front().x);
+  ASSERT_EQ(100, first.front().y);
+  ASSERT_EQ(kTouchMove, first.back().type);
+  ASSERT_EQ(110, first.back().x);
+  const std::list<TouchEvent>& second = web_view.touch_batches()[1];
+  ASSERT_EQ(2u, second.size());
+  ASSERT_EQ(kTouchMove, second.front().type);
+  ASSERT_EQ(kTouchEnd, second.back().type);
+  ASSERT_EQ(120, second.back().x);
+  ASSERT_EQ(100, second.back().y);
+}
+
+TEST(CommandsTest, PerformActionsKeepsMousePositionIfDispatchFails) {
+  Session session("id");
+  session.mouse_position = WebPoint(5, 5);
+  ActionsWebView web_view;
+  web_view.set_dispatch_status(Status(kUnknownError));
+  base::ListValue* actions = new base::ListValue();
+  actions->Append(CreateMouseMove(10, 20));
+  actions->Append(CreateAction("mouseDown"));
+  base::DictionaryValue params;
+  params.Set("actions", actions);
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kUnknownError,
+            ExecutePerformActions(&session, &web_view, params, &value).code());
+  ASSERT_EQ(1u, web_view.mouse_batches().size());
+  ASSERT_EQ(5, session.mouse_position.x);
+  ASSERT_EQ(5, session.mouse_position.y);
+}
+
+TEST(CommandsTest, PerformActionsStopsIfTouchDispatchFails) {
+  Session session("id");
+  ActionsWebView web_view;
+  web_view.set_dispatch_status(Status(kUnknownError));
+  base::ListValue* actions = new base::ListValue();
+  actions->Append(CreateTouchAction("touchDown", 100, 200));
+  actions->Append(CreateMouseMove(10, 20));
+  base::DictionaryValue params;
+  params.Set("actions", actions);
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kUnknownError,
+            ExecutePerformActions(&session, &web_view, params, &value).code());
+  ASSERT_EQ(1u, web_view.touch_batches().size());
+  ASSERT_EQ(0u, web_view.mouse_batches().size());
+  ASSERT_EQ(0, session.mouse_position.x);
+  ASSERT_EQ(0, session.mouse_position.y);
+}
+
+TEST(CommandsTest, PerformActionsValidatesAllActionsFirst) {
+  Session session("id");
+  ActionsWebView web_view;
+  base::ListValue* actions = new base::ListValue();
+  actions->Append(CreateAction("mouseDown"));
+  actions->Append(CreateAction("fly"));
+  base::DictionaryValue params;
+  params.Set("actions", actions);
+  scoped_ptr<base::Value> value;
+  ASSERT_EQ(kUnknownError,
+            ExecutePerformActions(&session, &web_view, params, &value).code());
+  ASSERT_EQ(0u, web_view.mouse_batches().size());
+}
@@ -4,15 +4,93 @@
 
 """Writes C++ header/cc source files for embedding resources into C++."""
 
+import hashlib
 import os
+import re
+
+
+def WriteIfChanged(path, contents):
+  """Writes |contents| to |path| unless the file already has that content.
+
+  Leaving an unchanged file untouched keeps its timestamp, so nothing that
+  depends on it is rebuilt.
+
+  Returns:
+      Whether the file was written.
+  """
+  digest = hashlib.sha1(contents).hexdigest()
+  if os.path.exists(path):
+    with open(path, 'rb') as f:
+      if hashlib.sha1(f.read()).hexdigest() == digest:
+        return False
+  with open(path, 'wb') as f:
+    f.write(contents)
+  return True
+
+
+def AddBuildOptions(parser):
+  """Adds the --depfile and --stamp options to an optparse parser."""
+  parser.add_option(
+      '', '--stamp', type='string',
+      help='File to touch once the sources are up to date')
+  parser.add_option(
+      '', '--depfile', type='string',
+      help='Makefile-style file listing the inputs of the stamp file')
+
+
+def WriteBuildOutputs(options, inputs):
+  """Writes the stamp and depfile requested by AddBuildOptions options.
+
+  Args:
+      options: The parsed options.
+      inputs: Paths of the files the generated sources were made from,
+          including the calling script and the modules it uses. This module
+          is added to them.
+  """
+  if options.depfile:
+    if not options.stamp:
+      raise ValueError('--depfile requires --stamp')
+    # Modules may have been loaded from their compiled .pyc files.
+    deps = sorted(set(os.path.abspath(re.sub(r'\.pyc$', '.py', path))
+                      for path in list(inputs) + [__file__]))
+    WriteIfChanged(options.depfile, '%s: %s\n' % (
+        options.stamp.replace(' ', '\\ '),
+        ' '.join(dep.replace(' ', '\\ ') for dep in deps)))
+  if options.stamp:
+    with open(options.stamp, 'w'):
+      pass
+
+
+def _ByteArrayLines(contents):
+  """Returns the lines of a C array initializer for a NUL-terminated string.
+
+  Bytes above 0x7f are written as character literals: char may be signed or
+  unsigned, and an int it can't represent is a narrowing error in C++11.
+  """
+  lines = []
+  line = '   '
+  for byte in bytearray(contents) + bytearray(1):
+    if byte > 0x7f:
+      value = "'\\x%02x'," % byte
+    else:
+      value = '%d,' % byte
+    if len(line) + len(value) > 80:
+      lines.append(line)
+      line = '   '
+    line += value
+  lines.append(line)
+  return lines
 
 
 def WriteSource(base_name,
                 dir_from_src,
                 output_dir,
-                global_string_map):
+                global_string_map,
+                as_bytes=False):
   """Writes C++ header/cc source files for the given map of string variables.
 
+  Files whose content would not change are left untouched.
+
   Args:
       base_name: The basename of the file, without the extension.
       dir_from_src: Path from src to the directory that will contain the file,
@@ -20,6 +98,11 @@ def WriteSource(base_name,
       output_dir: Directory to output the sources to.
       global_string_map: Map of variable names to their string values. These
           variables will be available as globals.
+      as_bytes: Whether to define the strings as byte array initializers,
+          which are more compact than string literals and compile faster.
+
+  Returns:
+      Whether any of the files were written.
   """
   copyright = '\n'.join([
       '// Copyright 2013 The Chromium Authors. All rights reserved.',
@@ -29,7 +112,7 @@ def WriteSource(base_name,
 
   # Write header file.
   externs = []
-  for name in global_string_map.iterkeys():
+  for name in sorted(global_string_map.iterkeys()):
     externs += ['extern const char %s[];' % name]
 
   temp = '_'.join(dir_from_src.split('/') + [base_name])
@@ -45,16 +128,19 @@ def WriteSource(base_name,
       '#endif  // ' + define])
   header += '\n'
 
-  with open(os.path.join(output_dir, base_name + '.h'), 'w') as f:
-    f.write(header)
+  changed = WriteIfChanged(os.path.join(output_dir, base_name + '.h'), header)
 
   # Write cc file.
   def EscapeLine(line):
     return line.replace('\\', '\\\\').replace('"', '\\"')
 
   definitions = []
-  for name, contents in global_string_map.iteritems():
+  for name, contents in sorted(global_string_map.iteritems()):
     lines = []
+    if as_bytes:
+      definitions += ['const char %s[] = {\n%s};' % (
+          name, '\n'.join(_ByteArrayLines(contents)))]
+      continue
     if '\n' not in contents:
       lines = ['    "%s"' % EscapeLine(contents)]
     else:
@@ -70,5 +156,5 @@ def WriteSource(base_name,
       '\n'.join(definitions)])
   cc += '\n'
 
-  with open(os.path.join(output_dir, base_name + '.cc'), 'w') as f:
-    f.write(cc)
+  changed |= WriteIfChanged(os.path.join(output_dir, base_name + '.cc'), cc)
+  return changed
@@ -4,8 +4,11 @@
 
 #include "xwalk/test/xwalkdriver/element_util.h"
 
+#include <algorithm>
 #include <list>
+#include <set>
 
+#include "base/basictypes.h"
 #include "base/strings/string_number_conversions.h"
 #include "base/strings/string_util.h"
 #include "base/strings/stringprintf.h"
@@ -23,6 +26,85 @@ namespace {
 
 const char kElementKey[] = "ELEMENT";
 
+// Observes DOM mutations of the document of the frame it runs in, and returns
+// whether any happened since it was last run. The first run in a document
+// installs the observer and returns true, so that mutations made before it
+// was installed are not missed. Returns null if mutations can't be observed.
+const char kCheckDomChangedScript[] =
+    "function() {"
+    "  var doc = document;"
+    "  if (!doc.$xwalk_domObserver) {"
+    "    if (!window.MutationObserver)"
+    "      return null;"
+    "    doc.$xwalk_domObserver = new MutationObserver(function() {"
+    "      doc.$xwalk_domChanged = true;"
+    "    });"
+    "    doc.$xwalk_domObserver.observe(doc, {"
+    "        childList: true, subtree: true, attributes: true,"
+    "        characterData: true});"
+    "    doc.$xwalk_domChanged = true;"
+    "  }"
+    "  var changed = doc.$xwalk_domChanged;"
+    "  doc.$xwalk_domChanged = false;"
+    "  return changed;"
+    "}";
+
+// Disconnects the observer installed by |kCheckDomChangedScript| and removes
+// its properties from the document.
+const char kStopCheckingDomScript[] =
+    "function() {"
+    "  var doc = document;"
+    "  if (doc.$xwalk_domObserver)"
+    "    doc.$xwalk_domObserver.disconnect();"
+    "  delete doc.$xwalk_domObserver;"
+    "  delete doc.$xwalk_domChanged;"
+    "}";
+
+// The first delay between two checks for DOM mutations while waiting for an
+// element. It doubles after every check, up to the poll interval of the wait,
+// and isn't reset when the DOM changes, so a page that keeps mutating isn't
+// searched more and more often.
+const int kMinDomCheckIntervalMs = 5;
+
+// Stops the DOM mutation checks of an element wait when it goes out of scope,
+// if any check was made.
+class ScopedDomCheck {
+ public:
+  ScopedDomCheck(Session* session, WebView* web_view)
+      : session_(session), web_view_(web_view), checked_(false) {}
+
+  ~ScopedDomCheck() {
+    if (!checked_)
+      return;
+    scoped_ptr<base::Value> result;
+    // The document may be gone, along with its observer.
+    web_view_->CallFunction(session_->GetCurrentFrameId(),
+                            kStopCheckingDomScript, base::ListValue(),
+                            &result);
+  }
+
+  // Sets |dom_changed| to whether the DOM changed since the last check.
+  Status Check(bool* dom_changed) {
+    checked_ = true;
+    scoped_ptr<base::Value> changed;
+    Status status = web_view_->CallFunction(
+        session_->GetCurrentFrameId(), kCheckDomChangedScript,
+        base::ListValue(), &changed);
+    if (status.IsError())
+      return status;
+    *dom_changed = false;
+    changed->GetAsBoolean(dom_changed);
+    return Status(kOk);
+  }
+
+ private:
+  Session* session_;
+  WebView* web_view_;
+  bool checked_;
+
+  DISALLOW_COPY_AND_ASSIGN(ScopedDomCheck);
+};
+
 bool ParseFromValue(base::Value* value, WebPoint* point) {
   base::DictionaryValue* dict_value;
   if (!value->GetAsDictionary(&dict_value))
@@ -207,6 +289,24 @@ Status GetElementBorder(
   return Status(kOk);
 }
 
+struct SnapshotAtom {
+  const char* kind;
+  const char* const* atom;
+};
+
+// Snapshot field kinds read with webdriver atoms. The others are read by
+// getElementsSnapshot itself.
+const SnapshotAtom kSnapshotAtoms[] = {
+  {"text", webdriver::atoms::GET_TEXT},
+  {"displayed", webdriver::atoms::IS_DISPLAYED},
+  {"enabled", webdriver::atoms::IS_ENABLED},
+  {"selected", webdriver::atoms::IS_SELECTED},
+  {"location", webdriver::atoms::GET_LOCATION},
+  {"size", webdriver::atoms::GET_SIZE},
+  {"attribute", webdriver::atoms::GET_ATTRIBUTE},
+  {"css", webdriver::atoms::GET_EFFECTIVE_STYLE},
+};
+
 }  // namespace
 
 base::DictionaryValue* CreateElement(const std::string& element_id) {
@@ -230,6 +330,20 @@ Status FindElement(
     WebView* web_view,
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value) {
+  return FindElementWithTimeout(interval_ms, only_one, root_element_id,
+                                session->implicit_wait, session, web_view,
+                                params, value);
+}
+
+Status FindElementWithTimeout(
+    int interval_ms,
+    bool only_one,
+    const std::string* root_element_id,
+    const base::TimeDelta& timeout,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
   std::string strategy;
   if (!params.GetString("using", &strategy))
     return Status(kUnknownError, "'using' must be a string");
@@ -250,7 +364,14 @@ Status FindElement(
     arguments.Append(CreateElement(*root_element_id));
 
   base::TimeTicks start_time = base::TimeTicks::Now();
+  base::TimeTicks deadline = start_time + timeout;
+  ScopedDomCheck dom_check(session, web_view);
+  base::TimeDelta check_interval =
+      base::TimeDelta::FromMilliseconds(kMinDomCheckIntervalMs);
+  base::TimeDelta find_interval =
+      base::TimeDelta::FromMilliseconds(interval_ms);
   while (true) {
+    base::TimeTicks find_time = base::TimeTicks::Now();
     scoped_ptr<base::Value> temp;
     Status status = web_view->CallFunction(
         session->GetCurrentFrameId(), script, arguments, &temp);
@@ -273,7 +394,7 @@ Status FindElement(
       }
     }
 
-    if (base::TimeTicks::Now() - start_time >= session->implicit_wait) {
+    if (base::TimeTicks::Now() - start_time >= timeout) {
       if (only_one) {
         return Status(kNoSuchElement);
       } else {
@@ -281,7 +402,23 @@ Status FindElement(
         return Status(kOk);
       }
     }
-    base::PlatformThread::Sleep(base::TimeDelta::FromMilliseconds(interval_ms));
+
+    // Wait until the DOM changes before finding again, checking with a
+    // backoff from |kMinDomCheckIntervalMs|. The find is retried every
+    // |interval_ms| regardless, for changes that aren't mutations, such as
+    // form control states, and for pages where mutations can't be observed.
+    while (true) {
+      base::TimeTicks now = base::TimeTicks::Now();
+      if (now >= deadline || now - find_time >= find_interval)
+        break;
+      base::PlatformThread::Sleep(
+          std::min(check_interval,
+                   std::min(deadline, find_time + find_interval) - now));
+      check_interval = std::min(check_interval * 2, find_interval);
+      bool dom_changed = false;
+      if (dom_check.Check(&dom_changed).IsError() || dom_changed)
+        break;
+    }
   }
 
   return Status(kUnknownError);
@@ -438,6 +575,46 @@ Status GetElementRegion(
   return Status(kOk);
 }
 
+Status GetElementsSnapshot(
+    Session* session,
+    WebView* web_view,
+    const base::ListValue& elements,
+    const base::ListValue& fields,
+    scoped_ptr<base::Value>* value) {
+  // Only the atoms needed by |fields| are sent, since they are large.
+  std::set<std::string> kinds;
+  std::string atoms;
+  for (size_t i = 0; i < fields.GetSize(); ++i) {
+    std::string field;
+    if (!fields.GetString(i, &field))
+      return Status(kUnknownError, "'fields' must be a list of strings");
+    std::string kind = field.substr(0, field.find(':'));
+    if (kind == "tag_name" || kind == "rect" || kind == "value")
+      continue;
+    size_t j = 0;
+    while (j < arraysize(kSnapshotAtoms) && kind != kSnapshotAtoms[j].kind)
+      ++j;
+    if (j == arraysize(kSnapshotAtoms))
+      return Status(kUnknownError, "unknown snapshot field: " + field);
+    if (kinds.insert(kind).second) {
+      atoms += "'" + kind + "': " +
+          webdriver::atoms::asString(kSnapshotAtoms[j].atom) + ",";
+    }
+  }
+
+  base::ListValue args;
+  args.Append(elements.DeepCopy());
+  args.Append(fields.DeepCopy());
+  std::string script = base::StringPrintf(
+      "function(elements, fields) {"
+      "  return (%s)(elements, fields, {%s});"
+      "}",
+      kGetElementsSnapshotScript,
+      atoms.c_str());
+  return web_view->CallFunction(
+      session->GetCurrentFrameId(), script, args, value);
+}
+
 Status GetElementTagName(
     Session* session,
     WebView* web_view,
@@ -13,6 +13,7 @@
 namespace base {
 class DictionaryValue;
 class ListValue;
+class TimeDelta;
 class Value;
 }
 
@@ -34,6 +35,18 @@ Status FindElement(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Like FindElement, but waits up to |timeout| for a matching element instead
+// of the session's implicit wait.
+Status FindElementWithTimeout(
+    int interval_ms,
+    bool only_one,
+    const std::string* root_element_id,
+    const base::TimeDelta& timeout,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 Status GetActiveElement(
     Session* session,
     WebView* web_view,
@@ -79,6 +92,15 @@ Status GetElementRegion(
     const std::string& element_id,
     WebRect* rect);
 
+// Reads |fields| of all |elements| with a single script call. Sets |value| to
+// a dictionary mapping each field to the list of its values, one per element.
+Status GetElementsSnapshot(
+    Session* session,
+    WebView* web_view,
+    const base::ListValue& elements,
+    const base::ListValue& fields,
+    scoped_ptr<base::Value>* value);
+
 Status GetElementTagName(
     Session* session,
     WebView* web_view,
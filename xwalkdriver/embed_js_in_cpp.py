@@ -10,6 +10,9 @@ function (e.g., evaluate_script.js should contain an evaluateScript function).
 This is called the exported function of the script. The entire script will be
 put into a C-style string in the form of an anonymous function which invokes
 the exported function when called.
+
+With --minify, comments and redundant whitespace are stripped from the scripts,
+which reduces what is injected into the page on every call.
 """
 
 import optparse
@@ -17,6 +20,7 @@ import os
 import sys
 
 import cpp_source
+import js_minifier
 
 
 def main():
@@ -24,6 +28,13 @@ def main():
   parser.add_option(
       '', '--directory', type='string', default='.',
       help='Path to directory where the cc/h js file should be created')
+  parser.add_option(
+      '', '--minify', action='store_true', default=False,
+      help='Strip comments and whitespace from the scripts')
+  parser.add_option(
+      '', '--bytes', action='store_true', default=False,
+      help='Define the scripts as byte arrays rather than string literals')
+  cpp_source.AddBuildOptions(parser)
   options, args = parser.parse_args()
 
   global_string_map = {}
@@ -33,12 +44,20 @@ def main():
     script_name = 'k%sScript' % base_name
     with open(js_file, 'r') as f:
       contents = f.read()
-    script = 'function() { %s; return %s.apply(null, arguments) }' % (
-        contents, func_name)
+    if options.minify:
+      contents = js_minifier.Minify(contents)
+      script = 'function(){%s;return %s.apply(null,arguments)}' % (
+          contents, func_name)
+    else:
+      script = 'function() { %s; return %s.apply(null, arguments) }' % (
+          contents, func_name)
     global_string_map[script_name] = script
 
   cpp_source.WriteSource('js', 'xwalk/test/xwalkdriver/xwalk',
-                         options.directory, global_string_map)
+                         options.directory, global_string_map,
+                         as_bytes=options.bytes)
+  cpp_source.WriteBuildOutputs(
+      options, args + [__file__, js_minifier.__file__])
 
 
 if __name__ == '__main__':
@@ -17,6 +17,10 @@ def main():
   parser.add_option(
       '', '--directory', type='string', default='.',
       help='Path to directory where the cc/h  file should be created')
+  parser.add_option(
+      '', '--bytes', action='store_true', default=False,
+      help='Define the files as byte arrays rather than string literals')
+  cpp_source.AddBuildOptions(parser)
   options, args = parser.parse_args()
 
   global_string_map = {}
@@ -28,7 +32,9 @@ def main():
     global_string_map[var_name] = contents
 
   cpp_source.WriteSource('user_data_dir', 'xwalk/test/xwalkdriver/xwalk',
-                         options.directory, global_string_map)
+                         options.directory, global_string_map,
+                         as_bytes=options.bytes)
+  cpp_source.WriteBuildOutputs(options, args + [__file__])
 
 
 if __name__ == '__main__':
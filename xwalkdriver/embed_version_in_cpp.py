@@ -22,6 +22,7 @@ def main():
   parser.add_option(
       '', '--directory', type='string', default='.',
       help='Path to directory where the cc/h  file should be created')
+  cpp_source.AddBuildOptions(parser)
   options, args = parser.parse_args()
 
   version = open(options.version_file, 'r').read().strip()
@@ -32,9 +33,14 @@ def main():
   global_string_map = {
       'kXwalkDriverVersion': version
   }
+  # version.h only declares kXwalkDriverVersion, so it is left untouched when
+  # the revision changes and only the tiny version.cc is recompiled.
   cpp_source.WriteSource('version',
                          'xwalk/test/xwalkdriver',
                          options.directory, global_string_map)
+  cpp_source.WriteBuildOutputs(
+      options, [options.version_file, __file__,
+                os.path.splitext(lastchange.__file__)[0] + '.py'])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,57 @@
+// Copyright (c) 2013 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+/**
+ * Reads the given fields of every element in a single call.
+ *
+ * A field is a kind, optionally followed by a colon and a name, such as
+ * 'text' or 'attribute:href'. Kinds other than tag_name, rect and value are
+ * read with the webdriver atom of the same kind.
+ *
+ * @param {!Array.<!Element>} elements The elements to read.
+ * @param {!Array.<string>} fields The fields to read.
+ * @param {!Object.<string, function(...[*]): *>} atoms The atoms needed by
+ *     the fields, keyed by kind.
+ * @return {!Object.<string, !Array.<*>>} The values of each field, in the
+ *     order of |elements|.
+ */
+function getElementsSnapshot(elements, fields, atoms) {
+  function getReader(field) {
+    var separator = field.indexOf(':');
+    var kind = separator < 0 ? field : field.substring(0, separator);
+    var name = separator < 0 ? null : field.substring(separator + 1);
+    if (kind == 'tag_name') {
+      return function(element) { return element.tagName.toLowerCase(); };
+    } else if (kind == 'rect') {
+      return function(element) {
+        var box = element.getBoundingClientRect();
+        return {
+            'left': box.left,
+            'top': box.top,
+            'width': box.width,
+            'height': box.height
+        };
+      };
+    } else if (kind == 'value') {
+      return function(element) {
+        return element.value === undefined ? null : element.value;
+      };
+    } else if (atoms[kind]) {
+      if (name === null)
+        return function(element) { return atoms[kind](element); };
+      return function(element) { return atoms[kind](element, name); };
+    }
+    throw new Error('unknown snapshot field: ' + field);
+  }
+
+  var columns = {};
+  for (var i = 0; i < fields.length; i++) {
+    var read = getReader(fields[i]);
+    var column = [];
+    for (var j = 0; j < elements.length; j++)
+      column.push(read(elements[j]));
+    columns[fields[i]] = column;
+  }
+  return columns;
+}
@@ -0,0 +1,125 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Conservative JavaScript minifier for the scripts embedded in XwalkDriver.
+
+Comments are removed and whitespace is collapsed; nothing is renamed. A line
+break is kept wherever automatic semicolon insertion could depend on it.
+"""
+
+import re
+
+_IDENTIFIER_CHARS = re.compile(r'[A-Za-z0-9_$\\]')
+_WHITESPACE = re.compile(r'\s+')
+# A '/' after one of these characters starts a regular expression literal.
+_REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = re.compile(
+    r'(?:^|[^A-Za-z0-9_$])(?:return|typeof|instanceof|in|of|new|delete|void|'
+    r'throw|case|do|else)$')
+# A line break after one of these characters, or before one of the closing
+# characters, never ends a statement. Postfix '++' and '--' are exceptions:
+# a line break after them does.
+_NO_BREAK_AFTER = frozenset('{[(,;:=&|?+-*%<>!~^')
+_NO_BREAK_BEFORE = frozenset('}])=,.;:?&|')
+_INCREMENT_OPERATORS = (['+', '+'], ['-', '-'])
+
+
+def _IsIdentifierChar(char):
+  return bool(char) and _IDENTIFIER_CHARS.match(char) is not None
+
+
+def _ScanQuoted(source, pos):
+  """Returns the index after the string literal starting at |pos|."""
+  quote = source[pos]
+  pos += 1
+  while source[pos] != quote:
+    if source[pos] == '\\':
+      pos += 1
+    elif source[pos] == '\n' and quote != '`':
+      raise ValueError('unterminated string literal')
+    pos += 1
+  return pos + 1
+
+
+def _ScanRegex(source, pos):
+  """Returns the index after the regular expression literal at |pos|."""
+  pos += 1
+  in_class = False
+  while in_class or source[pos] != '/':
+    char = source[pos]
+    if char == '\\':
+      pos += 1
+    elif char == '[':
+      in_class = True
+    elif char == ']':
+      in_class = False
+    elif char == '\n':
+      raise ValueError('unterminated regular expression literal')
+    pos += 1
+  pos += 1
+  while pos < len(source) and _IsIdentifierChar(source[pos]):
+    pos += 1
+  return pos
+
+
+def _StartsRegex(output):
+  text = ''.join(output[-12:]).rstrip()
+  if not text:
+    return True
+  return text[-1] in _REGEX_PRECEDERS or bool(_REGEX_KEYWORDS.search(text))
+
+
+def Minify(source):
+  """Returns |source| without comments and redundant whitespace."""
+  output = []
+  pending_space = None
+  pos = 0
+  length = len(source)
+  while pos < length:
+    char = source[pos]
+    next_char = source[pos + 1] if pos + 1 < length else ''
+    if char.isspace():
+      end = _WHITESPACE.match(source, pos).end()
+      if pending_space != '\n':
+        pending_space = '\n' if '\n' in source[pos:end] else ' '
+      pos = end
+      continue
+    if char == '/' and next_char == '/':
+      end = source.find('\n', pos)
+      pos = length if end < 0 else end
+      continue
+    if char == '/' and next_char == '*':
+      end = source.find('*/', pos + 2)
+      if end < 0:
+        raise ValueError('unterminated comment')
+      if pending_space != '\n':
+        pending_space = '\n' if '\n' in source[pos:end] else ' '
+      pos = end + 2
+      continue
+
+    if char in '\'"`':
+      end = _ScanQuoted(source, pos)
+    elif char == '/' and _StartsRegex(output):
+      end = _ScanRegex(source, pos)
+    else:
+      end = pos + 1
+    token = source[pos:end]
+
+    if pending_space and output:
+      previous = output[-1][-1]
+      if pending_space == '\n':
+        if ((previous not in _NO_BREAK_AFTER or
+             output[-2:] in _INCREMENT_OPERATORS) and
+            token[0] not in _NO_BREAK_BEFORE):
+          output.append('\n')
+        elif ((_IsIdentifierChar(previous) and _IsIdentifierChar(token[0])) or
+              (previous in '+-' and token[0] == previous)):
+          output.append(' ')
+      elif ((_IsIdentifierChar(previous) and _IsIdentifierChar(token[0])) or
+            (previous in '+-/' and token[0] == previous)):
+        output.append(' ')
+    pending_space = None
+    output.append(token)
+    pos = end
+  return ''.join(output)
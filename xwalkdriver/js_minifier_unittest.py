@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tests for js_minifier.py."""
+
+import unittest
+
+import js_minifier
+
+
+class MinifyTest(unittest.TestCase):
+
+  def _AssertMinified(self, expected, source):
+    self.assertEqual(expected, js_minifier.Minify(source))
+
+  def testRemovesComments(self):
+    self._AssertMinified('a=1;b=2;', 'a = 1;  // one\n/* two */ b = 2;')
+
+  def testKeepsStringsAndRegexes(self):
+    self._AssertMinified("a='x  // y';b=/ +\\/*/g;",
+                         "a = 'x  // y';  b = / +\\/*/g;")
+
+  def testKeepsSpaceBetweenIdentifiers(self):
+    self._AssertMinified('var a=typeof b;', 'var  a = typeof   b;')
+
+  def testKeepsSpaceBetweenAdditionAndUnaryPlus(self):
+    self._AssertMinified('a+ +b;c- -d;', 'a + +b; c - -d;')
+
+  def testDropsLineBreakInsideExpression(self):
+    self._AssertMinified('a=b+c;', 'a = b +\n    c;')
+    self._AssertMinified('f(a,b);', 'f(a,\n  b);')
+
+  def testKeepsLineBreakAfterStatementWithoutSemicolon(self):
+    self._AssertMinified('var a=1\nfoo()', 'var a = 1\nfoo()')
+
+  def testKeepsLineBreakAfterReturn(self):
+    self._AssertMinified('return\nvalue', 'return\nvalue')
+
+  def testKeepsLineBreakAfterPostfixIncrement(self):
+    self._AssertMinified('var i=0\ni++\nfoo()', 'var i = 0\ni++\nfoo()')
+
+  def testKeepsLineBreakAfterPostfixDecrement(self):
+    self._AssertMinified('a--\nc()', 'a--\nc()')
+
+  def testKeepsLineBreakBeforePrefixIncrement(self):
+    self._AssertMinified('a\n++b', 'a\n++b')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -134,21 +134,72 @@ bool WebDriverLog::NameToLevel(const std::string& name, Log::Level* out_level) {
   return false;
 }
 
+const size_t WebDriverLog::kDefaultMaxEntries = 100000;
+const size_t WebDriverLog::kDefaultMaxBytes = 64 * 1024 * 1024;
+
+WebDriverLog::Entry::Entry(base::DictionaryValue* value, size_t size)
+    : value(value), size(size) {}
+
 WebDriverLog::WebDriverLog(const std::string& type, Log::Level min_level)
-    : type_(type), min_level_(min_level), entries_(new base::ListValue()) {
+    : type_(type),
+      min_level_(min_level),
+      first_entry_number_(0),
+      bytes_(0),
+      max_entries_(kDefaultMaxEntries),
+      max_bytes_(kDefaultMaxBytes),
+      dropped_count_(0) {
 }
 
 WebDriverLog::~WebDriverLog() {
   VLOG(1) << "Log type '" << type_ << "' lost "
-          << entries_->GetSize() << " entries on destruction";
+          << entries_.size() << " entries on destruction";
+  while (!entries_.empty())
+    PopFrontEntry();
 }
 
 scoped_ptr<base::ListValue> WebDriverLog::GetAndClearEntries() {
-  scoped_ptr<base::ListValue> ret(entries_.release());
-  entries_.reset(new base::ListValue());
+  scoped_ptr<base::ListValue> ret(new base::ListValue());
+  for (std::deque<Entry>::const_iterator it = entries_.begin();
+       it != entries_.end(); ++it) {
+    ret->Append(it->value);
+  }
+  first_entry_number_ += entries_.size();
+  entries_.clear();
+  bytes_ = 0;
+  dropped_count_ = 0;
   return ret.Pass();
 }
 
+scoped_ptr<base::ListValue> WebDriverLog::GetEntriesSince(uint64 since,
+                                                          size_t max_entries,
+                                                          uint64* next,
+                                                          uint64* dropped) {
+  while (!entries_.empty() && first_entry_number_ < since)
+    PopFrontEntry();
+  *dropped = since < first_entry_number_ ? first_entry_number_ - since : 0;
+
+  size_t count = entries_.size();
+  if (max_entries && max_entries < count)
+    count = max_entries;
+  scoped_ptr<base::ListValue> ret(new base::ListValue());
+  for (size_t i = 0; i < count; ++i)
+    ret->Append(entries_[i].value->DeepCopy());
+  *next = first_entry_number_ + count;
+  return ret.Pass();
+}
+
+void WebDriverLog::SetBufferLimits(size_t max_entries, size_t max_bytes) {
+  max_entries_ = max_entries;
+  max_bytes_ = max_bytes;
+}
+
+void WebDriverLog::PopFrontEntry() {
+  delete entries_.front().value;
+  bytes_ -= entries_.front().size;
+  entries_.pop_front();
+  ++first_entry_number_;
+}
+
 void WebDriverLog::AddEntryTimestamped(const base::Time& timestamp,
                                        Log::Level level,
                                        const std::string& source,
@@ -163,7 +214,18 @@ void WebDriverLog::AddEntryTimestamped(const base::Time& timestamp,
   if (!source.empty())
     log_entry_dict->SetString("source", source);
   log_entry_dict->SetString("message", message);
-  entries_->Append(log_entry_dict.release());
+  // Estimate the size of the entry by its strings and a fixed overhead.
+  size_t size = 64 + source.size() + message.size();
+  entries_.push_back(Entry(log_entry_dict.release(), size));
+  bytes_ += size;
+
+  // Drop the oldest entries once full, but always keep the newest one.
+  while (entries_.size() > 1 &&
+         ((max_entries_ && entries_.size() > max_entries_) ||
+          (max_bytes_ && bytes_ > max_bytes_))) {
+    PopFrontEntry();
+    ++dropped_count_;
+  }
 }
 
 const std::string& WebDriverLog::type() const {
@@ -178,6 +240,10 @@ Log::Level WebDriverLog::min_level() const {
   return min_level_;
 }
 
+uint64 WebDriverLog::dropped_count() const {
+  return dropped_count_;
+}
+
 bool InitLogging() {
   InitLogging(&InternalIsVLogOn);
   g_start_time = base::TimeTicks::Now().ToInternalValue();
@@ -233,6 +299,8 @@ Status CreateLogs(const Capabilities& capabilities,
     if (type == WebDriverLog::kPerformanceType) {
       if (level != Log::kOff) {
         WebDriverLog* log = new WebDriverLog(type, Log::kAll);
+        log->SetBufferLimits(capabilities.log_buffer_entries,
+                             capabilities.log_buffer_bytes);
         logs.push_back(log);
         listeners.push_back(new PerformanceLogger(log));
       }
@@ -248,6 +316,8 @@ Status CreateLogs(const Capabilities& capabilities,
   // Create "browser" log -- should always exist.
   WebDriverLog* browser_log =
       new WebDriverLog(WebDriverLog::kBrowserType, browser_log_level);
+  browser_log->SetBufferLimits(capabilities.log_buffer_entries,
+                               capabilities.log_buffer_bytes);
   logs.push_back(browser_log);
   // If the level is OFF, don't even bother listening for DevTools events.
   if (browser_log_level != Log::kOff)
@@ -5,6 +5,7 @@
 #ifndef XWALK_TEST_XWALKDRIVER_LOGGING_H_
 #define XWALK_TEST_XWALKDRIVER_LOGGING_H_
 
+#include <deque>
 #include <string>
 
 #include "base/basictypes.h"
@@ -26,6 +27,10 @@ class WebDriverLog : public Log {
   static const char kDriverType[];
   static const char kPerformanceType[];
 
+  // Default limits of the number and estimated size of buffered entries.
+  static const size_t kDefaultMaxEntries;
+  static const size_t kDefaultMaxBytes;
+
   // Converts WD wire protocol level name -> Level, false on bad name.
   static bool NameToLevel(const std::string& name, Level* out_level);
 
@@ -37,8 +42,24 @@ class WebDriverLog : public Log {
   // into the wire protocol response to the "/log" command.
   // The caller assumes ownership of the ListValue, and the WebDriverLog
   // creates and owns a new empty ListValue for further accumulation.
+  // Resets dropped_count(), since the entries it counts were cleared too.
   scoped_ptr<base::ListValue> GetAndClearEntries();
 
+  // Returns up to |max_entries| entries, or all if it is 0, starting at the
+  // entry numbered |since|. Entries are numbered from 0 in the order they are
+  // added. Entries before |since| are considered read and are discarded.
+  // Sets |next| to the number of the first entry not returned, and |dropped|
+  // to the number of entries from |since| on that were dropped unread
+  // because the buffer was full.
+  scoped_ptr<base::ListValue> GetEntriesSince(uint64 since,
+                                              size_t max_entries,
+                                              uint64* next,
+                                              uint64* dropped);
+
+  // Limits the buffered entries. Once either limit is exceeded, the oldest
+  // entries are dropped. A limit of 0 means no limit.
+  void SetBufferLimits(size_t max_entries, size_t max_bytes);
+
   // Translates a Log entry level into a WebDriver level and stores the entry.
   virtual void AddEntryTimestamped(const base::Time& timestamp,
                                    Level level,
@@ -49,10 +70,28 @@ class WebDriverLog : public Log {
   void set_min_level(Level min_level);
   Level min_level() const;
 
+  // Returns the number of entries dropped because the buffer was full, since
+  // the last call to GetAndClearEntries.
+  uint64 dropped_count() const;
+
  private:
+  struct Entry {
+    Entry(base::DictionaryValue* value, size_t size);
+
+    base::DictionaryValue* value;  // Owned.
+    size_t size;  // Estimated size of |value| in bytes.
+  };
+
+  void PopFrontEntry();
+
   const std::string type_;  // WebDriver log type.
   Level min_level_;  // Minimum level of entries to store.
-  scoped_ptr<base::ListValue> entries_;  // Accumulated entries.
+  std::deque<Entry> entries_;  // Accumulated entries, oldest first.
+  uint64 first_entry_number_;  // Number of the oldest buffered entry.
+  size_t bytes_;  // Estimated size of the buffered entries.
+  size_t max_entries_;
+  size_t max_bytes_;
+  uint64 dropped_count_;
 
   DISALLOW_COPY_AND_ASSIGN(WebDriverLog);
 };
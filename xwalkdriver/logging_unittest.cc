@@ -135,3 +135,64 @@ TEST(Logging, DefaultLogs) {
   ASSERT_EQ(1u, listeners.size());
   ASSERT_EQ("browser", logs[0]->type());
 }
+
+TEST(WebDriverLog, BufferLimits) {
+  WebDriverLog log("type", Log::kAll);
+  log.SetBufferLimits(2, 0);
+  log.AddEntry(Log::kInfo, "1");
+  log.AddEntry(Log::kInfo, "2");
+  log.AddEntry(Log::kInfo, "3");
+  ASSERT_EQ(1u, log.dropped_count());
+
+  scoped_ptr<base::ListValue> entries(log.GetAndClearEntries());
+  ASSERT_EQ(2u, entries->GetSize());
+  ValidateLogEntry(entries.get(), 0, "INFO", "2");
+  ValidateLogEntry(entries.get(), 1, "INFO", "3");
+  // Getting the entries resets the count of dropped ones.
+  ASSERT_EQ(0u, log.dropped_count());
+
+  // The newest entry is kept even if it is over the byte limit.
+  log.SetBufferLimits(0, 1);
+  log.AddEntry(Log::kInfo, "4");
+  log.AddEntry(Log::kInfo, "5");
+  ASSERT_EQ(1u, log.dropped_count());
+  entries = log.GetAndClearEntries();
+  ASSERT_EQ(1u, entries->GetSize());
+  ValidateLogEntry(entries.get(), 0, "INFO", "5");
+}
+
+TEST(WebDriverLog, GetEntriesSince) {
+  WebDriverLog log("type", Log::kAll);
+  log.AddEntry(Log::kInfo, "0");
+  log.AddEntry(Log::kInfo, "1");
+  log.AddEntry(Log::kInfo, "2");
+
+  uint64 next;
+  uint64 dropped;
+  scoped_ptr<base::ListValue> entries(
+      log.GetEntriesSince(0, 2, &next, &dropped));
+  ASSERT_EQ(2u, entries->GetSize());
+  ValidateLogEntry(entries.get(), 0, "INFO", "0");
+  ASSERT_EQ(2u, next);
+  ASSERT_EQ(0u, dropped);
+
+  // Entries are kept until a later cursor is passed.
+  entries = log.GetEntriesSince(0, 0, &next, &dropped);
+  ASSERT_EQ(3u, entries->GetSize());
+  ASSERT_EQ(3u, next);
+
+  entries = log.GetEntriesSince(2, 0, &next, &dropped);
+  ASSERT_EQ(1u, entries->GetSize());
+  ValidateLogEntry(entries.get(), 0, "INFO", "2");
+  ASSERT_EQ(3u, next);
+
+  // Entries dropped before being read are counted.
+  log.SetBufferLimits(1, 0);
+  log.AddEntry(Log::kInfo, "3");
+  log.AddEntry(Log::kInfo, "4");
+  entries = log.GetEntriesSince(3, 0, &next, &dropped);
+  ASSERT_EQ(1u, entries->GetSize());
+  ValidateLogEntry(entries.get(), 0, "INFO", "4");
+  ASSERT_EQ(5u, next);
+  ASSERT_EQ(1u, dropped);
+}
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Replays recorded client traffic against a XwalkDriver server.
+
+Recordings are made by passing a traffic_recorder.TrafficRecorder to the
+client. Every recorded session is replayed on its own connection, |concurrency|
+times at once, keeping the recorded delays between commands divided by the
+time compression. Session and element ids are mapped to the ones returned by
+the server during the replay.
+
+Reports the throughput, latency percentiles and error rates, overall and for
+each command, to find the load at which a server saturates.
+"""
+
+import httplib
+import json
+import optparse
+import os
+import re
+import sys
+import threading
+import time
+import urlparse
+
+_THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(_THIS_DIR, 'client'))
+
+import traffic_recorder
+
+_SESSION_PATH = re.compile(r'^/session/([^/]+)')
+# Keys whose values are element ids in request bodies: "ELEMENT" in element
+# references, as in script arguments, and "element" in the parameters of
+# moveto and of the actions of PERFORM_ACTIONS.
+_ELEMENT_ID_KEYS = ('ELEMENT', 'element')
+
+
+def GroupBySession(records):
+  """Splits records into the sessions they belong to.
+
+  Returns:
+    A list of lists of records, in the order the sessions were started.
+    Commands outside of any session, such as status requests, form their own
+    group.
+  """
+  groups = {}
+  order = []
+  for record in records:
+    if record['m'] == 'POST' and record['p'] == '/session':
+      key = record.get('sid')
+    else:
+      match = _SESSION_PATH.match(record['p'])
+      key = match.group(1) if match else None
+    if key not in groups:
+      groups[key] = []
+      order.append(key)
+    groups[key].append(record)
+  return [groups[key] for key in order]
+
+
+class _Stats(object):
+  """Latencies and errors of replayed commands."""
+
+  def __init__(self):
+    self.latencies = []
+    self.http_errors = 0
+    self.status_mismatches = 0
+
+  def Add(self, latency, http_error, status_mismatch):
+    self.latencies.append(latency)
+    self.http_errors += int(http_error)
+    self.status_mismatches += int(status_mismatch)
+
+  def Merge(self, other):
+    self.latencies.extend(other.latencies)
+    self.http_errors += other.http_errors
+    self.status_mismatches += other.status_mismatches
+
+  def ToDict(self):
+    latencies = sorted(self.latencies)
+    count = len(latencies)
+
+    def Percentile(percent):
+      if not count:
+        return 0.0
+      return latencies[min(count - 1, int(count * percent / 100.0))] * 1000
+
+    return {
+        'count': count,
+        'p50_ms': Percentile(50),
+        'p90_ms': Percentile(90),
+        'p99_ms': Percentile(99),
+        'max_ms': latencies[-1] * 1000 if count else 0.0,
+        'http_error_rate': float(self.http_errors) / count if count else 0.0,
+        'status_mismatch_rate':
+            float(self.status_mismatches) / count if count else 0.0,
+    }
+
+
+class _SessionReplayer(object):
+  """Replays the commands of one recorded session on its own connection."""
+
+  def __init__(self, host, port, records, start_time, time_zero,
+               time_compression):
+    self._connection = httplib.HTTPConnection(host, port, timeout=300)
+    self._records = records
+    self._start_time = start_time
+    self._time_zero = time_zero
+    self._time_compression = time_compression
+    self._ids = {}
+    self.stats = {}
+
+  def _MapIds(self, value):
+    """Returns |value| with the recorded element ids in it replaced."""
+    if isinstance(value, dict):
+      return dict(
+          (key, self._ids.get(item, item)
+           if key in _ELEMENT_ID_KEYS and isinstance(item, basestring)
+           else self._MapIds(item))
+          for key, item in value.iteritems())
+    if isinstance(value, list):
+      return [self._MapIds(item) for item in value]
+    return value
+
+  def _Request(self, method, path, body):
+    self._connection.request(method, path, body,
+                             {'Connection': 'keep-alive'})
+    response = self._connection.getresponse()
+    data = response.read()
+    if response.status == 303:
+      return self._Request('GET', response.getheader('location'), None)
+    return response.status, data
+
+  def _Replay(self, record):
+    path = '/'.join(self._ids.get(part, part)
+                    for part in record['p'].split('/'))
+    body = record['b']
+    if body:
+      # Encoded, so that httplib sends it in the same packet as the headers.
+      body = json.dumps(self._MapIds(json.loads(body))).encode('utf-8')
+    start = time.time()
+    try:
+      http_status, data = self._Request(record['m'], path, body)
+    except (httplib.HTTPException, IOError):
+      self._connection.close()
+      return time.time() - start, True, True
+    latency = time.time() - start
+    if http_status != 200:
+      return latency, True, True
+    response = json.loads(data)
+    if record.get('sid') and response.get('sessionId'):
+      self._ids[record['sid']] = response['sessionId']
+    for old, new in zip(record.get('e', []),
+                        traffic_recorder.GetElementIds(data)):
+      self._ids[old] = new
+    mismatch = (record['s'] is not None and
+                response.get('status') != record['s'])
+    return latency, False, mismatch
+
+  def Run(self):
+    for record in self._records:
+      if self._time_compression:
+        delay = (self._start_time - time.time() +
+                 (record['t'] - self._time_zero) / self._time_compression)
+        if delay > 0:
+          time.sleep(delay)
+      latency, http_error, mismatch = self._Replay(record)
+      self.stats.setdefault(record['c'], _Stats()).Add(
+          latency, http_error, mismatch)
+    self._connection.close()
+
+
+def Replay(server_url, records, concurrency=1, time_compression=1.0):
+  """Replays records against a server.
+
+  Args:
+    server_url: the URL of the server, such as http://127.0.0.1:9515.
+    records: the records of a recording.
+    concurrency: how many times to replay each session at once.
+    time_compression: the factor to divide recorded delays by, or 0 to send
+                      every command as soon as the previous one completes.
+
+  Returns:
+    A dict with the overall results and the results of each command.
+  """
+  parsed = urlparse.urlparse(server_url)
+  records = list(records)
+  if not records:
+    raise ValueError('empty recording')
+  time_zero = min(record['t'] for record in records)
+  start_time = time.time()
+  replayers = [
+      _SessionReplayer(parsed.hostname, parsed.port, group, start_time,
+                       time_zero, time_compression)
+      for group in GroupBySession(records) for _ in range(concurrency)]
+  threads = [threading.Thread(target=replayer.Run) for replayer in replayers]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  elapsed = time.time() - start_time
+
+  total = _Stats()
+  commands = {}
+  for replayer in replayers:
+    for name, stats in replayer.stats.items():
+      commands.setdefault(name, _Stats()).Merge(stats)
+      total.Merge(stats)
+  result = total.ToDict()
+  result.update({
+      'sessions': len(replayers),
+      'seconds': elapsed,
+      'commands_per_second': result['count'] / elapsed if elapsed else 0.0,
+      'commands': dict((name, stats.ToDict())
+                       for name, stats in commands.items()),
+  })
+  return result
+
+
+def main():
+  parser = optparse.OptionParser(usage='%prog [options] RECORDING')
+  parser.add_option(
+      '', '--server-url', type='string', default='http://127.0.0.1:9515',
+      help='URL of the server to replay the recording against')
+  parser.add_option(
+      '', '--concurrency', type='int', default=1,
+      help='Number of times to replay each recorded session at once')
+  parser.add_option(
+      '', '--time-compression', type='float', default=1.0,
+      help='Factor to divide recorded delays by, 0 to send without delays')
+  parser.add_option(
+      '', '--output-json', type='string',
+      help='File to write the results to, as JSON')
+  options, args = parser.parse_args()
+  if len(args) != 1:
+    parser.error('A recording must be given')
+
+  result = Replay(options.server_url,
+                  traffic_recorder.ReadRecording(args[0]),
+                  options.concurrency, options.time_compression)
+  print '%d commands in %d sessions, %.1fs: %.0f commands/s' % (
+      result['count'], result['sessions'], result['seconds'],
+      result['commands_per_second'])
+  print '%-36s %7s %8s %8s %8s %8s %7s %7s' % (
+      'command', 'count', 'p50(ms)', 'p90(ms)', 'p99(ms)', 'max(ms)',
+      'http%', 'status%')
+  rows = sorted(result['commands'].items(), key=lambda item: item[0])
+  for name, stats in rows + [('TOTAL', result)]:
+    print '%-36s %7d %8.2f %8.2f %8.2f %8.2f %7.2f %7.2f' % (
+        name, stats['count'], stats['p50_ms'], stats['p90_ms'],
+        stats['p99_ms'], stats['max_ms'], stats['http_error_rate'] * 100,
+        stats['status_mismatch_rate'] * 100)
+
+  if options.output_json:
+    with open(options.output_json, 'w') as f:
+      json.dump(result, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Benchmarks the XwalkDriver python client against a stub server.
+
+No browser is needed: every benchmark starts a server/stub_server.py
+configured for its workload, so only the client and the wire protocol are
+measured. For each benchmark, the number of commands per second, the p50 and
+p99 command latencies and the peak memory of the process are reported. Every
+benchmark runs in its own process, so that its peak memory isn't that of an
+earlier benchmark.
+"""
+
+import json
+import optparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+try:
+  import resource
+except ImportError:
+  resource = None  # Not available on Windows.
+
+_THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(_THIS_DIR, 'client'))
+sys.path.insert(0, os.path.join(_THIS_DIR, 'server'))
+
+import command_metrics
+import stub_server
+import xwalkdriver
+from command_executor import Command
+
+
+class _NullFile(object):
+  def write(self, data):
+    pass
+
+
+class _Recorder(object):
+  """Collects the latency of every command executed by a benchmark."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.latencies = []
+    self.registry = command_metrics.MetricsRegistry()
+    self.registry.AddListener(self._OnCommand)
+
+  def _OnCommand(self, timing):
+    with self._lock:
+      self.latencies.append(
+          timing.serialize + timing.network + timing.deserialize)
+
+  def Percentile(self, percent):
+    latencies = sorted(self.latencies)
+    if not latencies:
+      return 0.0
+    index = min(len(latencies) - 1, int(len(latencies) * percent / 100.0))
+    return latencies[index]
+
+
+def _FindElementStorm(url, options, recorder):
+  driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+  for _ in range(options.iterations):
+    driver.FindElement('css selector', 'div')
+    driver.FindElements('css selector', 'div')
+  driver.Quit()
+
+
+def _ElementInteraction(url, options, recorder):
+  driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+  element = driver.FindElement('css selector', 'div')
+  for _ in range(options.iterations):
+    element.GetText()
+    element.Click()
+    element.GetLocation()
+  driver.Quit()
+
+
+def _BatchedInteraction(url, options, recorder):
+  driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+  elements = driver.FindElements('css selector', 'div')
+  for _ in range(max(1, options.iterations / 10)):
+    results = driver.ExecuteBatch(
+        [(Command.GET_ELEMENT_TEXT, {'id': element._id})
+         for element in elements])
+    for result in results:
+      result.Get()
+  driver.Quit()
+
+
+def _LargeScriptResults(url, options, recorder):
+  driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+  for _ in range(max(1, options.iterations / 10)):
+    driver.ExecuteScript('return document.body.innerHTML')
+  driver.Quit()
+
+
+def _Screenshots(url, options, recorder):
+  driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+  for _ in range(max(1, options.iterations / 10)):
+    driver.SaveScreenshot(_NullFile())
+  driver.Quit()
+
+
+def _ConcurrentSessions(url, options, recorder):
+  errors = []
+
+  def RunSession():
+    try:
+      driver = xwalkdriver.XwalkDriver(url, metrics=recorder.registry)
+      for _ in range(max(1, options.iterations / options.sessions)):
+        driver.Load('about:blank')
+        driver.FindElement('css selector', 'div')
+        driver.GetTitle()
+      driver.Quit()
+    except Exception as e:
+      errors.append(e)
+
+  threads = [threading.Thread(target=RunSession)
+             for _ in range(options.sessions)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  if errors:
+    raise errors[0]
+
+
+# Benchmarks as (name, function, stub server config) tuples.
+_BENCHMARKS = [
+    ('find_element_storm', _FindElementStorm,
+     dict(element_count=50)),
+    ('element_interaction', _ElementInteraction, {}),
+    ('batched_interaction', _BatchedInteraction, {}),
+    ('large_script_results', _LargeScriptResults,
+     dict(script_result_kb=1024)),
+    ('chunked_script_results', _LargeScriptResults,
+     dict(script_result_kb=1024, chunked=True)),
+    ('screenshots', _Screenshots,
+     dict(screenshot_kb=2048)),
+    ('concurrent_sessions', _ConcurrentSessions, {}),
+]
+
+
+def _GetPeakMemoryMb():
+  """Returns the peak memory of the process, or None if it is unknown."""
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin':
+    return peak / (1024.0 * 1024.0)
+  return peak / 1024.0
+
+
+def RunBenchmark(name, function, config, options):
+  """Runs a benchmark against its own stub server and returns its results."""
+  server = stub_server.StubServer(
+      stub_server.StubConfig(latency_ms=options.latency_ms, **config))
+  server.Start()
+  recorder = _Recorder()
+  try:
+    start = time.time()
+    function(server.GetUrl(), options, recorder)
+    elapsed = time.time() - start
+  finally:
+    server.Stop()
+  commands = len(recorder.latencies)
+  return {
+      'name': name,
+      'commands': commands,
+      'seconds': elapsed,
+      'commands_per_second': commands / elapsed if elapsed else 0.0,
+      'p50_ms': recorder.Percentile(50) * 1000,
+      'p99_ms': recorder.Percentile(99) * 1000,
+      'peak_memory_mb': _GetPeakMemoryMb(),
+      'per_command': recorder.registry.ToDict(),
+  }
+
+
+def _RunBenchmarkProcess(name, options):
+  """Runs a benchmark in a new process and returns its results."""
+  process = subprocess.Popen(
+      [sys.executable, os.path.abspath(__file__),
+       '--benchmark-process', name,
+       '--iterations', str(options.iterations),
+       '--sessions', str(options.sessions),
+       '--latency-ms', str(options.latency_ms)],
+      stdout=subprocess.PIPE)
+  output, _ = process.communicate()
+  if process.returncode:
+    raise RuntimeError('Benchmark %s failed with exit code %d' % (
+        name, process.returncode))
+  return json.loads(output)
+
+
+def main():
+  parser = optparse.OptionParser()
+  parser.add_option(
+      '', '--filter', type='string', default='.',
+      help='Regular expression selecting the benchmarks to run')
+  parser.add_option(
+      '', '--iterations', type='int', default=1000,
+      help='Number of iterations of each workload')
+  parser.add_option(
+      '', '--sessions', type='int', default=16,
+      help='Number of sessions run at once by concurrent_sessions')
+  parser.add_option(
+      '', '--latency-ms', type='float', default=0,
+      help='Time the stub server waits before answering each command')
+  parser.add_option(
+      '', '--output-json', type='string',
+      help='File to write the results to, as JSON')
+  parser.add_option(
+      '', '--benchmark-process', type='string', help=optparse.SUPPRESS_HELP)
+  options, _ = parser.parse_args()
+
+  if options.benchmark_process:
+    for name, function, config in _BENCHMARKS:
+      if name == options.benchmark_process:
+        json.dump(RunBenchmark(name, function, config, options), sys.stdout)
+        return 0
+    raise RuntimeError('Unknown benchmark %s' % options.benchmark_process)
+
+  results = []
+  print '%-22s %9s %9s %9s %9s %9s' % (
+      'benchmark', 'commands', 'cmds/s', 'p50(ms)', 'p99(ms)', 'peak(MB)')
+  for name, function, config in _BENCHMARKS:
+    if not re.search(options.filter, name):
+      continue
+    result = _RunBenchmarkProcess(name, options)
+    results.append(result)
+    peak_memory = result['peak_memory_mb']
+    print '%-22s %9d %9.0f %9.3f %9.3f %9s' % (
+        name, result['commands'], result['commands_per_second'],
+        result['p50_ms'], result['p99_ms'],
+        'n/a' if peak_memory is None else '%.1f' % peak_memory)
+    sys.stdout.flush()
+
+  if options.output_json:
+    with open(options.output_json, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
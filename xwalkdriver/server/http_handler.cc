@@ -24,7 +24,7 @@
 #include "xwalk/test/xwalkdriver/net/port_server.h"
 #include "xwalk/test/xwalkdriver/net/url_request_context_getter.h"
 #include "xwalk/test/xwalkdriver/session.h"
-#include "xwalk/test/xwalkdriver/session_thread_map.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
 #include "xwalk/test/xwalkdriver/util.h"
 #include "xwalk/test/xwalkdriver/version.h"
 #include "xwalk/test/xwalkdriver/xwalk/device_manager.h"
@@ -47,6 +47,23 @@ void UnimplementedCommand(
   callback.Run(Status(kUnknownCommand), scoped_ptr<base::Value>(), session_id);
 }
 
+scoped_ptr<base::DictionaryValue> CreateBatchResult(
+    const Status& status,
+    scoped_ptr<base::Value> value) {
+  if (status.IsError()) {
+    scoped_ptr<base::DictionaryValue> error(new base::DictionaryValue());
+    error->SetString("message", status.message());
+    value.reset(error.release());
+  }
+  if (!value)
+    value.reset(base::Value::CreateNullValue());
+
+  scoped_ptr<base::DictionaryValue> result(new base::DictionaryValue());
+  result->SetInteger("status", status.code());
+  result->Set("value", value.release());
+  return result.Pass();
+}
+
 }  // namespace
 
 CommandMapping::CommandMapping(HttpMethod method,
@@ -60,16 +77,21 @@ HttpHandler::HttpHandler(const std::string& url_base)
     : url_base_(url_base),
       received_shutdown_(false),
       command_map_(new CommandMap()),
+      session_worker_pool_(SessionWorkerPool::kDefaultMaxThreads,
+                           SessionWorkerPool::kDefaultMaxQueuedCommands),
       weak_ptr_factory_(this) {}
 
 HttpHandler::HttpHandler(
     const base::Closure& quit_func,
     const scoped_refptr<base::SingleThreadTaskRunner> io_task_runner,
     const std::string& url_base,
-    scoped_ptr<PortServer> port_server)
+    scoped_ptr<PortServer> port_server,
+    size_t session_threads,
+    size_t max_queued_commands)
     : quit_func_(quit_func),
       url_base_(url_base),
       received_shutdown_(false),
+      session_worker_pool_(session_threads, max_queued_commands),
       weak_ptr_factory_(this) {
 #if defined(OS_MACOSX)
   base::mac::ScopedNSAutoreleasePool autorelease_pool;
@@ -89,7 +111,7 @@ HttpHandler::HttpHandler(
           kPost,
           internal::kNewSessionPathPattern,
           base::Bind(&ExecuteCreateSession,
-                     &session_thread_map_,
+                     &session_worker_pool_,
                      WrapToCommand(
                          "InitSession",
                          base::Bind(&ExecuteInitSession,
@@ -105,7 +127,7 @@ HttpHandler::HttpHandler(
       CommandMapping(kDelete,
                      "session/:sessionId",
                      base::Bind(&ExecuteSessionCommand,
-                                &session_thread_map_,
+                                &session_worker_pool_,
                                 "Quit",
                                 base::Bind(&ExecuteQuit, false),
                                 true)),
@@ -185,6 +207,21 @@ HttpHandler::HttpHandler(
           kGet,
           "session/:sessionId/chromium/heap_snapshot",
           WrapToCommand("HeapSnapshot", base::Bind(&ExecuteTakeHeapSnapshot))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/chromium/heap_snapshot_file",
+          WrapToCommand("HeapSnapshotToFile",
+                        base::Bind(&ExecuteTakeHeapSnapshotToFile))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/chromium/heap_snapshot_file/:id/read",
+          WrapToCommand("ReadHeapSnapshotFile",
+                        base::Bind(&ExecuteReadHeapSnapshotFile))),
+      CommandMapping(
+          kDelete,
+          "session/:sessionId/chromium/heap_snapshot_file/:id",
+          WrapToCommand("DeleteHeapSnapshotFile",
+                        base::Bind(&ExecuteDeleteHeapSnapshotFile))),
       CommandMapping(kPost,
                      "session/:sessionId/visible",
                      base::Bind(&UnimplementedCommand)),
@@ -491,6 +528,11 @@ HttpHandler::HttpHandler(
       CommandMapping(kPost,
                      "session/:sessionId/touch/move",
                      WrapToCommand("TouchMove", base::Bind(&ExecuteTouchMove))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/actions",
+          WrapToCommand("PerformActions",
+                        base::Bind(&ExecutePerformActions))),
       CommandMapping(kPost,
                      "session/:sessionId/touch/scroll",
                      base::Bind(&UnimplementedCommand)),
@@ -511,7 +553,9 @@ HttpHandler::HttpHandler(
                      WrapToCommand("GetLogTypes",
                                    base::Bind(&ExecuteGetAvailableLogTypes))),
       CommandMapping(kPost, "logs", base::Bind(&UnimplementedCommand)),
-      CommandMapping(kGet, "status", base::Bind(&ExecuteGetStatus)),
+      CommandMapping(kGet,
+                     "status",
+                     base::Bind(&ExecuteGetStatus, &session_worker_pool_)),
 
       // Custom Xwalk commands:
       // Allow quit all to be called with GET or POST.
@@ -520,16 +564,55 @@ HttpHandler::HttpHandler(
           kShutdownPath,
           base::Bind(&ExecuteQuitAll,
                      WrapToCommand("QuitAll", base::Bind(&ExecuteQuit, true)),
-                     &session_thread_map_)),
+                     &session_worker_pool_)),
       CommandMapping(
           kPost,
           kShutdownPath,
           base::Bind(&ExecuteQuitAll,
                      WrapToCommand("QuitAll", base::Bind(&ExecuteQuit, true)),
-                     &session_thread_map_)),
+                     &session_worker_pool_)),
+      CommandMapping(
+          kDelete,
+          "session/:sessionId/browser_cookies",
+          WrapToCommand("DeleteAllBrowserCookies",
+                        base::Bind(&ExecuteDeleteAllBrowserCookies))),
       CommandMapping(kGet,
                      "session/:sessionId/is_loading",
                      WrapToCommand("IsLoading", base::Bind(&ExecuteIsLoading))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/script/register",
+          WrapToCommand("RegisterScript",
+                        base::Bind(&ExecuteRegisterScript))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/script/:handle/execute",
+          WrapToCommand("ExecuteRegisteredScript",
+                        base::Bind(&ExecuteExecuteRegisteredScript))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/elements/snapshot",
+          WrapToCommand("GetElementsSnapshot",
+                        base::Bind(&ExecuteGetElementsSnapshot, 50))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/wait/element",
+          WrapToCommand("WaitForElement",
+                        base::Bind(&ExecuteWaitForElement, 50))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/wait/condition",
+          WrapToCommand("WaitForCondition",
+                        base::Bind(&ExecuteWaitForCondition, 50))),
+      CommandMapping(
+          kPost,
+          "session/:sessionId/wait/not_loading",
+          WrapToCommand("WaitForNotLoading",
+                        base::Bind(&ExecuteWaitForNotLoading))),
+      CommandMapping(kPost,
+                     internal::kBatchPathPattern,
+                     base::Bind(&HttpHandler::ExecuteBatch,
+                                weak_ptr_factory_.GetWeakPtr())),
   };
   command_map_.reset(
       new CommandMap(commands, commands + arraysize(commands)));
@@ -565,7 +648,7 @@ Command HttpHandler::WrapToCommand(
     const char* name,
     const SessionCommand& session_command) {
   return base::Bind(&ExecuteSessionCommand,
-                    &session_thread_map_,
+                    &session_worker_pool_,
                     name,
                     session_command,
                     false);
@@ -584,26 +667,35 @@ Command HttpHandler::WrapToCommand(
                        base::Bind(&ExecuteElementCommand, element_command));
 }
 
+HttpHandler::CommandMap::const_iterator HttpHandler::FindCommand(
+    const std::string& method,
+    const std::string& trimmed_path,
+    std::string* session_id,
+    base::DictionaryValue* params) {
+  CommandMap::const_iterator iter = command_map_->begin();
+  for (; iter != command_map_->end(); ++iter) {
+    if (internal::MatchesCommand(
+            method, trimmed_path, *iter, session_id, params)) {
+      break;
+    }
+  }
+  return iter;
+}
+
 void HttpHandler::HandleCommand(
     const net::HttpServerRequestInfo& request,
     const std::string& trimmed_path,
     const HttpResponseSenderFunc& send_response_func) {
   base::DictionaryValue params;
   std::string session_id;
-  CommandMap::const_iterator iter = command_map_->begin();
-  while (true) {
-    if (iter == command_map_->end()) {
-      scoped_ptr<net::HttpServerResponseInfo> response(
-          new net::HttpServerResponseInfo(net::HTTP_NOT_FOUND));
-      response->SetBody("unknown command: " + trimmed_path, "text/plain");
-      send_response_func.Run(response.Pass());
-      return;
-    }
-    if (internal::MatchesCommand(
-            request.method, trimmed_path, *iter, &session_id, &params)) {
-      break;
-    }
-    ++iter;
+  CommandMap::const_iterator iter =
+      FindCommand(request.method, trimmed_path, &session_id, &params);
+  if (iter == command_map_->end()) {
+    scoped_ptr<net::HttpServerResponseInfo> response(
+        new net::HttpServerResponseInfo(net::HTTP_NOT_FOUND));
+    response->SetBody("unknown command: " + trimmed_path, "text/plain");
+    send_response_func.Run(response.Pass());
+    return;
   }
 
   if (request.data.length()) {
@@ -627,6 +719,97 @@ void HttpHandler::HandleCommand(
                                send_response_func));
 }
 
+void HttpHandler::ExecuteBatch(
+    const base::DictionaryValue& params,
+    const std::string& session_id,
+    const CommandCallback& callback) {
+  const base::ListValue* commands;
+  if (!params.GetList("commands", &commands)) {
+    callback.Run(Status(kUnknownError, "'commands' must be a list"),
+                 scoped_ptr<base::Value>(),
+                 session_id);
+    return;
+  }
+  ExecuteNextBatchCommand(make_scoped_ptr(commands->DeepCopy()),
+                          make_scoped_ptr(new base::ListValue()),
+                          session_id,
+                          callback);
+}
+
+void HttpHandler::ExecuteNextBatchCommand(
+    scoped_ptr<base::ListValue> commands,
+    scoped_ptr<base::ListValue> results,
+    const std::string& session_id,
+    const CommandCallback& callback) {
+  CHECK(thread_checker_.CalledOnValidThread());
+  while (results->GetSize() < commands->GetSize()) {
+    const base::DictionaryValue* command;
+    std::string method;
+    std::string path;
+    if (!commands->GetDictionary(results->GetSize(), &command) ||
+        !command->GetString("method", &method) ||
+        !command->GetString("url", &path)) {
+      results->Append(CreateBatchResult(
+          Status(kUnknownError, "batch command must have a method and url"),
+          scoped_ptr<base::Value>()).release());
+      continue;
+    }
+
+    base::DictionaryValue params;
+    std::string command_session_id;
+    CommandMap::const_iterator iter = command_map_->end();
+    if (StartsWithASCII(path, url_base_, true)) {
+      path.erase(0, url_base_.length());
+      iter = FindCommand(method, path, &command_session_id, &params);
+    }
+    if (iter == command_map_->end()) {
+      results->Append(CreateBatchResult(
+          Status(kUnknownCommand, "unknown command: " + path),
+          scoped_ptr<base::Value>()).release());
+      continue;
+    }
+    if (command_session_id != session_id ||
+        iter->path_pattern == internal::kBatchPathPattern) {
+      results->Append(CreateBatchResult(
+          Status(kUnknownError,
+                 "batch commands must be commands of the batch's session"),
+          scoped_ptr<base::Value>()).release());
+      continue;
+    }
+
+    const base::DictionaryValue* command_params;
+    if (command->GetDictionary("parameters", &command_params))
+      params.MergeDictionary(command_params);
+    // The next command is executed once this one has completed on the
+    // session thread.
+    iter->command.Run(params,
+                      session_id,
+                      base::Bind(&HttpHandler::OnBatchCommandDone,
+                                 weak_ptr_factory_.GetWeakPtr(),
+                                 base::Passed(&commands),
+                                 base::Passed(&results),
+                                 session_id,
+                                 callback));
+    return;
+  }
+  callback.Run(Status(kOk),
+               scoped_ptr<base::Value>(results.release()),
+               session_id);
+}
+
+void HttpHandler::OnBatchCommandDone(
+    scoped_ptr<base::ListValue> commands,
+    scoped_ptr<base::ListValue> results,
+    const std::string& batch_session_id,
+    const CommandCallback& callback,
+    const Status& status,
+    scoped_ptr<base::Value> value,
+    const std::string& session_id) {
+  results->Append(CreateBatchResult(status, value.Pass()).release());
+  ExecuteNextBatchCommand(
+      commands.Pass(), results.Pass(), batch_session_id, callback);
+}
+
 void HttpHandler::PrepareResponse(
     const std::string& trimmed_path,
     const HttpResponseSenderFunc& send_response_func,
@@ -693,6 +876,7 @@ scoped_ptr<net::HttpServerResponseInfo> HttpHandler::PrepareResponseHelper(
 namespace internal {
 
 const char kNewSessionPathPattern[] = "session";
+const char kBatchPathPattern[] = "session/:sessionId/batch";
 
 bool MatchesMethod(HttpMethod command_method, const std::string& method) {
   std::string lower_method = base::StringToLowerASCII(method);
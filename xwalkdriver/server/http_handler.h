@@ -20,11 +20,12 @@
 #include "xwalk/test/xwalkdriver/element_commands.h"
 #include "xwalk/test/xwalkdriver/net/sync_websocket_factory.h"
 #include "xwalk/test/xwalkdriver/session_commands.h"
-#include "xwalk/test/xwalkdriver/session_thread_map.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
 #include "xwalk/test/xwalkdriver/window_commands.h"
 
 namespace base {
 class DictionaryValue;
+class ListValue;
 class SingleThreadTaskRunner;
 }
 
@@ -61,10 +62,14 @@ typedef base::Callback<void(scoped_ptr<net::HttpServerResponseInfo>)>
 class HttpHandler {
  public:
   explicit HttpHandler(const std::string& url_base);
+  // Session commands run on at most |session_threads| threads at once, and at
+  // most |max_queued_commands| wait for one, or any number if it is 0.
   HttpHandler(const base::Closure& quit_func,
               const scoped_refptr<base::SingleThreadTaskRunner> io_task_runner,
               const std::string& url_base,
-              scoped_ptr<PortServer> port_server);
+              scoped_ptr<PortServer> port_server,
+              size_t session_threads,
+              size_t max_queued_commands);
   ~HttpHandler();
 
   void Handle(const net::HttpServerRequestInfo& request,
@@ -76,6 +81,8 @@ class HttpHandler {
   FRIEND_TEST_ALL_PREFIXES(HttpHandlerTest, HandleInvalidPost);
   FRIEND_TEST_ALL_PREFIXES(HttpHandlerTest, HandleUnimplementedCommand);
   FRIEND_TEST_ALL_PREFIXES(HttpHandlerTest, HandleCommand);
+  FRIEND_TEST_ALL_PREFIXES(HttpHandlerTest, HandleBatch);
+  FRIEND_TEST_ALL_PREFIXES(HttpHandlerTest, HandleBatchWithInvalidCommands);
   typedef std::vector<CommandMapping> CommandMap;
 
   Command WrapToCommand(const char* name,
@@ -83,9 +90,29 @@ class HttpHandler {
   Command WrapToCommand(const char* name, const WindowCommand& window_command);
   Command WrapToCommand(const char* name,
                         const ElementCommand& element_command);
+  CommandMap::const_iterator FindCommand(const std::string& method,
+                                         const std::string& trimmed_path,
+                                         std::string* session_id,
+                                         base::DictionaryValue* params);
   void HandleCommand(const net::HttpServerRequestInfo& request,
                      const std::string& trimmed_path,
                      const HttpResponseSenderFunc& send_response_func);
+  // Executes the commands of a batch one after another, and returns the
+  // status and value of each.
+  void ExecuteBatch(const base::DictionaryValue& params,
+                    const std::string& session_id,
+                    const CommandCallback& callback);
+  void ExecuteNextBatchCommand(scoped_ptr<base::ListValue> commands,
+                               scoped_ptr<base::ListValue> results,
+                               const std::string& session_id,
+                               const CommandCallback& callback);
+  void OnBatchCommandDone(scoped_ptr<base::ListValue> commands,
+                          scoped_ptr<base::ListValue> results,
+                          const std::string& batch_session_id,
+                          const CommandCallback& callback,
+                          const Status& status,
+                          scoped_ptr<base::Value> value,
+                          const std::string& session_id);
   void PrepareResponse(const std::string& trimmed_path,
                        const HttpResponseSenderFunc& send_response_func,
                        const Status& status,
@@ -103,11 +130,14 @@ class HttpHandler {
   bool received_shutdown_;
   scoped_refptr<URLRequestContextGetter> context_getter_;
   SyncWebSocketFactory socket_factory_;
-  SessionThreadMap session_thread_map_;
   scoped_ptr<CommandMap> command_map_;
   scoped_ptr<DeviceManager> device_manager_;
   scoped_ptr<PortServer> port_server_;
   scoped_ptr<PortManager> port_manager_;
+  // Declared after the managers, so that it is destroyed before them: its
+  // destructor runs the queued commands and deletes the remaining sessions,
+  // whose Xwalk instances release their devices and ports.
+  SessionWorkerPool session_worker_pool_;
 
   base::WeakPtrFactory<HttpHandler> weak_ptr_factory_;
 
@@ -117,6 +147,7 @@ class HttpHandler {
 namespace internal {
 
 extern const char kNewSessionPathPattern[];
+extern const char kBatchPathPattern[];
 
 bool MatchesCommand(const std::string& method,
                     const std::string& path,
@@ -5,6 +5,7 @@
 #include <string>
 
 #include "base/bind.h"
+#include "base/json/json_reader.h"
 #include "base/json/json_writer.h"
 #include "base/memory/scoped_ptr.h"
 #include "base/values.h"
@@ -119,6 +120,95 @@ TEST(HttpHandlerTest, HandleCommand) {
   ASSERT_STREQ(json.c_str(), response.body().c_str());
 }
 
+TEST(HttpHandlerTest, HandleBatch) {
+  HttpHandler handler("/");
+  handler.command_map_->push_back(
+      CommandMapping(kGet, "session/:sessionId/path",
+                     base::Bind(&DummyCommand, Status(kOk))));
+  handler.command_map_->push_back(
+      CommandMapping(kPost, "session/:sessionId/error",
+                     base::Bind(&DummyCommand, Status(kNoSuchElement))));
+  handler.command_map_->push_back(
+      CommandMapping(kPost, internal::kBatchPathPattern,
+                     base::Bind(&HttpHandler::ExecuteBatch,
+                                handler.weak_ptr_factory_.GetWeakPtr())));
+  net::HttpServerRequestInfo request;
+  request.method = "post";
+  request.path = "/session/session_id/batch";
+  request.data =
+      "{\"commands\": ["
+      "{\"method\": \"GET\", \"url\": \"/session/session_id/path\"},"
+      "{\"method\": \"POST\", \"url\": \"/session/session_id/error\","
+      " \"parameters\": {\"a\": 1}},"
+      "{\"method\": \"GET\", \"url\": \"/session/session_id/path\"}]}";
+  net::HttpServerResponseInfo response;
+  handler.Handle(request, base::Bind(&OnResponse, &response));
+  ASSERT_EQ(net::HTTP_OK, response.status_code());
+  scoped_ptr<base::Value> body(base::JSONReader::Read(response.body()));
+  ASSERT_TRUE(body);
+  base::DictionaryValue* body_dict;
+  ASSERT_TRUE(body->GetAsDictionary(&body_dict));
+  int status;
+  ASSERT_TRUE(body_dict->GetInteger("status", &status));
+  ASSERT_EQ(kOk, status);
+  base::ListValue* results;
+  ASSERT_TRUE(body_dict->GetList("value", &results));
+  ASSERT_EQ(3u, results->GetSize());
+  int expected_statuses[] = {kOk, kNoSuchElement, kOk};
+  for (size_t i = 0; i < results->GetSize(); ++i) {
+    base::DictionaryValue* result;
+    ASSERT_TRUE(results->GetDictionary(i, &result));
+    ASSERT_TRUE(result->GetInteger("status", &status));
+    ASSERT_EQ(expected_statuses[i], status);
+  }
+  base::DictionaryValue* first;
+  ASSERT_TRUE(results->GetDictionary(0, &first));
+  int value;
+  ASSERT_TRUE(first->GetInteger("value", &value));
+  ASSERT_EQ(1, value);
+}
+
+TEST(HttpHandlerTest, HandleBatchWithInvalidCommands) {
+  HttpHandler handler("/");
+  handler.command_map_->push_back(
+      CommandMapping(kGet, "session/:sessionId/path",
+                     base::Bind(&DummyCommand, Status(kOk))));
+  handler.command_map_->push_back(
+      CommandMapping(kPost, internal::kBatchPathPattern,
+                     base::Bind(&HttpHandler::ExecuteBatch,
+                                handler.weak_ptr_factory_.GetWeakPtr())));
+  net::HttpServerRequestInfo request;
+  request.method = "post";
+  request.path = "/session/session_id/batch";
+  request.data =
+      "{\"commands\": ["
+      "{\"url\": \"/session/session_id/path\"},"
+      "{\"method\": \"GET\", \"url\": \"/session/session_id/unknown\"},"
+      "{\"method\": \"GET\", \"url\": \"/session/other_id/path\"},"
+      "{\"method\": \"POST\", \"url\": \"/session/session_id/batch\"}]}";
+  net::HttpServerResponseInfo response;
+  handler.Handle(request, base::Bind(&OnResponse, &response));
+  ASSERT_EQ(net::HTTP_OK, response.status_code());
+  scoped_ptr<base::Value> body(base::JSONReader::Read(response.body()));
+  ASSERT_TRUE(body);
+  base::DictionaryValue* body_dict;
+  ASSERT_TRUE(body->GetAsDictionary(&body_dict));
+  base::ListValue* results;
+  ASSERT_TRUE(body_dict->GetList("value", &results));
+  ASSERT_EQ(4u, results->GetSize());
+  int expected_statuses[] = {
+      kUnknownError, kUnknownCommand, kUnknownError, kUnknownError};
+  for (size_t i = 0; i < results->GetSize(); ++i) {
+    base::DictionaryValue* result;
+    ASSERT_TRUE(results->GetDictionary(i, &result));
+    int status;
+    ASSERT_TRUE(result->GetInteger("status", &status));
+    ASSERT_EQ(expected_statuses[i], status);
+    std::string message;
+    ASSERT_TRUE(result->GetString("value.message", &message));
+  }
+}
+
 TEST(MatchesCommandTest, DiffMethod) {
   CommandMapping command(kPost, "path", base::Bind(&DummyCommand, Status(kOk)));
   std::string session_id;
@@ -4,6 +4,7 @@
 
 import atexit
 import os
+import select
 import socket
 import subprocess
 import time
@@ -25,14 +26,55 @@ class Server(object):
     if not os.path.exists(exe_path):
       raise RuntimeError('XwalkDriver exe not found at: ' + exe_path)
 
-    port = self._FindOpenPort()
-    xwalkdriver_args = [exe_path, '--port=%d' % port]
+    xwalkdriver_args = [exe_path]
     if log_path:
       xwalkdriver_args.extend(['--verbose', '--log-path=%s' % log_path])
-    self._process = subprocess.Popen(xwalkdriver_args)
+    if os.name == 'posix':
+      port = self._StartAndWaitForReadyFd(xwalkdriver_args)
+    else:
+      port = self._StartAndPollStatus(xwalkdriver_args)
+    self._url = 'http://127.0.0.1:%d' % port
+
+    atexit.register(self.Kill)
+
+  def _StartAndWaitForReadyFd(self, xwalkdriver_args, timeout=10):
+    """Starts the server on a port picked by the OS.
+
+    Blocks until the server writes the port it listens on to an inherited
+    pipe, which it does once it is ready to accept requests.
+
+    Returns:
+      The port the server listens on.
+    """
+    read_fd, write_fd = os.pipe()
+    try:
+      self._process = subprocess.Popen(
+          xwalkdriver_args + ['--port=0', '--ready-fd=%d' % write_fd])
+    finally:
+      os.close(write_fd)
+    try:
+      # If the server exits early, the pipe is closed and reads as empty.
+      readable, _, _ = select.select([read_fd], [], [], timeout)
+      ready = ''
+      if readable:
+        ready = os.read(read_fd, 64)
+    finally:
+      os.close(read_fd)
+    if not ready.endswith('\n'):
+      if self._process.poll() is None:
+        self._process.terminate()
+      raise RuntimeError('XwalkDriver server did not start')
+    return int(ready)
+
+  def _StartAndPollStatus(self, xwalkdriver_args):
+    """Starts the server on a free port and polls it until it is running.
+
+    Returns:
+      The port the server listens on.
+    """
+    port = self._FindOpenPort()
+    self._process = subprocess.Popen(xwalkdriver_args + ['--port=%d' % port])
     self._url = 'http://127.0.0.1:%d' % port
-    if self._process is None:
-      raise RuntimeError('XwalkDriver server cannot be started')
 
     max_time = time.time() + 10
     while not self.IsRunning():
@@ -40,8 +82,7 @@ class Server(object):
         self._process.terminate()
         raise RuntimeError('XwalkDriver server did not start')
       time.sleep(0.1)
-
-    atexit.register(self.Kill)
+    return port
 
   def _FindOpenPort(self):
     for port in range(9500, 10000):
@@ -0,0 +1,351 @@
+# Copyright 2013 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A stub XwalkDriver server, for measuring client overhead without Xwalk.
+
+It speaks the wire protocol of server/http_handler.cc: every response is a
+JSON object with 'status', 'sessionId' and 'value', and connections are kept
+alive and large responses can be sent with chunked transfer encoding.
+Instead of driving a browser, commands are answered after a fixed
+latency with generated values of configurable size.
+"""
+
+import base64
+import BaseHTTPServer
+import itertools
+import json
+import optparse
+import socket
+import SocketServer
+import sys
+import threading
+import time
+
+_NO_SUCH_SESSION = 6
+_NO_SUCH_ELEMENT = 7
+_UNKNOWN_COMMAND = 9
+_UNKNOWN_ERROR = 13
+
+# Chunked responses are split like server/xwalkdriver_server.cc splits them.
+_CHUNKED_RESPONSE_THRESHOLD = 256 * 1024
+_RESPONSE_CHUNK_SIZE = 64 * 1024
+
+
+class StubConfig(object):
+  """How the stub server answers commands."""
+
+  def __init__(self, latency_ms=0, element_count=10, script_result_kb=1,
+               screenshot_kb=256, page_source_kb=64, log_entries=100,
+               chunked=False):
+    """Initializes the config.
+
+    Args:
+      latency_ms: time to wait before answering each command.
+      element_count: the number of elements FindElements returns.
+      script_result_kb: the size of the string ExecuteScript returns.
+      screenshot_kb: the size of the PNG data screenshots return.
+      page_source_kb: the size of the page source.
+      log_entries: the number of entries each log request returns.
+      chunked: whether responses larger than 256 KiB are sent with chunked
+               transfer encoding, as the server sends them.
+    """
+    self.latency_ms = latency_ms
+    self.element_count = element_count
+    self.script_result_kb = script_result_kb
+    self.screenshot_kb = screenshot_kb
+    self.page_source_kb = page_source_kb
+    self.log_entries = log_entries
+    self.chunked = chunked
+
+
+class _Session(object):
+  def __init__(self, session_id):
+    self.session_id = session_id
+    self.url = 'about:blank'
+    self.element_ids = itertools.count()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  # Send each response with as few writes as possible, and without waiting
+  # for acknowledgements of the previous ones.
+  wbufsize = -1
+  disable_nagle_algorithm = True
+
+  def log_message(self, format, *args):
+    pass
+
+  def _Respond(self, status, value, session_id=None):
+    body = json.dumps(
+        {'status': status, 'sessionId': session_id, 'value': value})
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json; charset=utf-8')
+    if not (self.server.config.chunked and
+            len(body) > _CHUNKED_RESPONSE_THRESHOLD):
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+      return
+    self.send_header('Transfer-Encoding', 'chunked')
+    self.end_headers()
+    for offset in range(0, len(body), _RESPONSE_CHUNK_SIZE):
+      chunk = body[offset:offset + _RESPONSE_CHUNK_SIZE]
+      self.wfile.write('%X\r\n%s\r\n' % (len(chunk), chunk))
+    self.wfile.write('0\r\n\r\n')
+
+  def _Handle(self, method):
+    params = {}
+    length = int(self.headers.getheader('Content-Length') or 0)
+    if length:
+      params = json.loads(self.rfile.read(length))
+    server = self.server
+    server.CountRequest()
+    if server.config.latency_ms:
+      time.sleep(server.config.latency_ms / 1000.0)
+
+    path = self.path.strip('/').split('/')
+    if path == ['status']:
+      self._Respond(0, {'build': {'version': 'stub'}})
+    elif path == ['shutdown']:
+      self._Respond(0, None)
+      threading.Thread(target=server.shutdown).start()
+    elif path == ['session'] and method == 'POST':
+      session = server.NewSession()
+      self._Respond(0, params.get('desiredCapabilities', {}),
+                    session.session_id)
+    elif path[0] == 'session' and len(path) > 1:
+      session = server.GetSession(path[1])
+      if session is None:
+        self._Respond(_NO_SUCH_SESSION, {'message': 'no such session'},
+                      path[1])
+      elif len(path) == 2 and method == 'DELETE':
+        server.QuitSession(path[1])
+        self._Respond(0, None, path[1])
+      elif path[2:] == ['batch'] and method == 'POST':
+        self._Respond(0, server.ExecuteBatch(session, params['commands']),
+                      session.session_id)
+      else:
+        status, value = server.Execute(session, method, path[2:], params)
+        self._Respond(status, value, session.session_id)
+    else:
+      self._Respond(_UNKNOWN_COMMAND, {'message': 'unknown command'})
+
+  def do_GET(self):
+    self._Handle('GET')
+
+  def do_POST(self):
+    self._Handle('POST')
+
+  def do_DELETE(self):
+    self._Handle('DELETE')
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """A stub server listening on a local port, each connection on a thread."""
+
+  daemon_threads = True
+  # Accept many sessions connecting at once without dropping connections.
+  request_queue_size = 128
+
+  def __init__(self, config=None, port=0):
+    BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), _Handler)
+    self.config = config or StubConfig()
+    self._lock = threading.Lock()
+    self._sessions = {}
+    self._session_ids = itertools.count(1)
+    self._request_count = 0
+    self._connections = set()
+    self._handler_threads = set()
+    self._stopping = False
+    self._thread = None
+
+  def process_request(self, request, client_address):
+    thread = threading.Thread(target=self.process_request_thread,
+                              args=(request, client_address))
+    thread.daemon = True
+    with self._lock:
+      self._connections.add(request)
+      self._handler_threads.add(thread)
+    thread.start()
+
+  def process_request_thread(self, request, client_address):
+    try:
+      SocketServer.ThreadingMixIn.process_request_thread(
+          self, request, client_address)
+    finally:
+      with self._lock:
+        self._handler_threads.discard(threading.current_thread())
+
+  def shutdown_request(self, request):
+    with self._lock:
+      self._connections.discard(request)
+    BaseHTTPServer.HTTPServer.shutdown_request(self, request)
+
+  def handle_error(self, request, client_address):
+    # Connections shut down by Stop fail mid-request; that isn't an error.
+    if not self._stopping:
+      BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+  def Start(self):
+    """Serves requests on a background thread."""
+    self._thread = threading.Thread(target=self.serve_forever)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def Stop(self):
+    """Stops serving and closes the connections kept alive by clients.
+
+    Handler threads blocked reading the next request of a kept-alive
+    connection are woken up and joined, so none of them outlives the server.
+    """
+    self._stopping = True
+    self.shutdown()
+    self._thread.join()
+    self.server_close()
+    with self._lock:
+      connections = list(self._connections)
+      threads = list(self._handler_threads)
+    for connection in connections:
+      try:
+        connection.shutdown(socket.SHUT_RDWR)
+      except socket.error:
+        pass
+    for thread in threads:
+      thread.join()
+
+  def GetUrl(self):
+    return 'http://127.0.0.1:%d' % self.server_address[1]
+
+  def CountRequest(self):
+    with self._lock:
+      self._request_count += 1
+
+  def GetRequestCount(self):
+    with self._lock:
+      return self._request_count
+
+  def NewSession(self):
+    with self._lock:
+      session = _Session('%032x' % next(self._session_ids))
+      self._sessions[session.session_id] = session
+      return session
+
+  def GetSessionCount(self):
+    with self._lock:
+      return len(self._sessions)
+
+  def GetSession(self, session_id):
+    with self._lock:
+      return self._sessions.get(session_id)
+
+  def QuitSession(self, session_id):
+    with self._lock:
+      del self._sessions[session_id]
+
+  def _NewElement(self, session):
+    return {'ELEMENT': '%s.%d' % (session.session_id[-8:],
+                                  next(session.element_ids))}
+
+  def ExecuteBatch(self, session, commands):
+    """Answers the commands of a batch, in order.
+
+    Like server/http_handler.cc, every command must be a command of the
+    batch's session, and a failing command doesn't stop the batch.
+
+    Returns:
+      A list with a {'status', 'value'} dict for each command.
+    """
+    results = []
+    for command in commands:
+      path = command.get('url', '').strip('/').split('/')
+      if (len(path) < 3 or path[:2] != ['session', session.session_id] or
+          path[2:] == ['batch']):
+        results.append({
+            'status': _UNKNOWN_ERROR,
+            'value': {'message': 'batch commands must be commands of the '
+                                 "batch's session"}})
+        continue
+      status, value = self.Execute(session, command.get('method'), path[2:],
+                                   command.get('parameters', {}))
+      results.append({'status': status, 'value': value})
+    return results
+
+  def Execute(self, session, method, path, params):
+    """Answers a command of a session.
+
+    Args:
+      session: the session the command is for.
+      method: the HTTP method.
+      path: the parts of the command path after the session id.
+      params: the decoded command parameters.
+
+    Returns:
+      A (status, value) tuple.
+    """
+    config = self.config
+    command = '/'.join(path)
+    if command == 'url':
+      if method == 'POST':
+        session.url = params['url']
+        return 0, None
+      return 0, session.url
+    if command in ('element', 'element/active') or (
+        path[:1] == ['element'] and path[2:] == ['element']):
+      if params.get('value') == 'missing':
+        return _NO_SUCH_ELEMENT, {'message': 'no such element'}
+      return 0, self._NewElement(session)
+    if command == 'elements' or (
+        path[:1] == ['element'] and path[2:] == ['elements']):
+      return 0, [self._NewElement(session)
+                 for _ in range(config.element_count)]
+    if command in ('execute', 'execute_async'):
+      return 0, 'x' * (config.script_result_kb * 1024)
+    if command == 'screenshot':
+      return 0, base64.b64encode('\0' * (config.screenshot_kb * 1024))
+    if command == 'source':
+      return 0, '<html>%s</html>' % ('x' * (config.page_source_kb * 1024))
+    if command == 'title':
+      return 0, 'stub'
+    if command == 'log':
+      return 0, [{'timestamp': 0, 'level': 'INFO', 'message': 'entry %d' % i}
+                 for i in range(config.log_entries)]
+    if command == 'window_handles':
+      return 0, ['main']
+    if command == 'window_handle':
+      return 0, 'main'
+    if path[:1] == ['element'] and len(path) == 3:
+      return 0, {'text': 'stub', 'name': 'div', 'displayed': True,
+                 'enabled': True, 'selected': False,
+                 'location': {'x': 0, 'y': 0},
+                 'size': {'width': 10, 'height': 10}}.get(path[2])
+    return 0, None
+
+
+def main():
+  parser = optparse.OptionParser()
+  parser.add_option('', '--port', type='int', default=9515,
+                    help='Port to listen on')
+  parser.add_option('', '--latency-ms', type='float', default=0,
+                    help='Time to wait before answering each command')
+  parser.add_option('', '--screenshot-kb', type='int', default=256,
+                    help='Size of screenshots')
+  parser.add_option('', '--script-result-kb', type='int', default=1,
+                    help='Size of script results')
+  parser.add_option('', '--chunked', action='store_true', default=False,
+                    help='Send large responses with chunked encoding')
+  options, _ = parser.parse_args()
+
+  server = StubServer(
+      StubConfig(latency_ms=options.latency_ms,
+                 screenshot_kb=options.screenshot_kb,
+                 script_result_kb=options.script_result_kb,
+                 chunked=options.chunked),
+      options.port)
+  print 'Stub XwalkDriver server listening on %s' % server.GetUrl()
+  sys.stdout.flush()
+  server.serve_forever()
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -3,6 +3,7 @@
 // found in the LICENSE file.
 
 #include <stdio.h>
+#include <algorithm>
 #include <locale>
 #include <string>
 #include <vector>
@@ -11,6 +12,7 @@
 #include "base/bind.h"
 #include "base/callback.h"
 #include "base/command_line.h"
+#include "base/files/file_util.h"
 #include "base/files/file_path.h"
 #include "base/lazy_instance.h"
 #include "base/logging.h"
@@ -33,12 +35,20 @@
 #include "xwalk/test/xwalkdriver/logging.h"
 #include "xwalk/test/xwalkdriver/net/port_server.h"
 #include "xwalk/test/xwalkdriver/server/http_handler.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
 #include "xwalk/test/xwalkdriver/version.h"
 
+#if defined(OS_POSIX)
+#include <unistd.h>
+#endif
+
 namespace {
 
 const char* kLocalHostAddress = "127.0.0.1";
 const int kBufferSize = 100 * 1024 * 1024;  // 100 MB
+// Responses larger than this are sent with chunked transfer encoding.
+const size_t kChunkedResponseThreshold = 256 * 1024;
+const size_t kResponseChunkSize = 64 * 1024;
 
 typedef base::Callback<
     void(const net::HttpServerRequestInfo&, const HttpResponseSenderFunc&)>
@@ -52,7 +62,9 @@ class HttpServer : public net::HttpServer::Delegate {
 
   virtual ~HttpServer() {}
 
-  bool Start(int port, bool allow_remote) {
+  // Starts listening on |port|, or on a port picked by the OS if |port| is
+  // 0. Sets |bound_port| to the port actually listened on.
+  bool Start(int port, bool allow_remote, int* bound_port) {
     std::string binding_ip = kLocalHostAddress;
     if (allow_remote)
       binding_ip = "0.0.0.0";
@@ -61,7 +73,10 @@ class HttpServer : public net::HttpServer::Delegate {
     server_socket->ListenWithAddressAndPort(binding_ip, port, 1);
     server_.reset(new net::HttpServer(server_socket.Pass(), this));
     net::IPEndPoint address;
-    return server_->GetLocalAddress(&address) == net::OK;
+    if (server_->GetLocalAddress(&address) != net::OK)
+      return false;
+    *bound_port = address.port();
+    return true;
   }
 
   // Overridden from net::HttpServer::Delegate:
@@ -75,7 +90,8 @@ class HttpServer : public net::HttpServer::Delegate {
         info,
         base::Bind(&HttpServer::OnResponse,
                    weak_factory_.GetWeakPtr(),
-                   connection_id));
+                   connection_id,
+                   info.GetHeaderValue("connection") == "keep-alive"));
   }
   virtual void OnWebSocketRequest(
       int connection_id,
@@ -86,15 +102,56 @@ class HttpServer : public net::HttpServer::Delegate {
 
  private:
   void OnResponse(int connection_id,
+                  bool keep_alive,
                   scoped_ptr<net::HttpServerResponseInfo> response) {
-    // Don't support keep-alive, since there's no way to detect if the
-    // client is HTTP/1.0. In such cases, the client may hang waiting for
-    // the connection to close (e.g., python 2.7 urllib).
+    // Only keep the connection open for clients that explicitly ask for it,
+    // since there's no way to detect if the client is HTTP/1.0. In such
+    // cases, the client may hang waiting for the connection to close
+    // (e.g., python 2.7 urllib).
+    if (keep_alive) {
+      if (response->status_code() == net::HTTP_OK &&
+          response->body().size() > kChunkedResponseThreshold) {
+        SendChunkedResponse(connection_id, *response);
+        return;
+      }
+      response->AddHeader("Connection", "keep-alive");
+      server_->SendResponse(connection_id, *response);
+      return;
+    }
     response->AddHeader("Connection", "close");
     server_->SendResponse(connection_id, *response);
     server_->Close(connection_id);
   }
 
+  // Sends a command response in chunks, so that a large body is not copied
+  // into a single serialized message and clients can decode it as it
+  // arrives. Only HTTP/1.1 clients asking for keep-alive get chunked
+  // responses, and all successful command responses are JSON. The head is
+  // written by hand because HttpServerResponseInfo::Serialize always adds a
+  // Content-Length, which must not be sent with Transfer-Encoding.
+  void SendChunkedResponse(int connection_id,
+                           const net::HttpServerResponseInfo& response) {
+    DCHECK_EQ(net::HTTP_OK, response.status_code());
+    server_->SendRaw(connection_id,
+                     "HTTP/1.1 200 OK\r\n"
+                     "Content-Type: application/json; charset=utf-8\r\n"
+                     "Transfer-Encoding: chunked\r\n"
+                     "Connection: keep-alive\r\n"
+                     "\r\n");
+
+    const std::string& body = response.body();
+    for (size_t offset = 0; offset < body.size();
+         offset += kResponseChunkSize) {
+      size_t size = std::min(kResponseChunkSize, body.size() - offset);
+      std::string chunk =
+          base::StringPrintf("%X\r\n", static_cast<unsigned int>(size));
+      chunk.append(body, offset, size);
+      chunk.append("\r\n");
+      server_->SendRaw(connection_id, chunk);
+    }
+    server_->SendRaw(connection_id, "0\r\n\r\n");
+  }
+
   HttpRequestHandlerFunc handle_request_func_;
   scoped_ptr<net::HttpServer> server_;
   base::WeakPtrFactory<HttpServer> weak_factory_;  // Should be last.
@@ -156,20 +213,36 @@ void StopServerOnIOThread() {
 
 void StartServerOnIOThread(int port,
                            bool allow_remote,
+                           int ready_fd,
                            const HttpRequestHandlerFunc& handle_request_func) {
   scoped_ptr<HttpServer> temp_server(new HttpServer(handle_request_func));
-  if (!temp_server->Start(port, allow_remote)) {
+  int bound_port;
+  if (!temp_server->Start(port, allow_remote, &bound_port)) {
     printf("Port not available. Exiting...\n");
     exit(1);
   }
   lazy_tls_server.Pointer()->Set(temp_server.release());
+
+#if defined(OS_POSIX)
+  // Tell the launcher which port is being listened on, now that requests
+  // can be accepted.
+  if (ready_fd >= 0) {
+    std::string ready = base::StringPrintf("%d\n", bound_port);
+    if (!base::WriteFileDescriptor(ready_fd, ready.data(), ready.length()))
+      LOG(WARNING) << "failed to write to ready-fd";
+    close(ready_fd);
+  }
+#endif
 }
 
 void RunServer(int port,
                bool allow_remote,
+               int ready_fd,
                const std::vector<std::string>& whitelisted_ips,
                const std::string& url_base,
-               scoped_ptr<PortServer> port_server) {
+               scoped_ptr<PortServer> port_server,
+               size_t session_threads,
+               size_t max_queued_commands) {
   base::Thread io_thread("XwalkDriver IO");
   CHECK(io_thread.StartWithOptions(
       base::Thread::Options(base::MessageLoop::TYPE_IO, 0)));
@@ -179,7 +252,9 @@ void RunServer(int port,
   HttpHandler handler(cmd_run_loop.QuitClosure(),
                       io_thread.message_loop_proxy(),
                       url_base,
-                      port_server.Pass());
+                      port_server.Pass(),
+                      session_threads,
+                      max_queued_commands);
   HttpRequestHandlerFunc handle_request_func =
       base::Bind(&HandleRequestOnCmdThread, &handler, whitelisted_ips);
 
@@ -188,6 +263,7 @@ void RunServer(int port,
                  base::Bind(&StartServerOnIOThread,
                             port,
                             allow_remote,
+                            ready_fd,
                             base::Bind(&HandleRequestOnIOThread,
                                        cmd_loop.message_loop_proxy(),
                                        handle_request_func)));
@@ -218,14 +294,19 @@ int main(int argc, char *argv[]) {
 
   // Parse command line flags.
   int port = 9515;
+  int ready_fd = -1;
   bool allow_remote = false;
   std::vector<std::string> whitelisted_ips;
   std::string url_base;
   scoped_ptr<PortServer> port_server;
+  int session_threads = SessionWorkerPool::kDefaultMaxThreads;
+  int max_queued_commands = SessionWorkerPool::kDefaultMaxQueuedCommands;
   if (cmd_line->HasSwitch("h") || cmd_line->HasSwitch("help")) {
     std::string options;
     const char* kOptionAndDescriptions[] = {
-        "port=PORT", "port to listen on",
+        "port=PORT", "port to listen on, or 0 to let the OS pick one",
+        "ready-fd=FD", "file descriptor to write the port to once the server "
+            "is ready, then close (POSIX only)",
         "log-path=FILE", "write server log to file instead of stderr, "
             "increases log level to INFO",
         "verbose", "log verbosely",
@@ -235,6 +316,11 @@ int main(int argc, char *argv[]) {
         "port-server", "address of server to contact for reserving a port",
         "whitelisted-ips", "comma-separated whitelist of remote IPv4 addresses "
             "which are allowed to connect to remote XwalkDriver",
+        "session-threads=N", "maximum number of threads running session "
+            "commands at once",
+        "max-queued-commands=N", "maximum number of commands waiting for a "
+            "session thread before new ones fail with \"server busy\", or 0 "
+            "for no limit",
     };
     for (size_t i = 0; i < arraysize(kOptionAndDescriptions) - 1; i += 2) {
       options += base::StringPrintf(
@@ -254,6 +340,17 @@ int main(int argc, char *argv[]) {
       return 1;
     }
   }
+  if (cmd_line->HasSwitch("ready-fd")) {
+#if defined(OS_POSIX)
+    if (!base::StringToInt(cmd_line->GetSwitchValueASCII("ready-fd"),
+                           &ready_fd) || ready_fd < 0) {
+      printf("Invalid ready-fd. Exiting...\n");
+      return 1;
+    }
+#else
+    printf("Warning: ready-fd not implemented for this platform.\n");
+#endif
+  }
   if (cmd_line->HasSwitch("port-server")) {
 #if defined(OS_LINUX)
     std::string address = cmd_line->GetSwitchValueASCII("port-server");
@@ -270,6 +367,21 @@ int main(int argc, char *argv[]) {
     printf("Warning: port-server not implemented for this platform.\n");
 #endif
   }
+  if (cmd_line->HasSwitch("session-threads")) {
+    if (!base::StringToInt(cmd_line->GetSwitchValueASCII("session-threads"),
+                           &session_threads) || session_threads <= 0) {
+      printf("Invalid session-threads. Exiting...\n");
+      return 1;
+    }
+  }
+  if (cmd_line->HasSwitch("max-queued-commands")) {
+    if (!base::StringToInt(
+            cmd_line->GetSwitchValueASCII("max-queued-commands"),
+            &max_queued_commands) || max_queued_commands < 0) {
+      printf("Invalid max-queued-commands. Exiting...\n");
+      return 1;
+    }
+  }
   if (cmd_line->HasSwitch("url-base"))
     url_base = cmd_line->GetSwitchValueASCII("url-base");
   if (url_base.empty() || url_base[0] != '/')
@@ -282,8 +394,13 @@ int main(int argc, char *argv[]) {
     base::SplitString(whitelist, ',', &whitelisted_ips);
   }
   if (!cmd_line->HasSwitch("silent")) {
-    printf("Starting XwalkDriver (v%s) on port %d\n",
-        kXwalkDriverVersion, port);
+    if (port) {
+      printf("Starting XwalkDriver (v%s) on port %d\n",
+          kXwalkDriverVersion, port);
+    } else {
+      printf("Starting XwalkDriver (v%s) on a port picked by the OS\n",
+          kXwalkDriverVersion);
+    }
 	if (!allow_remote) {
 	  printf("Only local connections are allowed.\n");
 	} else if (!whitelisted_ips.empty()) {
@@ -299,7 +416,7 @@ int main(int argc, char *argv[]) {
     printf("Unable to initialize logging. Exiting...\n");
     return 1;
   }
-  RunServer(port, allow_remote, whitelisted_ips,
-			url_base, port_server.Pass());
+  RunServer(port, allow_remote, ready_fd, whitelisted_ips,
+			url_base, port_server.Pass(), session_threads, max_queued_commands);
   return 0;
 }
@@ -6,10 +6,12 @@
 #define XWALK_TEST_XWALKDRIVER_SESSION_H_
 
 #include <list>
+#include <map>
 #include <string>
 #include <vector>
 
 #include "base/basictypes.h"
+#include "base/files/file_path.h"
 #include "base/files/scoped_temp_dir.h"
 #include "base/memory/scoped_ptr.h"
 #include "base/memory/scoped_vector.h"
@@ -73,6 +75,11 @@ struct Session {
   scoped_ptr<WebDriverLog> driver_log;
   base::ScopedTempDir temp_dir;
   scoped_ptr<base::DictionaryValue> capabilities;
+  // Sources of the scripts registered with the session, by handle. Pages
+  // define the scripts lazily, the first time they are executed.
+  std::map<std::string, std::string> registered_scripts;
+  // Heap snapshots taken to files in |temp_dir|, by id.
+  std::map<std::string, base::FilePath> heap_snapshot_files;
 };
 
 Session* GetThreadLocalSession();
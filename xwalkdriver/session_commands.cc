@@ -4,15 +4,21 @@
 
 #include "xwalk/test/xwalkdriver/session_commands.h"
 
+#include <algorithm>
 #include <list>
+#include <map>
 #include <vector>
 
+#include "base/base64.h"
 #include "base/bind.h"
 #include "base/callback.h"
+#include "base/files/file.h"
 #include "base/files/file_util.h"
 #include "base/logging.h"  // For CHECK macros.
 #include "base/memory/ref_counted.h"
 #include "base/message_loop/message_loop_proxy.h"
+#include "base/sha1.h"
+#include "base/strings/string_number_conversions.h"
 #include "base/synchronization/lock.h"
 #include "base/synchronization/waitable_event.h"
 #include "base/values.h"
@@ -36,6 +42,9 @@ namespace {
 
 const char kWindowHandlePrefix[] = "CDwindow-";
 
+// The largest part of a heap snapshot file a read returns.
+const int kMaxHeapSnapshotReadLength = 4 * 1024 * 1024;
+
 std::string WebViewIdToWindowHandle(const std::string& web_view_id) {
   return kWindowHandlePrefix + web_view_id;
 }
@@ -118,6 +127,8 @@ Status InitSessionHelper(
   if (capabilities.logging_prefs.count(WebDriverLog::kDriverType))
     driver_level = capabilities.logging_prefs[WebDriverLog::kDriverType];
   session->driver_log->set_min_level(driver_level);
+  session->driver_log->SetBufferLimits(capabilities.log_buffer_entries,
+                                       capabilities.log_buffer_bytes);
 
   // Create Log's and DevToolsEventListener's for ones that are DevTools-based.
   // Session will own the Log's, Xwalk will own the listeners.
@@ -399,6 +410,28 @@ Status ExecuteIsLoading(
   return Status(kOk);
 }
 
+Status ExecuteWaitForNotLoading(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  double ms;
+  if (!params.GetDouble("ms", &ms) || ms < 0)
+    return Status(kUnknownError, "'ms' must be a non-negative number");
+
+  WebView* web_view = nullptr;
+  Status status = session->GetTargetWindow(&web_view);
+  if (status.IsError())
+    return status;
+
+  status = web_view->ConnectIfNecessary();
+  if (status.IsError())
+    return status;
+
+  return web_view->WaitForPendingNavigations(
+      session->GetCurrentFrameId(),
+      base::TimeDelta::FromMilliseconds(static_cast<int>(ms)), false);
+}
+
 Status ExecuteGetLocation(
     Session* session,
     const base::DictionaryValue& params,
@@ -540,14 +573,38 @@ Status ExecuteGetLog(
   if (!params.GetString("type", &log_type)) {
     return Status(kUnknownError, "missing or invalid 'type'");
   }
+  // With a "since" cursor, only the entries from the cursor on are returned,
+  // along with the cursor to pass next time.
+  bool has_cursor = params.HasKey("since");
+  double since = 0;
+  if (has_cursor && (!params.GetDouble("since", &since) || since < 0))
+    return Status(kUnknownError, "'since' must be a non-negative number");
+  int max_entries = 0;
+  if (params.HasKey("max_entries") &&
+      (!params.GetInteger("max_entries", &max_entries) || max_entries < 0)) {
+    return Status(kUnknownError,
+                  "'max_entries' must be a non-negative integer");
+  }
   std::vector<WebDriverLog*> logs = session->GetAllLogs();
   for (std::vector<WebDriverLog*>::const_iterator log = logs.begin();
        log != logs.end();
        ++log) {
-    if (log_type == (*log)->type()) {
+    if (log_type != (*log)->type())
+      continue;
+    if (!has_cursor) {
       *value = (*log)->GetAndClearEntries();
       return Status(kOk);
     }
+    uint64 next;
+    uint64 dropped;
+    scoped_ptr<base::ListValue> entries = (*log)->GetEntriesSince(
+        static_cast<uint64>(since), max_entries, &next, &dropped);
+    scoped_ptr<base::DictionaryValue> result(new base::DictionaryValue());
+    result->Set("entries", entries.release());
+    result->SetDouble("next", static_cast<double>(next));
+    result->SetDouble("dropped", static_cast<double>(dropped));
+    value->reset(result.release());
+    return Status(kOk);
   }
   return Status(kUnknownError, "log type '" + log_type + "' not found");
 }
@@ -582,6 +639,76 @@ Status ExecuteUploadFile(
   return Status(kOk);
 }
 
+Status ExecuteRegisterScript(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  std::string script;
+  if (!params.GetString("script", &script))
+    return Status(kUnknownError, "'script' must be a string");
+  std::string hash = base::SHA1HashString(script);
+  std::string handle = base::HexEncode(hash.data(), hash.size());
+  session->registered_scripts[handle] = script;
+  value->reset(new base::StringValue(handle));
+  return Status(kOk);
+}
+
+Status ExecuteReadHeapSnapshotFile(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  std::string id;
+  if (!params.GetString("id", &id))
+    return Status(kUnknownError, "'id' must be a string");
+  std::map<std::string, base::FilePath>::const_iterator it =
+      session->heap_snapshot_files.find(id);
+  if (it == session->heap_snapshot_files.end())
+    return Status(kUnknownError, "no heap snapshot file '" + id + "'");
+  double offset = 0;
+  if (params.HasKey("offset") &&
+      (!params.GetDouble("offset", &offset) || offset < 0)) {
+    return Status(kUnknownError, "'offset' must be a non-negative number");
+  }
+  int length = kMaxHeapSnapshotReadLength;
+  if (params.HasKey("length") &&
+      (!params.GetInteger("length", &length) || length <= 0)) {
+    return Status(kUnknownError, "'length' must be a positive integer");
+  }
+  length = std::min(length, kMaxHeapSnapshotReadLength);
+
+  base::File file(it->second, base::File::FLAG_OPEN | base::File::FLAG_READ);
+  if (!file.IsValid())
+    return Status(kUnknownError, "unable to open heap snapshot file");
+  std::string data(length, '\0');
+  int bytes_read = file.Read(static_cast<int64>(offset), &data[0], length);
+  if (bytes_read < 0)
+    return Status(kUnknownError, "unable to read heap snapshot file");
+  data.resize(bytes_read);
+
+  std::string base64_data;
+  base::Base64Encode(data, &base64_data);
+  value->reset(new base::StringValue(base64_data));
+  return Status(kOk);
+}
+
+Status ExecuteDeleteHeapSnapshotFile(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  std::string id;
+  if (!params.GetString("id", &id))
+    return Status(kUnknownError, "'id' must be a string");
+  std::map<std::string, base::FilePath>::iterator it =
+      session->heap_snapshot_files.find(id);
+  if (it == session->heap_snapshot_files.end())
+    return Status(kUnknownError, "no heap snapshot file '" + id + "'");
+  bool deleted = base::DeleteFile(it->second, false);
+  session->heap_snapshot_files.erase(it);
+  if (!deleted)
+    return Status(kUnknownError, "unable to delete heap snapshot file");
+  return Status(kOk);
+}
+
 Status ExecuteGetBrowserOrientation(
     Session* session,
     const base::DictionaryValue& params,
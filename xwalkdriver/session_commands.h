@@ -109,6 +109,13 @@ Status ExecuteIsLoading(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Blocks until the current frame has no pending navigation or "ms"
+// milliseconds have passed.
+Status ExecuteWaitForNotLoading(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 Status ExecuteGetLocation(
     Session* session,
     const base::DictionaryValue& params,
@@ -144,6 +151,9 @@ Status ExecuteGetAvailableLogTypes(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Returns and clears the entries of a log. If a "since" cursor is given,
+// returns {entries, next, dropped} as from WebDriverLog::GetEntriesSince
+// instead, with at most "max_entries" entries.
 Status ExecuteGetLog(
     Session* session,
     const base::DictionaryValue& params,
@@ -154,6 +164,26 @@ Status ExecuteUploadFile(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Registers a script with the session and returns the handle it can be
+// executed by. Registering the same script again returns the same handle.
+Status ExecuteRegisterScript(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
+// Returns, base64-encoded, at most "length" bytes of the heap snapshot file
+// with "id" from "offset" on. Fewer bytes are returned at the end of the file.
+Status ExecuteReadHeapSnapshotFile(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
+// Deletes the heap snapshot file with "id".
+Status ExecuteDeleteHeapSnapshotFile(
+    Session* session,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 Status ExecuteGetBrowserOrientation(
     Session* session,
     const base::DictionaryValue& params,
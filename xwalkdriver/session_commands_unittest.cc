@@ -4,6 +4,7 @@
 
 #include <string>
 
+#include "base/base64.h"
 #include "base/bind.h"
 #include "base/callback.h"
 #include "base/files/file_path.h"
@@ -42,6 +43,40 @@ TEST(SessionCommandTest, FileUpload) {
   ASSERT_STREQ("COW\n", data.c_str());
 }
 
+TEST(SessionCommandTest, ReadAndDeleteHeapSnapshotFile) {
+  Session session("id");
+  ASSERT_TRUE(session.temp_dir.CreateUniqueTempDir());
+  base::FilePath path = session.temp_dir.path().AppendASCII("snapshot");
+  ASSERT_EQ(6, base::WriteFile(path, "abcdef", 6));
+  session.heap_snapshot_files["snapshot"] = path;
+
+  base::DictionaryValue params;
+  params.SetString("id", "snapshot");
+  params.SetInteger("offset", 2);
+  params.SetInteger("length", 3);
+  scoped_ptr<base::Value> value;
+  Status status = ExecuteReadHeapSnapshotFile(&session, params, &value);
+  ASSERT_EQ(kOk, status.code()) << status.message();
+  std::string base64_data;
+  ASSERT_TRUE(value->GetAsString(&base64_data));
+  std::string data;
+  ASSERT_TRUE(base::Base64Decode(base64_data, &data));
+  ASSERT_EQ("cde", data);
+
+  params.SetInteger("offset", 4);
+  status = ExecuteReadHeapSnapshotFile(&session, params, &value);
+  ASSERT_EQ(kOk, status.code()) << status.message();
+  ASSERT_TRUE(value->GetAsString(&base64_data));
+  ASSERT_TRUE(base::Base64Decode(base64_data, &data));
+  ASSERT_EQ("ef", data);
+
+  status = ExecuteDeleteHeapSnapshotFile(&session, params, &value);
+  ASSERT_EQ(kOk, status.code()) << status.message();
+  ASSERT_FALSE(base::PathExists(path));
+  status = ExecuteReadHeapSnapshotFile(&session, params, &value);
+  ASSERT_EQ(kUnknownError, status.code());
+}
+
 namespace {
 
 class DetachXwalk : public StubXwalk {
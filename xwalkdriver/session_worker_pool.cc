@@ -0,0 +1,189 @@
+// Copyright 2013 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
+
+#include <algorithm>
+
+#include "base/logging.h"
+#include "base/strings/stringprintf.h"
+#include "base/values.h"
+#include "xwalk/test/xwalkdriver/session.h"
+
+const size_t SessionWorkerPool::kDefaultMaxThreads = 32;
+const size_t SessionWorkerPool::kDefaultMaxQueuedCommands = 1000;
+
+SessionWorkerPool::PendingTask::PendingTask(const base::Closure& task,
+                                            const base::TimeTicks& queued_time)
+    : task(task), queued_time(queued_time) {}
+
+SessionWorkerPool::PendingTask::~PendingTask() {}
+
+SessionWorkerPool::SessionQueue::SessionQueue(Session* session)
+    : session(session), scheduled(false), commands(0) {}
+
+SessionWorkerPool::SessionQueue::~SessionQueue() {}
+
+SessionWorkerPool::SessionWorkerPool(size_t max_threads,
+                                     size_t max_queued_commands)
+    : max_threads_(max_threads),
+      max_queued_commands_(max_queued_commands),
+      work_available_(&lock_),
+      idle_threads_(0),
+      queued_commands_(0),
+      rejected_commands_(0),
+      stopping_(false) {
+  DCHECK_GT(max_threads_, 0u);
+}
+
+SessionWorkerPool::~SessionWorkerPool() {
+  {
+    base::AutoLock auto_lock(lock_);
+    stopping_ = true;
+    work_available_.Broadcast();
+  }
+  // Workers finish the queued commands before exiting.
+  for (size_t i = 0; i < threads_.size(); ++i)
+    threads_[i]->Join();
+  for (SessionMap::iterator it = sessions_.begin(); it != sessions_.end();
+       ++it) {
+    delete it->second->session;
+  }
+}
+
+void SessionWorkerPool::AddSession(const std::string& session_id,
+                                   scoped_ptr<Session> session) {
+  base::AutoLock auto_lock(lock_);
+  DCHECK(!sessions_.count(session_id));
+  sessions_[session_id] = new SessionQueue(session.release());
+}
+
+void SessionWorkerPool::RemoveSession(const std::string& session_id) {
+  base::AutoLock auto_lock(lock_);
+  sessions_.erase(session_id);
+}
+
+bool SessionWorkerPool::HasSession(const std::string& session_id) const {
+  base::AutoLock auto_lock(lock_);
+  return sessions_.count(session_id) != 0;
+}
+
+std::vector<std::string> SessionWorkerPool::GetSessionIds() const {
+  base::AutoLock auto_lock(lock_);
+  std::vector<std::string> ids;
+  for (SessionMap::const_iterator it = sessions_.begin();
+       it != sessions_.end(); ++it) {
+    ids.push_back(it->first);
+  }
+  return ids;
+}
+
+size_t SessionWorkerPool::GetSessionCount() const {
+  base::AutoLock auto_lock(lock_);
+  return sessions_.size();
+}
+
+bool SessionWorkerPool::PostTask(const std::string& session_id,
+                                 const base::Closure& task) {
+  base::AutoLock auto_lock(lock_);
+  SessionMap::iterator it = sessions_.find(session_id);
+  DCHECK(it != sessions_.end());
+  if (max_queued_commands_ && queued_commands_ >= max_queued_commands_) {
+    ++rejected_commands_;
+    return false;
+  }
+
+  SessionQueue* queue = it->second.get();
+  queue->tasks.push_back(PendingTask(task, base::TimeTicks::Now()));
+  ++queued_commands_;
+  if (queue->scheduled)
+    return true;
+
+  queue->scheduled = true;
+  ready_.push_back(queue);
+  if (ready_.size() > idle_threads_ && threads_.size() < max_threads_) {
+    linked_ptr<base::DelegateSimpleThread> thread(
+        new base::DelegateSimpleThread(
+            this, base::StringPrintf("Session worker %d",
+                                     static_cast<int>(threads_.size()))));
+    thread->Start();
+    threads_.push_back(thread);
+  } else {
+    work_available_.Signal();
+  }
+  return true;
+}
+
+scoped_ptr<base::DictionaryValue> SessionWorkerPool::GetStats() const {
+  base::AutoLock auto_lock(lock_);
+  scoped_ptr<base::DictionaryValue> stats(new base::DictionaryValue());
+  stats->SetInteger("count", static_cast<int>(sessions_.size()));
+  stats->SetInteger("threads", static_cast<int>(threads_.size()));
+  stats->SetInteger("max_threads", static_cast<int>(max_threads_));
+  stats->SetInteger("queued_commands", static_cast<int>(queued_commands_));
+  stats->SetInteger("max_queued_commands",
+                    static_cast<int>(max_queued_commands_));
+  stats->SetDouble("rejected_commands",
+                   static_cast<double>(rejected_commands_));
+
+  base::DictionaryValue* queue_waits = new base::DictionaryValue();
+  for (SessionMap::const_iterator it = sessions_.begin();
+       it != sessions_.end(); ++it) {
+    const SessionQueue* queue = it->second.get();
+    base::DictionaryValue* wait = new base::DictionaryValue();
+    wait->SetDouble("commands", static_cast<double>(queue->commands));
+    wait->SetInteger("queued", static_cast<int>(queue->tasks.size()));
+    wait->SetDouble("mean_ms",
+                    queue->commands ?
+                        queue->total_wait.InMillisecondsF() / queue->commands :
+                        0.0);
+    wait->SetDouble("max_ms", queue->max_wait.InMillisecondsF());
+    queue_waits->SetWithoutPathExpansion(it->first, wait);
+  }
+  stats->Set("queue_wait", queue_waits);
+  return stats.Pass();
+}
+
+void SessionWorkerPool::Run() {
+  base::AutoLock auto_lock(lock_);
+  while (true) {
+    while (ready_.empty() && !stopping_) {
+      ++idle_threads_;
+      work_available_.Wait();
+      --idle_threads_;
+    }
+    if (ready_.empty())
+      return;
+
+    scoped_refptr<SessionQueue> queue = ready_.front();
+    ready_.pop_front();
+    base::Closure task = queue->tasks.front().task;
+    base::TimeDelta wait =
+        base::TimeTicks::Now() - queue->tasks.front().queued_time;
+    queue->tasks.pop_front();
+    --queued_commands_;
+    ++queue->commands;
+    queue->total_wait += wait;
+    queue->max_wait = std::max(queue->max_wait, wait);
+
+    Session* session = queue->session;
+    {
+      base::AutoUnlock auto_unlock(lock_);
+      SetThreadLocalSession(make_scoped_ptr(session));
+      task.Run();
+      task.Reset();
+      // The command deletes the session if it quits it.
+      session = GetThreadLocalSession();
+      SetThreadLocalSession(scoped_ptr<Session>());
+    }
+    queue->session = session;
+
+    if (queue->tasks.empty()) {
+      queue->scheduled = false;
+    } else {
+      // Let the other sessions waiting for a worker run first.
+      ready_.push_back(queue);
+    }
+  }
+}
@@ -0,0 +1,114 @@
+// Copyright 2013 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+#ifndef XWALK_TEST_XWALKDRIVER_SESSION_WORKER_POOL_H_
+#define XWALK_TEST_XWALKDRIVER_SESSION_WORKER_POOL_H_
+
+#include <deque>
+#include <map>
+#include <string>
+#include <vector>
+
+#include "base/basictypes.h"
+#include "base/callback.h"
+#include "base/memory/linked_ptr.h"
+#include "base/memory/ref_counted.h"
+#include "base/memory/scoped_ptr.h"
+#include "base/synchronization/condition_variable.h"
+#include "base/synchronization/lock.h"
+#include "base/threading/simple_thread.h"
+#include "base/time/time.h"
+
+namespace base {
+class DictionaryValue;
+}
+
+struct Session;
+
+// Runs the commands of sessions on a bounded number of worker threads.
+//
+// The commands of a session run one at a time, in the order they were posted,
+// with the session set as the thread-local session of the worker running them.
+// Any worker may run the next command of any session, so idle sessions cost no
+// thread, and workers are only started when all the others are busy. All
+// methods but the worker loop must be called on the command thread.
+class SessionWorkerPool : public base::DelegateSimpleThread::Delegate {
+ public:
+  static const size_t kDefaultMaxThreads;
+  static const size_t kDefaultMaxQueuedCommands;
+
+  // At most |max_threads| commands run at once. At most |max_queued_commands|
+  // commands wait for a worker, or any number if it is 0.
+  SessionWorkerPool(size_t max_threads, size_t max_queued_commands);
+  // Runs the queued commands, then deletes the sessions no command quit.
+  virtual ~SessionWorkerPool();
+
+  // Adds a session, which must not be in the pool already. From then on, a
+  // command quitting the session owns it: it must clear the thread-local
+  // session and delete it.
+  void AddSession(const std::string& session_id, scoped_ptr<Session> session);
+
+  // Removes a session. The commands still queued for it run without a session.
+  void RemoveSession(const std::string& session_id);
+
+  bool HasSession(const std::string& session_id) const;
+  std::vector<std::string> GetSessionIds() const;
+  size_t GetSessionCount() const;
+
+  // Queues |task| to run after the commands already queued for a session in
+  // the pool. Returns false, without queuing it, if too many commands wait.
+  bool PostTask(const std::string& session_id, const base::Closure& task);
+
+  // Returns the number of workers, queued commands and rejected commands, and
+  // the times the commands of each session waited for a worker.
+  scoped_ptr<base::DictionaryValue> GetStats() const;
+
+  // Overridden from base::DelegateSimpleThread::Delegate:
+  virtual void Run() override;
+
+ private:
+  struct PendingTask {
+    PendingTask(const base::Closure& task, const base::TimeTicks& queued_time);
+    ~PendingTask();
+
+    base::Closure task;
+    base::TimeTicks queued_time;
+  };
+
+  struct SessionQueue : public base::RefCountedThreadSafe<SessionQueue> {
+    explicit SessionQueue(Session* session);
+
+    // NULL once a command has deleted the session.
+    Session* session;
+    std::deque<PendingTask> tasks;
+    // Whether the session is waiting for a worker, or running on one.
+    bool scheduled;
+    int64 commands;
+    base::TimeDelta total_wait;
+    base::TimeDelta max_wait;
+
+   private:
+    friend class base::RefCountedThreadSafe<SessionQueue>;
+    ~SessionQueue();
+  };
+
+  typedef std::map<std::string, scoped_refptr<SessionQueue> > SessionMap;
+
+  const size_t max_threads_;
+  const size_t max_queued_commands_;
+  mutable base::Lock lock_;
+  base::ConditionVariable work_available_;
+  SessionMap sessions_;
+  // Sessions with a command waiting for a worker, oldest first.
+  std::deque<scoped_refptr<SessionQueue> > ready_;
+  std::vector<linked_ptr<base::DelegateSimpleThread> > threads_;
+  size_t idle_threads_;
+  size_t queued_commands_;
+  int64 rejected_commands_;
+  bool stopping_;
+
+  DISALLOW_COPY_AND_ASSIGN(SessionWorkerPool);
+};
+
+#endif  // XWALK_TEST_XWALKDRIVER_SESSION_WORKER_POOL_H_
@@ -0,0 +1,168 @@
+// Copyright 2013 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+#include <string>
+#include <vector>
+
+#include "base/bind.h"
+#include "base/memory/scoped_ptr.h"
+#include "base/synchronization/lock.h"
+#include "base/synchronization/waitable_event.h"
+#include "base/time/time.h"
+#include "base/values.h"
+#include "testing/gtest/include/gtest/gtest.h"
+#include "xwalk/test/xwalkdriver/session.h"
+#include "xwalk/test/xwalkdriver/session_worker_pool.h"
+
+namespace {
+
+void AppendSessionId(base::Lock* lock,
+                     std::vector<std::string>* ids,
+                     int* count) {
+  base::AutoLock auto_lock(*lock);
+  Session* session = GetThreadLocalSession();
+  ids->push_back(session ? session->id : std::string());
+  (*count)++;
+}
+
+void RecordIndex(base::Lock* lock, std::vector<int>* indexes, int index) {
+  base::AutoLock auto_lock(*lock);
+  indexes->push_back(index);
+}
+
+}  // namespace
+
+TEST(SessionWorkerPoolTest, RunsCommandsOfASessionInOrder) {
+  base::Lock lock;
+  std::vector<int> a_indexes;
+  std::vector<int> b_indexes;
+  {
+    SessionWorkerPool pool(4, 0);
+    pool.AddSession("a", make_scoped_ptr(new Session("a")));
+    pool.AddSession("b", make_scoped_ptr(new Session("b")));
+    ASSERT_EQ(2u, pool.GetSessionCount());
+    for (int i = 0; i < 50; ++i) {
+      ASSERT_TRUE(pool.PostTask(
+          "a", base::Bind(&RecordIndex, &lock, &a_indexes, i)));
+      ASSERT_TRUE(pool.PostTask(
+          "b", base::Bind(&RecordIndex, &lock, &b_indexes, i)));
+    }
+  }
+  ASSERT_EQ(50u, a_indexes.size());
+  ASSERT_EQ(50u, b_indexes.size());
+  for (int i = 0; i < 50; ++i) {
+    ASSERT_EQ(i, a_indexes[i]);
+    ASSERT_EQ(i, b_indexes[i]);
+  }
+}
+
+TEST(SessionWorkerPoolTest, RunsCommandsWithTheirSession) {
+  base::Lock lock;
+  std::vector<std::string> ids;
+  int count = 0;
+  {
+    SessionWorkerPool pool(1, 0);
+    pool.AddSession("a", make_scoped_ptr(new Session("a")));
+    pool.AddSession("b", make_scoped_ptr(new Session("b")));
+    ASSERT_TRUE(pool.PostTask(
+        "a", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+    ASSERT_TRUE(pool.PostTask(
+        "b", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+  }
+  ASSERT_EQ(2, count);
+  ASSERT_EQ("a", ids[0]);
+  ASSERT_EQ("b", ids[1]);
+}
+
+namespace {
+
+void DeleteSession() {
+  Session* session = GetThreadLocalSession();
+  SetThreadLocalSession(scoped_ptr<Session>());
+  delete session;
+}
+
+}  // namespace
+
+TEST(SessionWorkerPoolTest, RunsCommandsWithoutDeletedSession) {
+  base::Lock lock;
+  std::vector<std::string> ids;
+  int count = 0;
+  {
+    SessionWorkerPool pool(1, 0);
+    pool.AddSession("a", make_scoped_ptr(new Session("a")));
+    ASSERT_TRUE(pool.PostTask(
+        "a", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+    ASSERT_TRUE(pool.PostTask("a", base::Bind(&DeleteSession)));
+    ASSERT_TRUE(pool.PostTask(
+        "a", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+    pool.RemoveSession("a");
+    ASSERT_FALSE(pool.HasSession("a"));
+  }
+  ASSERT_EQ(2u, ids.size());
+  ASSERT_EQ("a", ids[0]);
+  ASSERT_EQ(std::string(), ids[1]);
+}
+
+namespace {
+
+void SignalAndWait(base::WaitableEvent* signal, base::WaitableEvent* wait) {
+  signal->Signal();
+  wait->TimedWait(base::TimeDelta::FromSeconds(10));
+}
+
+void WaitForOtherSession(base::WaitableEvent* wait, bool* signaled) {
+  *signaled = wait->TimedWait(base::TimeDelta::FromSeconds(10));
+}
+
+}  // namespace
+
+TEST(SessionWorkerPoolTest, RunsSessionsAtOnce) {
+  base::WaitableEvent b_ran(false, false);
+  bool signaled = false;
+  {
+    SessionWorkerPool pool(2, 0);
+    pool.AddSession("a", make_scoped_ptr(new Session("a")));
+    pool.AddSession("b", make_scoped_ptr(new Session("b")));
+    ASSERT_TRUE(pool.PostTask(
+        "a", base::Bind(&WaitForOtherSession, &b_ran, &signaled)));
+    ASSERT_TRUE(pool.PostTask(
+        "b", base::Bind(&base::WaitableEvent::Signal,
+                        base::Unretained(&b_ran))));
+  }
+  ASSERT_TRUE(signaled);
+}
+
+TEST(SessionWorkerPoolTest, RejectsCommandsWhenQueueIsFull) {
+  base::WaitableEvent started(false, false);
+  base::WaitableEvent release(false, false);
+  base::Lock lock;
+  std::vector<std::string> ids;
+  int count = 0;
+  {
+    SessionWorkerPool pool(1, 1);
+    pool.AddSession("a", make_scoped_ptr(new Session("a")));
+    pool.AddSession("b", make_scoped_ptr(new Session("b")));
+    ASSERT_TRUE(pool.PostTask(
+        "a", base::Bind(&SignalAndWait, &started, &release)));
+    started.Wait();
+    ASSERT_TRUE(pool.PostTask(
+        "b", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+    ASSERT_FALSE(pool.PostTask(
+        "a", base::Bind(&AppendSessionId, &lock, &ids, &count)));
+
+    scoped_ptr<base::DictionaryValue> stats = pool.GetStats();
+    int queued;
+    ASSERT_TRUE(stats->GetInteger("queued_commands", &queued));
+    ASSERT_EQ(1, queued);
+    double rejected;
+    ASSERT_TRUE(stats->GetDouble("rejected_commands", &rejected));
+    ASSERT_EQ(1.0, rejected);
+    int b_queued;
+    ASSERT_TRUE(stats->GetInteger("queue_wait.b.queued", &b_queued));
+    ASSERT_EQ(1, b_queued);
+    release.Signal();
+  }
+  ASSERT_EQ(1, count);
+}
@@ -5,15 +5,27 @@
 """Generic utilities for all python scripts."""
 
 import atexit
+import collections
 import httplib
+import multiprocessing
+import multiprocessing.pool
 import os
+import shutil
 import signal
 import stat
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import urlparse
 import zipfile
+import zlib
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None  # Not available on Windows.
 
 
 def GetPlatformName():
@@ -45,8 +57,12 @@ def _DeleteDir(path):
   for root, dirs, files in os.walk(path, topdown=False):
     for name in files:
       filename = os.path.join(root, name)
-      os.chmod(filename, stat.S_IWRITE)
-      os.remove(filename)
+      try:
+        os.remove(filename)
+      except OSError:
+        # Read-only files can only be deleted once they are writable on Win.
+        os.chmod(filename, stat.S_IWRITE)
+        os.remove(filename)
     for name in dirs:
       os.rmdir(os.path.join(root, name))
   os.rmdir(path)
@@ -84,33 +100,388 @@ def MakeTempDir(parent_dir=None):
   return path
 
 
-def Zip(path):
-  """Zips the given path and returns the zipped file."""
-  zip_path = os.path.join(MakeTempDir(), 'build.zip')
-  f = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED)
-  f.write(path, os.path.basename(path))
-  f.close()
+_delete_lock = threading.Lock()
+_delete_pool = None
+_pending_deletes = []
+
+
+def WaitForPendingDeletes():
+  """Waits for the deletions started by DeleteAsync to finish."""
+  with _delete_lock:
+    pending = _pending_deletes[:]
+    del _pending_deletes[:]
+  for result in pending:
+    result.wait()
+
+
+def DeleteAsync(path, jobs=4):
+  """Deletes the given file or directory (recursively) in the background.
+
+  The path is first moved aside, so it can be reused as soon as this returns.
+  Deletions still running when the python interpreter exits are waited for.
+
+  Args:
+    path: the file or directory to delete, if it exists.
+    jobs: the number of deletions to run at once, used when the first deletion
+          is started.
+  """
+  global _delete_pool
+  if not os.path.exists(path):
+    return
+  doomed = tempfile.mkdtemp(prefix='.deleted-',
+                            dir=os.path.dirname(os.path.abspath(path)))
+  os.rename(path, os.path.join(doomed, os.path.basename(path)))
+  with _delete_lock:
+    if _delete_pool is None:
+      _delete_pool = multiprocessing.pool.ThreadPool(jobs)
+      atexit.register(WaitForPendingDeletes)
+    _pending_deletes[:] = [r for r in _pending_deletes if not r.ready()]
+    _pending_deletes.append(_delete_pool.apply_async(MaybeDelete, [doomed]))
+
+
+# The Linux FICLONE ioctl, which makes a copy-on-write copy of a file.
+_FICLONE = 0x40049409
+
+
+def _CloneFile(src, dst, hardlink):
+  if hardlink:
+    try:
+      os.link(src, dst)
+      return
+    except (AttributeError, OSError):
+      pass
+  if fcntl and IsLinux():
+    try:
+      with open(src, 'rb') as src_file:
+        with open(dst, 'wb') as dst_file:
+          fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+      shutil.copystat(src, dst)
+      return
+    except IOError:
+      pass
+  shutil.copy2(src, dst)
+
+
+def CloneTree(src, dst, hardlink=False):
+  """Copies a directory tree, sharing the file data with |src| if possible.
+
+  Files are cloned copy-on-write on file systems that support it, and copied
+  otherwise.
+
+  Args:
+    src: the directory to copy.
+    dst: the directory to copy to. It is created if it doesn't exist, in
+         which case its parent must exist.
+    hardlink: whether to hardlink the files instead. This is only safe if
+              the files in |dst| are replaced rather than written to.
+  """
+  if not os.path.isdir(dst):
+    os.mkdir(dst)
+  for root, dirs, files in os.walk(src):
+    target = os.path.join(dst, os.path.relpath(root, src))
+    for name in dirs:
+      os.mkdir(os.path.join(target, name))
+    for name in files:
+      _CloneFile(os.path.join(root, name), os.path.join(target, name),
+                 hardlink)
+
+
+class ProfileTemplate(object):
+  """A prepared user data dir, cloned for every session that needs one.
+
+  The template is built once, for example by writing the preferences and
+  local state files or by running Xwalk with it, and each clone is cheap to
+  create and is deleted in the background:
+
+    template = util.ProfileTemplate.FromFiles({'Default/Preferences': prefs})
+    user_data_dir = template.Clone()
+    ...
+    template.Release(user_data_dir)
+  """
+
+  def __init__(self, template_dir, hardlink=False):
+    """Initializes the template.
+
+    Args:
+      template_dir: the prepared user data dir, which must not be modified
+                    while clones of it are in use.
+      hardlink: whether clones hardlink the files of the template, see
+                CloneTree.
+    """
+    self._template_dir = template_dir
+    self._hardlink = hardlink
+    self._clone_dir = None
+
+  @classmethod
+  def FromFiles(cls, files, parent_dir=None, hardlink=False):
+    """Creates a template with the given files.
+
+    Args:
+      files: map from path in the user data dir, using forward slashes, to
+             the content of the file.
+      parent_dir: the directory to create the template in. If None, the
+                  system temp dir is used.
+      hardlink: see __init__.
+    """
+    template_dir = os.path.join(MakeTempDir(parent_dir), 'template')
+    for name, contents in files.items():
+      path = os.path.join(template_dir, *name.split('/'))
+      if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+      with open(path, 'wb') as f:
+        f.write(contents)
+    return cls(template_dir, hardlink)
+
+  def Clone(self):
+    """Returns the path of a new copy of the template."""
+    if self._clone_dir is None:
+      # Clones are kept on the template's file system, so they can share its
+      # file data.
+      self._clone_dir = MakeTempDir(os.path.dirname(self._template_dir))
+    path = tempfile.mkdtemp(dir=self._clone_dir)
+    CloneTree(self._template_dir, path, self._hardlink)
+    return path
+
+  def Release(self, path):
+    """Deletes a copy returned by Clone in the background."""
+    DeleteAsync(path)
+
+
+_ZIP_CHUNK_SIZE = 1024 * 1024
+# _WriteDeflatedMember relies on the internals of the zipfile module of this
+# Python version.
+_ZIPFILE_INTERNALS_KNOWN = sys.version_info[:2] == (2, 7)
+
+
+def _ZipMembers(path):
+  """Yields the (file path, archive name) of the files under |path|.
+
+  Symbolic links, including links to directories, are members themselves
+  and are not followed.
+  """
+  base = os.path.dirname(os.path.abspath(path))
+  if os.path.islink(path) or not os.path.isdir(path):
+    yield path, os.path.basename(path)
+    return
+  for root, dirs, files in os.walk(path):
+    dirs.sort()
+    links = [name for name in dirs if os.path.islink(os.path.join(root, name))]
+    for name in sorted(files + links):
+      file_path = os.path.join(root, name)
+      yield file_path, os.path.relpath(file_path, base).replace(os.sep, '/')
+
+
+def _MemberInfo(file_path, name):
+  """Returns the ZipInfo of a file, or of a symbolic link itself."""
+  st = os.lstat(file_path)
+  info = zipfile.ZipInfo(name, time.localtime(st.st_mtime)[:6])
+  info.external_attr = (st.st_mode & 0xffff) << 16
+  info.compress_type = zipfile.ZIP_DEFLATED
+  return info
+
+
+def _IsLinkMember(info):
+  return stat.S_ISLNK(info.external_attr >> 16)
+
+
+def _ReadMember(file_path, info):
+  """Yields the content of a member: a file's data or a link's target."""
+  if _IsLinkMember(info):
+    yield os.readlink(file_path)
+    return
+  with open(file_path, 'rb') as f:
+    while True:
+      data = f.read(_ZIP_CHUNK_SIZE)
+      if not data:
+        return
+      yield data
+
+
+def _DeflateMember(file_path, name):
+  """Compresses a file into a temporary file.
+
+  Returns:
+    A (ZipInfo, temporary file) tuple; the file holds the raw deflate stream.
+  """
+  info = _MemberInfo(file_path, name)
+  compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+  output = tempfile.SpooledTemporaryFile(max_size=8 * _ZIP_CHUNK_SIZE)
+  crc = 0
+  size = 0
+  for data in _ReadMember(file_path, info):
+    crc = zlib.crc32(data, crc)
+    size += len(data)
+    output.write(compressor.compress(data))
+  output.write(compressor.flush())
+  info.CRC = crc & 0xffffffff
+  info.file_size = size
+  info.compress_size = output.tell()
+  output.seek(0)
+  return info, output
+
+
+def Zip(path, zip_path=None, jobs=None):
+  """Zips the given file or directory tree and returns the zipped file.
+
+  Members are compressed in parallel, each into a temporary file, and then
+  copied into the archive in order. At most twice |jobs| members are
+  compressed ahead of the one being copied. Symbolic links are stored as
+  links.
+
+  Args:
+    path: file or directory to zip. A directory is stored under its name.
+    zip_path: the zip file to create. If None, it is created in a new
+              temporary directory.
+    jobs: the number of members to compress at once. Defaults to the number
+          of CPUs.
+
+  Returns:
+    The path of the zip file.
+  """
+  if zip_path is None:
+    zip_path = os.path.join(MakeTempDir(), 'build.zip')
+  with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED,
+                       allowZip64=True) as zip_file:
+    if not _ZIPFILE_INTERNALS_KNOWN:
+      for file_path, name in _ZipMembers(path):
+        info = _MemberInfo(file_path, name)
+        zip_file.writestr(info, ''.join(_ReadMember(file_path, info)))
+      return zip_path
+    jobs = jobs or multiprocessing.cpu_count()
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+      pending = collections.deque()
+      for member in _ZipMembers(path):
+        if len(pending) == 2 * jobs:
+          _WriteDeflatedMember(zip_file, *pending.popleft().get())
+        pending.append(pool.apply_async(_DeflateMember, member))
+      while pending:
+        _WriteDeflatedMember(zip_file, *pending.popleft().get())
+    finally:
+      pool.close()
+      pool.join()
   return zip_path
 
 
-def Unzip(zip_path, output_dir):
-  """Unzips the given zip file using a system installed unzip tool.
+def _WriteDeflatedMember(zip_file, info, data):
+  """Writes an already deflated member to the end of |zip_file|.
+
+  zipfile has no public API for this, so this is the only function that
+  uses its internals, and only when _ZIPFILE_INTERNALS_KNOWN.
+  """
+  assert _ZIPFILE_INTERNALS_KNOWN
+  with data:
+    info.header_offset = zip_file.fp.tell()
+    zip_file._writecheck(info)
+    zip_file._didModify = True
+    zip_file.fp.write(info.FileHeader())
+    shutil.copyfileobj(data, zip_file.fp, _ZIP_CHUNK_SIZE)
+  zip_file.filelist.append(info)
+  zip_file.NameToInfo[info.filename] = info
+
+
+def _FileCrc(path):
+  crc = 0
+  with open(path, 'rb') as f:
+    while True:
+      data = f.read(_ZIP_CHUNK_SIZE)
+      if not data:
+        return crc & 0xffffffff
+      crc = zlib.crc32(data, crc)
+
+
+def _UnzipLink(archive, info, name, target, skip_unchanged):
+  """Creates the symbolic link of a member at |target|.
+
+  Args:
+    archive: the ZipFile holding the member.
+    info: the ZipInfo of the link member.
+    name: the normalized path of the member.
+    target: the path to create the link at.
+    skip_unchanged: see Unzip.
+
+  Returns:
+    Whether the link was written.
+  """
+  link = archive.read(info)
+  resolved = os.path.normpath(os.path.join(os.path.dirname(name), link))
+  if os.path.isabs(link) or resolved.split(os.sep)[0] == os.pardir:
+    raise RuntimeError('Unsafe symbolic link in zip file: %s -> %s' % (
+        info.filename, link))
+  if os.path.islink(target):
+    if skip_unchanged and os.readlink(target) == link:
+      return False
+    os.remove(target)
+  elif os.path.isdir(target):
+    shutil.rmtree(target)
+  elif os.path.exists(target):
+    os.remove(target)
+  parent = os.path.dirname(target)
+  if not os.path.isdir(parent):
+    os.makedirs(parent)
+  os.symlink(link, target)
+  return True
+
+
+def Unzip(zip_file, output_dir, skip_unchanged=True):
+  """Unzips the given zip file, without any external tool.
+
+  Unix permissions and symbolic links stored in the archive are restored.
+  Links pointing outside of |output_dir| are refused.
 
   Args:
-    zip_path: zip file to unzip.
+    zip_file: path of the zip file to unzip, or a seekable file object to read
+              it from.
     output_dir: directory to unzip the contents of the zip file. The directory
                 must exist.
+    skip_unchanged: whether to leave files that already have the content of
+                    their member untouched, rather than rewriting them.
+
+  Returns:
+    The number of members that were written.
 
   Raises:
     RuntimeError if the unzip operation fails.
   """
-  if IsWindows():
-    unzip_cmd = ['C:\\Program Files\\7-Zip\\7z.exe', 'x', '-y']
-  else:
-    unzip_cmd = ['unzip', '-o']
-  unzip_cmd += [zip_path]
-  if RunCommand(unzip_cmd, output_dir) != 0:
-    raise RuntimeError('Unable to unzip %s to %s' % (zip_path, output_dir))
+  written = 0
+  try:
+    with zipfile.ZipFile(zip_file) as archive:
+      for info in archive.infolist():
+        name = os.path.normpath(info.filename)
+        if os.path.isabs(name) or name.split(os.sep)[0] == os.pardir:
+          raise RuntimeError('Unsafe path in zip file: %s' % info.filename)
+        target = os.path.join(output_dir, name)
+        if info.filename.endswith('/'):
+          if not os.path.isdir(target):
+            os.makedirs(target)
+          continue
+        if _IsLinkMember(info) and hasattr(os, 'symlink'):
+          if _UnzipLink(archive, info, name, target, skip_unchanged):
+            written += 1
+          continue
+        if (skip_unchanged and not os.path.islink(target) and
+            os.path.isfile(target) and
+            os.path.getsize(target) == info.file_size and
+            _FileCrc(target) == info.CRC):
+          continue
+        parent = os.path.dirname(target)
+        if not os.path.isdir(parent):
+          os.makedirs(parent)
+        if os.path.islink(target):
+          os.remove(target)
+        elif os.path.exists(target):
+          os.chmod(target, stat.S_IWRITE | stat.S_IREAD)
+        with archive.open(info) as source:
+          with open(target, 'wb') as dest:
+            shutil.copyfileobj(source, dest, _ZIP_CHUNK_SIZE)
+        mode = (info.external_attr >> 16) & 0o777
+        if mode:
+          os.chmod(target, mode)
+        written += 1
+  except (zipfile.BadZipfile, IOError, OSError) as e:
+    raise RuntimeError('Unable to unzip %s to %s: %s' % (
+        getattr(zip_file, 'name', zip_file), output_dir, e))
+  return written
 
 
 def Kill(pid):
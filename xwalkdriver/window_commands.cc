@@ -5,9 +5,12 @@
 #include "xwalk/test/xwalkdriver/window_commands.h"
 
 #include <list>
+#include <map>
 #include <string>
+#include <vector>
 
 #include "base/callback.h"
+#include "base/files/file_util.h"
 #include "base/strings/string_number_conversions.h"
 #include "base/strings/stringprintf.h"
 #include "base/threading/platform_thread.h"
@@ -54,6 +57,63 @@ Status GetUrl(WebView* web_view, const std::string& frame, std::string* url) {
   return Status(kOk);
 }
 
+// Property of the document holding the registered scripts defined in it, so
+// that they are dropped with the document on navigation.
+const char kRegisteredScriptsKey[] = "$xwalkdriver_registered_scripts_";
+
+// Returned instead of the script's value if it isn't defined yet.
+const char kMissingScriptKey[] = "$xwalkdriver_missing_script_";
+
+bool IsMissingScriptResult(const base::Value* result,
+                           const std::string& handle) {
+  const base::DictionaryValue* dict;
+  std::string missing_handle;
+  return result && result->GetAsDictionary(&dict) && dict->size() == 1 &&
+      dict->GetStringWithoutPathExpansion(kMissingScriptKey, &missing_handle) &&
+      missing_handle == handle;
+}
+
+// Reads the "ms" timeout and optional "interval" poll period of a wait
+// command. |interval_ms| keeps its value if no interval is given.
+Status GetWaitParams(const base::DictionaryValue& params,
+                     base::TimeDelta* timeout,
+                     int* interval_ms) {
+  double ms;
+  if (!params.GetDouble("ms", &ms) || ms < 0)
+    return Status(kUnknownError, "'ms' must be a non-negative number");
+  *timeout = base::TimeDelta::FromMilliseconds(static_cast<int>(ms));
+  if (params.HasKey("interval")) {
+    double interval;
+    if (!params.GetDouble("interval", &interval) || interval <= 0)
+      return Status(kUnknownError, "'interval' must be a positive number");
+    *interval_ms = static_cast<int>(interval);
+  }
+  return Status(kOk);
+}
+
+// Mirrors JavaScript truthiness for the values a script can return.
+bool IsTruthy(const base::Value& value) {
+  bool bool_value;
+  int int_value;
+  double double_value;
+  std::string string_value;
+  switch (value.GetType()) {
+    case base::Value::TYPE_NULL:
+      return false;
+    case base::Value::TYPE_BOOLEAN:
+      return value.GetAsBoolean(&bool_value) && bool_value;
+    case base::Value::TYPE_INTEGER:
+      return value.GetAsInteger(&int_value) && int_value != 0;
+    case base::Value::TYPE_DOUBLE:
+      return value.GetAsDouble(&double_value) && double_value != 0 &&
+          double_value == double_value;
+    case base::Value::TYPE_STRING:
+      return value.GetAsString(&string_value) && !string_value.empty();
+    default:
+      return true;
+  }
+}
+
 struct Cookie {
   Cookie(const std::string& name,
          const std::string& value,
@@ -184,6 +244,116 @@ Status ExecuteTouchEvent(
   return web_view->DispatchTouchEvents(events);
 }
 
+enum ActionType {
+  kMouseMoveAction = 0,
+  kMouseDownAction,
+  kMouseUpAction,
+  kTouchDownAction,
+  kTouchMoveAction,
+  kTouchUpAction,
+  kSendKeysAction,
+  kPauseAction
+};
+
+struct Action {
+  Action()
+      : type(kPauseAction),
+        has_element(false),
+        has_offset(false),
+        x(0),
+        y(0),
+        button(kLeftMouseButton),
+        keys(NULL) {}
+
+  ActionType type;
+  bool has_element;
+  std::string element_id;
+  bool has_offset;
+  int x;
+  int y;
+  MouseButton button;
+  // Owned by the command parameters.
+  const base::ListValue* keys;
+  // The time to wait after the action, before the next one.
+  base::TimeDelta duration;
+};
+
+Status ParseAction(const base::DictionaryValue& params, Action* action) {
+  std::string type;
+  if (!params.GetString("type", &type))
+    return Status(kUnknownError, "'type' must be a string");
+
+  if (params.HasKey("duration")) {
+    double duration_ms;
+    if (!params.GetDouble("duration", &duration_ms) || duration_ms < 0)
+      return Status(kUnknownError, "'duration' must be a non-negative number");
+    action->duration = base::TimeDelta::FromMicroseconds(
+        static_cast<int64>(duration_ms * 1000));
+  }
+
+  if (type == "mouseMove") {
+    action->type = kMouseMoveAction;
+    action->has_element = params.GetString("element", &action->element_id);
+    action->has_offset = params.GetInteger("xoffset", &action->x) &&
+        params.GetInteger("yoffset", &action->y);
+    if (!action->has_element && !action->has_offset) {
+      return Status(kUnknownError,
+                    "at least an element or offset should be set");
+    }
+  } else if (type == "mouseDown" || type == "mouseUp") {
+    action->type = type == "mouseDown" ? kMouseDownAction : kMouseUpAction;
+    return GetMouseButton(params, &action->button);
+  } else if (type == "touchDown" || type == "touchMove" ||
+             type == "touchUp") {
+    if (type == "touchDown")
+      action->type = kTouchDownAction;
+    else if (type == "touchMove")
+      action->type = kTouchMoveAction;
+    else
+      action->type = kTouchUpAction;
+    if (!params.GetInteger("x", &action->x))
+      return Status(kUnknownError, "'x' must be an integer");
+    if (!params.GetInteger("y", &action->y))
+      return Status(kUnknownError, "'y' must be an integer");
+  } else if (type == "sendKeys") {
+    action->type = kSendKeysAction;
+    if (!params.GetList("value", &action->keys))
+      return Status(kUnknownError, "'value' must be a list");
+  } else if (type == "pause") {
+    action->type = kPauseAction;
+  } else {
+    return Status(kUnknownError, "unknown action type: " + type);
+  }
+  return Status(kOk);
+}
+
+Status DispatchQueuedTouchEvents(WebView* web_view,
+                                 std::list<TouchEvent>* touch_events) {
+  if (touch_events->empty())
+    return Status(kOk);
+  Status status = web_view->DispatchTouchEvents(*touch_events);
+  touch_events->clear();
+  return status;
+}
+
+// Dispatches the events queued by a sequence of actions. Only one of the lists
+// is non-empty at a time. The mouse position of the session is only updated
+// once the mouse events have been dispatched.
+Status DispatchQueuedEvents(Session* session,
+                            WebView* web_view,
+                            std::list<MouseEvent>* mouse_events,
+                            std::list<TouchEvent>* touch_events) {
+  if (mouse_events->empty())
+    return DispatchQueuedTouchEvents(web_view, touch_events);
+  Status status = web_view->DispatchMouseEvents(
+      *mouse_events, session->GetCurrentFrameId());
+  if (status.IsOk())
+    session->mouse_position = WebPoint(mouse_events->back().x,
+                                       mouse_events->back().y);
+  mouse_events->clear();
+  return status;
+}
+
 }  // namespace
 
 Status ExecuteWindowCommand(
@@ -283,6 +453,55 @@ Status ExecuteExecuteAsyncScript(
       session->script_timeout, value);
 }
 
+Status ExecuteExecuteRegisteredScript(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  std::string handle;
+  if (!params.GetString("handle", &handle))
+    return Status(kUnknownError, "'handle' must be a string");
+  std::map<std::string, std::string>::const_iterator it =
+      session->registered_scripts.find(handle);
+  if (it == session->registered_scripts.end())
+    return Status(kUnknownError, "no script registered as " + handle);
+  const base::ListValue* args;
+  if (!params.GetList("args", &args))
+    return Status(kUnknownError, "'args' must be a list");
+
+  // Try the script already defined in the document, which only needs the
+  // handle to be sent.
+  std::string call_script = base::StringPrintf(
+      "function() {"
+      "  var scripts = document['%s'];"
+      "  var handle = '%s';"
+      "  if (!scripts || !scripts.hasOwnProperty(handle))"
+      "    return {'%s': handle};"
+      "  return scripts[handle].apply(null, arguments);"
+      "}",
+      kRegisteredScriptsKey, handle.c_str(), kMissingScriptKey);
+  scoped_ptr<base::Value> result;
+  Status status = web_view->CallFunction(
+      session->GetCurrentFrameId(), call_script, *args, &result);
+  if (status.IsError())
+    return status;
+  if (!IsMissingScriptResult(result.get(), handle)) {
+    value->reset(result.release());
+    return Status(kOk);
+  }
+
+  std::string define_script = base::StringPrintf(
+      "function() {"
+      "  var scripts = document['%s'] = document['%s'] || {};"
+      "  var script = scripts['%s'] = function(){%s\n};"
+      "  return script.apply(null, arguments);"
+      "}",
+      kRegisteredScriptsKey, kRegisteredScriptsKey, handle.c_str(),
+      it->second.c_str());
+  return web_view->CallFunction(
+      session->GetCurrentFrameId(), define_script, *args, value);
+}
+
 Status ExecuteSwitchToFrame(
     Session* session,
     WebView* web_view,
@@ -403,6 +622,91 @@ Status ExecuteFindElements(
       interval_ms, false, NULL, session, web_view, params, value);
 }
 
+Status ExecuteWaitForElement(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  base::TimeDelta timeout;
+  Status status = GetWaitParams(params, &timeout, &interval_ms);
+  if (status.IsError())
+    return status;
+  return FindElementWithTimeout(
+      interval_ms, true, NULL, timeout, session, web_view, params, value);
+}
+
+Status ExecuteWaitForCondition(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  std::string script;
+  if (!params.GetString("script", &script))
+    return Status(kUnknownError, "'script' must be a string");
+  base::ListValue empty_args;
+  const base::ListValue* args = &empty_args;
+  if (params.HasKey("args") && !params.GetList("args", &args))
+    return Status(kUnknownError, "'args' must be a list");
+  base::TimeDelta timeout;
+  Status status = GetWaitParams(params, &timeout, &interval_ms);
+  if (status.IsError())
+    return status;
+
+  base::TimeTicks start_time = base::TimeTicks::Now();
+  while (true) {
+    scoped_ptr<base::Value> result;
+    status = web_view->CallFunction(session->GetCurrentFrameId(),
+                                    "function(){" + script + "}", *args,
+                                    &result);
+    if (status.IsError())
+      return status;
+    if (result && IsTruthy(*result)) {
+      value->reset(result.release());
+      return Status(kOk);
+    }
+    if (base::TimeTicks::Now() - start_time >= timeout)
+      return Status(kTimeout, "timed out waiting for condition");
+    base::PlatformThread::Sleep(base::TimeDelta::FromMilliseconds(interval_ms));
+  }
+}
+
+Status ExecuteGetElementsSnapshot(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  const base::ListValue* fields;
+  if (!params.GetList("fields", &fields))
+    return Status(kUnknownError, "'fields' must be a list");
+
+  scoped_ptr<base::Value> found;
+  const base::ListValue* elements;
+  if (params.HasKey("using")) {
+    Status status = FindElement(
+        interval_ms, false, NULL, session, web_view, params, &found);
+    if (status.IsError())
+      return status;
+    if (!found->GetAsList(&elements))
+      return Status(kUnknownError, "script returns unexpected result");
+  } else if (!params.GetList("elements", &elements)) {
+    return Status(kUnknownError, "'elements' must be a list");
+  }
+
+  scoped_ptr<base::Value> columns;
+  Status status =
+      GetElementsSnapshot(session, web_view, *elements, *fields, &columns);
+  if (status.IsError())
+    return status;
+  scoped_ptr<base::DictionaryValue> snapshot(new base::DictionaryValue());
+  snapshot->Set("elements", elements->DeepCopy());
+  snapshot->Set("fields", columns.release());
+  value->reset(snapshot.release());
+  return Status(kOk);
+}
+
 Status ExecuteGetCurrentUrl(
     Session* session,
     WebView* web_view,
@@ -587,6 +891,151 @@ Status ExecuteTouchMove(
   return ExecuteTouchEvent(session, web_view, kTouchMove, params);
 }
 
+Status ExecutePerformActions(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  const base::ListValue* action_list;
+  if (!params.GetList("actions", &action_list))
+    return Status(kUnknownError, "'actions' must be a list");
+  std::vector<Action> actions(action_list->GetSize());
+  for (size_t i = 0; i < actions.size(); ++i) {
+    const base::DictionaryValue* action_params;
+    if (!action_list->GetDictionary(i, &action_params))
+      return Status(kUnknownError, "each action must be a dictionary");
+    Status status = ParseAction(*action_params, &actions[i]);
+    if (status.IsError()) {
+      return Status(kUnknownError,
+                    base::StringPrintf("invalid action %d",
+                                       static_cast<int>(i)),
+                    status);
+    }
+  }
+
+  // Events of consecutive actions without a duration are dispatched at once.
+  // Touch coordinates are scrolled into view once per touch sequence, so that
+  // the page does not scroll in the middle of a gesture. |mouse_position| is
+  // where the queued mouse events leave the mouse.
+  WebPoint mouse_position = session->mouse_position;
+  std::list<MouseEvent> mouse_events;
+  std::list<TouchEvent> touch_events;
+  bool has_touch_scroll = false;
+  int touch_scroll_x = 0;
+  int touch_scroll_y = 0;
+  base::TimeTicks next_action_time = base::TimeTicks::Now();
+  for (size_t i = 0; i < actions.size(); ++i) {
+    const Action& action = actions[i];
+    Status status(kOk);
+    switch (action.type) {
+      case kMouseMoveAction: {
+        WebPoint location = mouse_position;
+        if (action.has_element) {
+          status = DispatchQueuedEvents(
+              session, web_view, &mouse_events, &touch_events);
+          if (status.IsError())
+            return status;
+          status = ScrollElementIntoView(
+              session, web_view, action.element_id, &location);
+          if (status.IsError())
+            return status;
+        }
+        if (action.has_offset) {
+          location.Offset(action.x, action.y);
+        } else {
+          WebSize size;
+          status = GetElementSize(
+              session, web_view, action.element_id, &size);
+          if (status.IsError())
+            return status;
+          location.Offset(size.width / 2, size.height / 2);
+        }
+        status = DispatchQueuedTouchEvents(web_view, &touch_events);
+        if (status.IsError())
+          return status;
+        mouse_events.push_back(
+            MouseEvent(kMovedMouseEventType, kNoneMouseButton,
+                       location.x, location.y, session->sticky_modifiers, 0));
+        mouse_position = location;
+        break;
+      }
+      case kMouseDownAction:
+      case kMouseUpAction:
+        status = DispatchQueuedTouchEvents(web_view, &touch_events);
+        if (status.IsError())
+          return status;
+        mouse_events.push_back(
+            MouseEvent(action.type == kMouseDownAction ?
+                           kPressedMouseEventType : kReleasedMouseEventType,
+                       action.button,
+                       mouse_position.x, mouse_position.y,
+                       session->sticky_modifiers, 1));
+        break;
+      case kTouchDownAction:
+      case kTouchMoveAction:
+      case kTouchUpAction: {
+        if (!mouse_events.empty() ||
+            action.type == kTouchDownAction || !has_touch_scroll) {
+          status = DispatchQueuedEvents(
+              session, web_view, &mouse_events, &touch_events);
+          if (status.IsError())
+            return status;
+        }
+        if (action.type == kTouchDownAction || !has_touch_scroll) {
+          int relative_x = action.x;
+          int relative_y = action.y;
+          status = ScrollCoordinateInToView(
+              session, web_view, action.x, action.y, &relative_x, &relative_y);
+          if (status.IsError())
+            return status;
+          touch_scroll_x = action.x - relative_x;
+          touch_scroll_y = action.y - relative_y;
+          has_touch_scroll = true;
+        }
+        TouchEventType type = kTouchStart;
+        if (action.type == kTouchMoveAction)
+          type = kTouchMove;
+        else if (action.type == kTouchUpAction)
+          type = kTouchEnd;
+        touch_events.push_back(TouchEvent(
+            type, action.x - touch_scroll_x, action.y - touch_scroll_y));
+        break;
+      }
+      case kSendKeysAction:
+        status = DispatchQueuedEvents(
+            session, web_view, &mouse_events, &touch_events);
+        if (status.IsError())
+          return status;
+        status = SendKeysOnWindow(
+            web_view, action.keys, false, &session->sticky_modifiers);
+        break;
+      case kPauseAction:
+        break;
+    }
+    if (status.IsError())
+      return status;
+
+    if (action.duration > base::TimeDelta() || i + 1 == actions.size()) {
+      status = DispatchQueuedEvents(
+          session, web_view, &mouse_events, &touch_events);
+      if (status.IsError())
+        return status;
+    }
+    // Timed actions are scheduled from the previous one rather than from when
+    // they finish, so that the time spent dispatching does not add up over
+    // the steps of a gesture.
+    if (action.duration > base::TimeDelta()) {
+      next_action_time += action.duration;
+      base::TimeDelta wait = next_action_time - base::TimeTicks::Now();
+      if (wait > base::TimeDelta())
+        base::PlatformThread::Sleep(wait);
+    } else {
+      next_action_time = base::TimeTicks::Now();
+    }
+  }
+  return Status(kOk);
+}
+
 Status ExecuteGetActiveElement(
     Session* session,
     WebView* web_view,
@@ -850,6 +1299,14 @@ Status ExecuteDeleteAllCookies(
   return Status(kOk);
 }
 
+Status ExecuteDeleteAllBrowserCookies(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  return web_view->DeleteAllBrowserCookies();
+}
+
 Status ExecuteSetLocation(
     Session* session,
     WebView* web_view,
@@ -883,3 +1340,43 @@ Status ExecuteTakeHeapSnapshot(
     scoped_ptr<base::Value>* value) {
   return web_view->TakeHeapSnapshot(value);
 }
+
+Status ExecuteTakeHeapSnapshotToFile(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value) {
+  bool compress = false;
+  if (params.HasKey("compress") && !params.GetBoolean("compress", &compress))
+    return Status(kUnknownError, "'compress' must be a boolean");
+
+  if (!session->temp_dir.IsValid()) {
+    if (!session->temp_dir.CreateUniqueTempDir())
+      return Status(kUnknownError, "unable to create temp dir");
+  }
+  base::FilePath path;
+  if (!base::CreateTemporaryFileInDir(session->temp_dir.path(), &path))
+    return Status(kUnknownError, "unable to create heap snapshot file");
+
+  int64 snapshot_size = 0;
+  Status status = web_view->TakeHeapSnapshotToFile(
+      path, compress, &snapshot_size);
+  int64 file_size = 0;
+  if (status.IsOk() && !base::GetFileSize(path, &file_size))
+    status = Status(kUnknownError, "unable to get heap snapshot file size");
+  if (status.IsError()) {
+    base::DeleteFile(path, false);
+    return status;
+  }
+
+  std::string id = path.BaseName().AsUTF8Unsafe();
+  session->heap_snapshot_files[id] = path;
+  scoped_ptr<base::DictionaryValue> result(new base::DictionaryValue());
+  result->SetString("id", id);
+  result->SetString("path", path.AsUTF8Unsafe());
+  result->SetDouble("size", static_cast<double>(file_size));
+  result->SetDouble("snapshotSize", static_cast<double>(snapshot_size));
+  result->SetBoolean("compressed", compress);
+  value->reset(result.release());
+  return Status(kOk);
+}
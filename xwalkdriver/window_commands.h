@@ -53,6 +53,14 @@ Status ExecuteExecuteAsyncScript(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Executes a script registered with ExecuteRegisterScript, defining it in the
+// current document first if needed.
+Status ExecuteExecuteRegisteredScript(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 // Changes the targeted frame for the given session.
 Status ExecuteSwitchToFrame(
     Session* session,
@@ -90,6 +98,34 @@ Status ExecuteFindElements(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Wait up to "ms" milliseconds for an element to appear, polling every
+// |interval_ms| (or "interval") milliseconds.
+Status ExecuteWaitForElement(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
+// Wait up to "ms" milliseconds for a script to return a truthy value, polling
+// every |interval_ms| (or "interval") milliseconds.
+Status ExecuteWaitForCondition(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
+// Read the given fields of many elements at once. The elements are either
+// given in "elements" or found with the "using" and "value" locator, waiting
+// up to the implicit wait and polling every |interval_ms| milliseconds.
+Status ExecuteGetElementsSnapshot(
+    int interval_ms,
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 // Get the current page url.
 Status ExecuteGetCurrentUrl(
     Session* session,
@@ -174,6 +210,22 @@ Status ExecuteTouchMove(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Performs a sequence of "actions", each a dictionary with a "type" and the
+// parameters of the equivalent single command:
+//   mouseMove: "element" and/or "xoffset" and "yoffset", as for moveto.
+//   mouseDown, mouseUp: "button".
+//   touchDown, touchMove, touchUp: "x" and "y".
+//   sendKeys: "value".
+//   pause: no parameters.
+// An action may have a "duration" in milliseconds to wait before the next
+// one. The events of actions without a duration are dispatched together with
+// those of the following actions.
+Status ExecutePerformActions(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 Status ExecuteGetActiveElement(
     Session* session,
     WebView* web_view,
@@ -284,6 +336,13 @@ Status ExecuteDeleteAllCookies(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Delete the cookies of every site, whichever page is open.
+Status ExecuteDeleteAllBrowserCookies(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 Status ExecuteSetLocation(
     Session* session,
     WebView* web_view,
@@ -296,4 +355,14 @@ Status ExecuteTakeHeapSnapshot(
     const base::DictionaryValue& params,
     scoped_ptr<base::Value>* value);
 
+// Takes a heap snapshot to a file of the session, gzip-compressed if
+// "compress" is true, and returns its "id", "path", file "size",
+// uncompressed "snapshotSize" and whether it is "compressed". The file can be
+// read with ExecuteReadHeapSnapshotFile.
+Status ExecuteTakeHeapSnapshotToFile(
+    Session* session,
+    WebView* web_view,
+    const base::DictionaryValue& params,
+    scoped_ptr<base::Value>* value);
+
 #endif  // XWALK_TEST_XWALKDRIVER_WINDOW_COMMANDS_H_
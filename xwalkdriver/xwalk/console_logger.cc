@@ -36,8 +36,11 @@ ConsoleLogger::ConsoleLogger(Log* log)
     : log_(log) {}
 
 Status ConsoleLogger::OnConnected(DevToolsClient* client) {
-  base::DictionaryValue params;
-  return client->SendCommand("Console.enable", params);
+  return client->EnableDomain("Console");
+}
+
+bool ConsoleLogger::ListensToEvent(const std::string& method) {
+  return method == "Console.messageAdded";
 }
 
 Status ConsoleLogger::OnEvent(
@@ -27,6 +27,8 @@ class ConsoleLogger : public DevToolsEventListener {
 
   // Enables Console events for the client, which must not be null.
   virtual Status OnConnected(DevToolsClient* client) override;
+  // Listens to the events it logs.
+  virtual bool ListensToEvent(const std::string& method) override;
   // Translates an event into a log entry.
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
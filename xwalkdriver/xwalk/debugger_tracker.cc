@@ -15,6 +15,10 @@ DebuggerTracker::DebuggerTracker(DevToolsClient* client) {
 
 DebuggerTracker::~DebuggerTracker() {}
 
+bool DebuggerTracker::ListensToEvent(const std::string& method) {
+  return method == "Debugger.paused";
+}
+
 Status DebuggerTracker::OnEvent(DevToolsClient* client,
                          const std::string& method,
                          const base::DictionaryValue& params) {
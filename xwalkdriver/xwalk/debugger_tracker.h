@@ -25,6 +25,7 @@ class DebuggerTracker : public DevToolsEventListener {
   virtual ~DebuggerTracker();
 
   // Overridden from DevToolsEventListener:
+  virtual bool ListensToEvent(const std::string& method) override;
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
                          const base::DictionaryValue& params) override;
@@ -39,6 +39,13 @@ class DevToolsClient {
       const base::DictionaryValue& params,
       scoped_ptr<base::DictionaryValue>* result) = 0;
 
+  // Enables the events of a domain, such as "Page", for a listener that needs
+  // them. The domain is only enabled by the first call, and disabled when each
+  // call has been matched by a call to DisableDomain. A new connection starts
+  // with no domain enabled.
+  virtual Status EnableDomain(const std::string& domain) = 0;
+  virtual Status DisableDomain(const std::string& domain) = 0;
+
   // Adds a listener. This must only be done when the client is disconnected.
   virtual void AddListener(DevToolsEventListener* listener) = 0;
 
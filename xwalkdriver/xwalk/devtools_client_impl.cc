@@ -22,6 +22,13 @@ namespace {
 const char* kInspectorContextError =
     "Execution context with given id not found.";
 
+// Events the client handles itself, whether listeners listen to them or not.
+const char* const kClientEvents[] = {
+    "Inspector.detached",
+    "Inspector.targetCrashed",
+    "Page.javascriptDialogOpening",
+};
+
 Status ParseInspectorError(const std::string& error_json) {
   scoped_ptr<base::Value> error(base::JSONReader::Read(error_json));
   base::DictionaryValue* error_dict;
@@ -132,6 +139,7 @@ Status DevToolsClientImpl::ConnectIfNecessary() {
   unnotified_connect_listeners_ = listeners_;
   unnotified_event_listeners_.clear();
   response_info_map_.clear();
+  domain_enable_counts_.clear();
 
   // Notify all listeners of the new connection. Do this now so that any errors
   // that occur are reported now instead of later during some unrelated call.
@@ -160,9 +168,32 @@ Status DevToolsClientImpl::SendCommandAndGetResult(
   return Status(kOk);
 }
 
+Status DevToolsClientImpl::EnableDomain(const std::string& domain) {
+  int& count = domain_enable_counts_[domain];
+  if (count++)
+    return Status(kOk);
+  base::DictionaryValue params;
+  Status status = SendCommand(domain + ".enable", params);
+  if (status.IsError())
+    domain_enable_counts_.erase(domain);
+  return status;
+}
+
+Status DevToolsClientImpl::DisableDomain(const std::string& domain) {
+  std::map<std::string, int>::iterator it = domain_enable_counts_.find(domain);
+  if (it == domain_enable_counts_.end())
+    return Status(kOk);
+  if (--it->second)
+    return Status(kOk);
+  domain_enable_counts_.erase(it);
+  base::DictionaryValue params;
+  return SendCommand(domain + ".disable", params);
+}
+
 void DevToolsClientImpl::AddListener(DevToolsEventListener* listener) {
   CHECK(listener);
   listeners_.push_back(listener);
+  event_listeners_.clear();
 }
 
 Status DevToolsClientImpl::HandleReceivedEvents() {
@@ -286,6 +317,13 @@ Status DevToolsClientImpl::ProcessNextMessage(
       break;
   }
 
+  // Drop the events nobody handles before paying for parsing them.
+  std::string event_method;
+  if (internal::PeekEventMethod(message, &event_method) &&
+      !ShouldProcessEvent(event_method)) {
+    return Status(kOk);
+  }
+
   internal::InspectorMessageType type;
   internal::InspectorEvent event;
   internal::InspectorCommandResponse response;
@@ -305,7 +343,7 @@ Status DevToolsClientImpl::ProcessEvent(const internal::InspectorEvent& event) {
     VLOG(1) << "DEVTOOLS EVENT " << event.method << " "
             << FormatValueForDisplay(*event.params);
   }
-  unnotified_event_listeners_ = listeners_;
+  unnotified_event_listeners_ = GetEventListeners(event.method);
   unnotified_event_ = &event;
   Status status = EnsureListenersNotifiedOfEvent();
   unnotified_event_ = NULL;
@@ -344,6 +382,31 @@ Status DevToolsClientImpl::ProcessEvent(const internal::InspectorEvent& event) {
   return Status(kOk);
 }
 
+const DevToolsClientImpl::ListenerList& DevToolsClientImpl::GetEventListeners(
+    const std::string& method) {
+  EventListenerMap::iterator it = event_listeners_.find(method);
+  if (it != event_listeners_.end())
+    return it->second;
+
+  ListenerList& listeners = event_listeners_[method];
+  for (ListenerList::const_iterator listener = listeners_.begin();
+       listener != listeners_.end(); ++listener) {
+    if ((*listener)->ListensToEvent(method))
+      listeners.push_back(*listener);
+  }
+  return listeners;
+}
+
+bool DevToolsClientImpl::ShouldProcessEvent(const std::string& method) {
+  if (IsVLogOn(1) || !GetEventListeners(method).empty())
+    return true;
+  for (size_t i = 0; i < arraysize(kClientEvents); ++i) {
+    if (method == kClientEvents[i])
+      return true;
+  }
+  return false;
+}
+
 Status DevToolsClientImpl::ProcessCommandResponse(
     const internal::InspectorCommandResponse& response) {
   ResponseInfoMap::iterator iter = response_info_map_.find(response.id);
@@ -441,15 +504,17 @@ bool ParseInspectorMessage(
     std::string method;
     if (!message_dict->GetString("method", &method))
       return false;
-    base::DictionaryValue* params = NULL;
-    message_dict->GetDictionary("params", &params);
+    scoped_ptr<base::Value> params;
+    message_dict->Remove("params", &params);
 
     *type = kEventMessageType;
     event->method = method;
-    if (params)
-      event->params.reset(params->DeepCopy());
-    else
+    if (params && params->IsType(base::Value::TYPE_DICTIONARY)) {
+      event->params.reset(
+          static_cast<base::DictionaryValue*>(params.release()));
+    } else {
       event->params.reset(new base::DictionaryValue());
+    }
     return true;
   } else if (message_dict->GetInteger("id", &id)) {
     base::DictionaryValue* unscoped_error = NULL;
@@ -460,13 +525,29 @@ bool ParseInspectorMessage(
 
     *type = kCommandResponseMessageType;
     command_response->id = id;
-    if (unscoped_result)
-      command_response->result.reset(unscoped_result->DeepCopy());
-    else
+    if (unscoped_result) {
+      scoped_ptr<base::Value> result;
+      message_dict->Remove("result", &result);
+      command_response->result.reset(
+          static_cast<base::DictionaryValue*>(result.release()));
+    } else {
       base::JSONWriter::Write(unscoped_error, &command_response->error);
+    }
     return true;
   }
   return false;
 }
 
+bool PeekEventMethod(const std::string& message, std::string* method) {
+  const char kPrefix[] = "{\"method\":\"";
+  if (message.compare(0, arraysize(kPrefix) - 1, kPrefix) != 0)
+    return false;
+  size_t start = arraysize(kPrefix) - 1;
+  size_t end = message.find_first_of("\"\\", start);
+  if (end == std::string::npos || message[end] != '"')
+    return false;
+  method->assign(message, start, end - start);
+  return true;
+}
+
 }  // namespace internal
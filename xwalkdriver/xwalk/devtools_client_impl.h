@@ -84,6 +84,8 @@ class DevToolsClientImpl : public DevToolsClient {
       const std::string& method,
       const base::DictionaryValue& params,
       scoped_ptr<base::DictionaryValue>* result) override;
+  virtual Status EnableDomain(const std::string& domain) override;
+  virtual Status DisableDomain(const std::string& domain) override;
   virtual void AddListener(DevToolsEventListener* listener) override;
   virtual Status HandleEventsUntil(
       const ConditionalFunc& conditional_func,
@@ -111,12 +113,19 @@ class DevToolsClientImpl : public DevToolsClient {
     internal::InspectorCommandResponse response;
   };
   typedef std::map<int, linked_ptr<ResponseInfo> > ResponseInfoMap;
+  typedef std::list<DevToolsEventListener*> ListenerList;
+  typedef std::map<std::string, ListenerList> EventListenerMap;
 
   Status SendCommandInternal(
       const std::string& method,
       const base::DictionaryValue& params,
       scoped_ptr<base::DictionaryValue>* result);
   Status ProcessNextMessage(int expected_id, const base::TimeDelta& timeout);
+  // Returns the listeners of events with |method|, in the order they were
+  // added.
+  const ListenerList& GetEventListeners(const std::string& method);
+  // Returns whether events with |method| need to be parsed and processed.
+  bool ShouldProcessEvent(const std::string& method);
   Status ProcessEvent(const internal::InspectorEvent& event);
   Status ProcessCommandResponse(
       const internal::InspectorCommandResponse& response);
@@ -131,6 +140,11 @@ class DevToolsClientImpl : public DevToolsClient {
   FrontendCloserFunc frontend_closer_func_;
   ParserFunc parser_func_;
   std::list<DevToolsEventListener*> listeners_;
+  // The listeners of each event method received so far.
+  EventListenerMap event_listeners_;
+  // The number of EnableDomain calls not yet matched by DisableDomain for each
+  // domain of the current connection.
+  std::map<std::string, int> domain_enable_counts_;
   std::list<DevToolsEventListener*> unnotified_connect_listeners_;
   std::list<DevToolsEventListener*> unnotified_event_listeners_;
   const internal::InspectorEvent* unnotified_event_;
@@ -152,6 +166,11 @@ bool ParseInspectorMessage(
     InspectorEvent* event,
     InspectorCommandResponse* command_response);
 
+// Gets the method of an event message without parsing it, if the message
+// starts with the method as DevTools sends it. Returns false otherwise, in
+// which case the message may still be an event.
+bool PeekEventMethod(const std::string& message, std::string* method);
+
 }  // namespace internal
 
 #endif  // XWALK_TEST_XWALKDRIVER_XWALK_DEVTOOLS_CLIENT_IMPL_H_
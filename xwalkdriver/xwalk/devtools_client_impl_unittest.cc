@@ -1097,3 +1097,160 @@ TEST_F(DevToolsClientImplTest, ReceivesCommandResponse) {
   ASSERT_EQ("cmd", listener2.msgs_.front());
   ASSERT_EQ("event", listener2.msgs_.back());
 }
+
+namespace {
+
+class SelectiveListener : public DevToolsEventListener {
+ public:
+  explicit SelectiveListener(const std::string& wanted_method)
+      : wanted_method_(wanted_method) {}
+  ~SelectiveListener() override {}
+
+  bool ListensToEvent(const std::string& method) override {
+    return method == wanted_method_;
+  }
+
+  Status OnEvent(DevToolsClient* client,
+                 const std::string& method,
+                 const base::DictionaryValue& params) override {
+    msgs_.push_back(method);
+    return Status(kOk);
+  }
+
+  std::list<std::string> msgs_;
+
+ private:
+  std::string wanted_method_;
+};
+
+bool FailToParse(
+    const std::string& message,
+    int expected_id,
+    internal::InspectorMessageType* type,
+    internal::InspectorEvent* event,
+    internal::InspectorCommandResponse* command_response) {
+  ADD_FAILURE() << "unexpected parse of " << message;
+  return false;
+}
+
+}  // namespace
+
+TEST_F(DevToolsClientImplTest, DispatchesEventsToListenersOfTheirMethod) {
+  std::list<std::string> msgs;
+  SyncWebSocketFactory factory = base::Bind(&CreateMockSyncWebSocket6, &msgs);
+  DevToolsClientImpl client(
+      factory, "http://url", "id", base::Bind(&CloserFunc));
+  SelectiveListener listener1("Page.frameNavigated");
+  SelectiveListener listener2("DOM.documentUpdated");
+  client.AddListener(&listener1);
+  client.AddListener(&listener2);
+  msgs.push_back("{\"method\":\"Page.frameNavigated\",\"params\":{}}");
+  msgs.push_back("{\"method\":\"DOM.documentUpdated\",\"params\":{}}");
+  msgs.push_back("{\"method\":\"Page.frameNavigated\",\"params\":{}}");
+  ASSERT_EQ(kOk, client.HandleReceivedEvents().code());
+  ASSERT_EQ(2u, listener1.msgs_.size());
+  ASSERT_EQ("Page.frameNavigated", listener1.msgs_.front());
+  ASSERT_EQ("Page.frameNavigated", listener1.msgs_.back());
+  ASSERT_EQ(1u, listener2.msgs_.size());
+  ASSERT_EQ("DOM.documentUpdated", listener2.msgs_.front());
+}
+
+TEST_F(DevToolsClientImplTest, SkipsEventsNoListenerListensTo) {
+  std::list<std::string> msgs;
+  SyncWebSocketFactory factory = base::Bind(&CreateMockSyncWebSocket6, &msgs);
+  DevToolsClientImpl client(factory, "http://url", "id",
+                            base::Bind(&CloserFunc),
+                            base::Bind(&FailToParse));
+  SelectiveListener listener("Page.frameNavigated");
+  client.AddListener(&listener);
+  msgs.push_back("{\"method\":\"Network.dataReceived\",\"params\":{}}");
+  msgs.push_back("{\"method\":\"Timeline.eventRecorded\",\"params\":{}}");
+  ASSERT_EQ(kOk, client.HandleReceivedEvents().code());
+  ASSERT_TRUE(listener.msgs_.empty());
+}
+
+namespace {
+
+class RecordingSyncWebSocket : public SyncWebSocket {
+ public:
+  explicit RecordingSyncWebSocket(std::list<std::string>* sent_methods)
+      : sent_methods_(sent_methods) {}
+  ~RecordingSyncWebSocket() override {}
+
+  bool IsConnected() override { return true; }
+
+  bool Connect(const GURL& url) override { return true; }
+
+  bool Send(const std::string& message) override {
+    scoped_ptr<base::Value> value(base::JSONReader::Read(message));
+    base::DictionaryValue* dict = NULL;
+    EXPECT_TRUE(value->GetAsDictionary(&dict));
+    if (!dict)
+      return false;
+    int id;
+    EXPECT_TRUE(dict->GetInteger("id", &id));
+    std::string method;
+    EXPECT_TRUE(dict->GetString("method", &method));
+    sent_methods_->push_back(method);
+    queued_response_.push_back(
+        base::StringPrintf("{\"id\": %d, \"result\": {}}", id));
+    return true;
+  }
+
+  SyncWebSocket::StatusCode ReceiveNextMessage(
+      std::string* message,
+      const base::TimeDelta& timeout) override {
+    if (queued_response_.empty())
+      return SyncWebSocket::kDisconnected;
+    *message = queued_response_.front();
+    queued_response_.pop_front();
+    return SyncWebSocket::kOk;
+  }
+
+  bool HasNextMessage() override { return !queued_response_.empty(); }
+
+ private:
+  std::list<std::string>* sent_methods_;
+  std::list<std::string> queued_response_;
+};
+
+scoped_ptr<SyncWebSocket> CreateRecordingSyncWebSocket(
+    std::list<std::string>* sent_methods) {
+  return make_scoped_ptr(new RecordingSyncWebSocket(sent_methods));
+}
+
+}  // namespace
+
+TEST_F(DevToolsClientImplTest, EnablesDomainOnceForAllCallers) {
+  std::list<std::string> sent_methods;
+  SyncWebSocketFactory factory =
+      base::Bind(&CreateRecordingSyncWebSocket, &sent_methods);
+  DevToolsClientImpl client(
+      factory, "http://url", "id", base::Bind(&CloserFunc));
+  ASSERT_EQ(kOk, client.ConnectIfNecessary().code());
+  ASSERT_EQ(kOk, client.EnableDomain("Page").code());
+  ASSERT_EQ(kOk, client.EnableDomain("Page").code());
+  ASSERT_EQ(1u, sent_methods.size());
+  ASSERT_EQ("Page.enable", sent_methods.back());
+  ASSERT_EQ(kOk, client.DisableDomain("Page").code());
+  ASSERT_EQ(1u, sent_methods.size());
+  ASSERT_EQ(kOk, client.DisableDomain("Page").code());
+  ASSERT_EQ(2u, sent_methods.size());
+  ASSERT_EQ("Page.disable", sent_methods.back());
+  ASSERT_EQ(kOk, client.DisableDomain("Page").code());
+  ASSERT_EQ(2u, sent_methods.size());
+}
+
+TEST(PeekEventMethod, Event) {
+  std::string method;
+  ASSERT_TRUE(internal::PeekEventMethod(
+      "{\"method\":\"Page.frameNavigated\",\"params\":{}}", &method));
+  ASSERT_EQ("Page.frameNavigated", method);
+}
+
+TEST(PeekEventMethod, NotAnEvent) {
+  std::string method;
+  ASSERT_FALSE(internal::PeekEventMethod("{\"id\":1,\"result\":{}}", &method));
+  ASSERT_FALSE(internal::PeekEventMethod("{\"method\":\"Pa", &method));
+  ASSERT_FALSE(internal::PeekEventMethod("{\"method\":\"a\\\"b\"}", &method));
+}
@@ -12,6 +12,10 @@ Status DevToolsEventListener::OnConnected(DevToolsClient* client) {
   return Status(kOk);
 }
 
+bool DevToolsEventListener::ListensToEvent(const std::string& method) {
+  return true;
+}
+
 Status DevToolsEventListener::OnEvent(DevToolsClient* client,
                                       const std::string& method,
                                       const base::DictionaryValue& params) {
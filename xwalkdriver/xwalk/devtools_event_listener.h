@@ -23,6 +23,11 @@ class DevToolsEventListener {
   // Called when a connection is made to the DevTools server.
   virtual Status OnConnected(DevToolsClient* client);
 
+  // Returns whether OnEvent should be called for events with |method|. The
+  // answer is cached for each method, so it must not change over time. By
+  // default, a listener receives all events.
+  virtual bool ListensToEvent(const std::string& method);
+
   // Called when an event is received.
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
@@ -33,6 +33,12 @@ Status DomTracker::OnConnected(DevToolsClient* client) {
   return client->SendCommand("DOM.getDocument", params);
 }
 
+bool DomTracker::ListensToEvent(const std::string& method) {
+  return method == "DOM.setChildNodes" ||
+         method == "DOM.childNodeInserted" ||
+         method == "DOM.documentUpdated";
+}
+
 Status DomTracker::OnEvent(DevToolsClient* client,
                            const std::string& method,
                            const base::DictionaryValue& params) {
@@ -30,11 +30,15 @@ Status FrameTracker::GetContextIdForFrame(
 Status FrameTracker::OnConnected(DevToolsClient* client) {
   frame_to_context_map_.clear();
   // Enable runtime events to allow tracking execution context creation.
-  base::DictionaryValue params;
-  Status status = client->SendCommand("Runtime.enable", params);
+  Status status = client->EnableDomain("Runtime");
   if (status.IsError())
     return status;
-  return client->SendCommand("Page.enable", params);
+  return client->EnableDomain("Page");
+}
+
+bool FrameTracker::ListensToEvent(const std::string& method) {
+  return method == "Runtime.executionContextCreated" ||
+         method == "Page.frameNavigated";
 }
 
 Status FrameTracker::OnEvent(DevToolsClient* client,
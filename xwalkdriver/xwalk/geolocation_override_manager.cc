@@ -27,6 +27,10 @@ Status GeolocationOverrideManager::OnConnected(DevToolsClient* client) {
   return ApplyOverrideIfNeeded();
 }
 
+bool GeolocationOverrideManager::ListensToEvent(const std::string& method) {
+  return method == "Page.frameNavigated";
+}
+
 Status GeolocationOverrideManager::OnEvent(
     DevToolsClient* client,
     const std::string& method,
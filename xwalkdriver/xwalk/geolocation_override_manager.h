@@ -31,6 +31,7 @@ class GeolocationOverrideManager : public DevToolsEventListener {
 
   // Overridden from DevToolsEventListener:
   virtual Status OnConnected(DevToolsClient* client) override;
+  virtual bool ListensToEvent(const std::string& method) override;
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
                          const base::DictionaryValue& params) override;
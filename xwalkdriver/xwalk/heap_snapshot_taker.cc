@@ -4,12 +4,68 @@
 
 #include "xwalk/test/xwalkdriver/xwalk/heap_snapshot_taker.h"
 
+#include <stdio.h>
+
+#include "base/files/file_path.h"
+#include "base/files/file_util.h"
 #include "base/json/json_reader.h"
 #include "base/logging.h"
 #include "base/values.h"
+#include "third_party/zlib/zlib.h"
 #include "xwalk/test/xwalkdriver/xwalk/devtools_client.h"
 #include "xwalk/test/xwalkdriver/xwalk/status.h"
 
+// Writes the chunks of a snapshot to a file, optionally gzip-compressed.
+class HeapSnapshotTaker::ChunkWriter {
+ public:
+  ChunkWriter() : file_(NULL), gz_file_(NULL), size_(0) {}
+  ~ChunkWriter() { Close(); }
+
+  bool Open(const base::FilePath& path, bool compress) {
+    if (compress) {
+      gz_file_ = gzopen(path.AsUTF8Unsafe().c_str(), "wb");
+      return gz_file_ != NULL;
+    }
+    file_ = base::OpenFile(path, "wb");
+    return file_ != NULL;
+  }
+
+  bool Write(const std::string& chunk) {
+    size_ += chunk.length();
+    if (chunk.empty())
+      return true;
+    if (gz_file_) {
+      return gzwrite(gz_file_, chunk.data(),
+                     static_cast<unsigned>(chunk.length())) > 0;
+    }
+    return fwrite(chunk.data(), 1, chunk.length(), file_) == chunk.length();
+  }
+
+  // Returns false if the file could not be completely written.
+  bool Close() {
+    bool ok = true;
+    if (gz_file_) {
+      ok = gzclose(gz_file_) == Z_OK;
+      gz_file_ = NULL;
+    }
+    if (file_) {
+      ok = base::CloseFile(file_);
+      file_ = NULL;
+    }
+    return ok;
+  }
+
+  // Returns the uncompressed number of bytes written.
+  int64 size() const { return size_; }
+
+ private:
+  FILE* file_;
+  gzFile gz_file_;
+  int64 size_;
+
+  DISALLOW_COPY_AND_ASSIGN(ChunkWriter);
+};
+
 HeapSnapshotTaker::HeapSnapshotTaker(DevToolsClient* client)
     : client_(client), snapshot_uid_(-1) {
   client_->AddListener(this);
@@ -18,41 +74,64 @@ HeapSnapshotTaker::HeapSnapshotTaker(DevToolsClient* client)
 HeapSnapshotTaker::~HeapSnapshotTaker() {}
 
 Status HeapSnapshotTaker::TakeSnapshot(scoped_ptr<base::Value>* snapshot) {
+  Status status = TakeAndReleaseSnapshot();
+  if (status.IsOk()) {
+    scoped_ptr<base::Value> value(base::JSONReader::Read(snapshot_));
+    if (!value)
+      status = Status(kUnknownError, "heap snapshot not in JSON format");
+    else
+      *snapshot = value.Pass();
+  }
+  snapshot_.clear();
+  return status;
+}
+
+Status HeapSnapshotTaker::TakeSnapshotToFile(const base::FilePath& path,
+                                             bool compress,
+                                             int64* snapshot_size) {
+  chunk_writer_.reset(new ChunkWriter());
+  if (!chunk_writer_->Open(path, compress)) {
+    chunk_writer_.reset();
+    return Status(kUnknownError, "unable to create heap snapshot file");
+  }
+
+  Status status = TakeAndReleaseSnapshot();
+  if (!chunk_writer_->Close() && status.IsOk())
+    status = Status(kUnknownError, "unable to write heap snapshot file");
+  *snapshot_size = chunk_writer_->size();
+  chunk_writer_.reset();
+  if (status.IsError())
+    base::DeleteFile(path, false);
+  return status;
+}
+
+Status HeapSnapshotTaker::TakeAndReleaseSnapshot() {
   Status status1 = TakeSnapshotInternal();
   base::DictionaryValue params;
-  Status status2 = client_->SendCommand("Debugger.disable", params);
+  Status status2 = client_->DisableDomain("Debugger");
   Status status3(kOk);
   if (snapshot_uid_ != -1) {  // Clear the snapshot cached in xwalk.
     status3 = client_->SendCommand("HeapProfiler.clearProfiles", params);
   }
-
-  Status status4(kOk);
-  if (status1.IsOk() && status2.IsOk() && status3.IsOk()) {
-    scoped_ptr<base::Value> value(base::JSONReader::Read(snapshot_));
-    if (!value)
-      status4 = Status(kUnknownError, "heap snapshot not in JSON format");
-    else
-      *snapshot = value.Pass();
-  }
   snapshot_uid_ = -1;
-  snapshot_.clear();
   if (status1.IsError())
     return status1;
   else if (status2.IsError())
     return status2;
-  else if (status3.IsError())
-    return status3;
   else
-    return status4;
+    return status3;
 }
 
 Status HeapSnapshotTaker::TakeSnapshotInternal() {
   if (snapshot_uid_ != -1)
     return Status(kUnknownError, "unexpected heap snapshot was triggered");
 
+  Status status = client_->EnableDomain("Debugger");
+  if (status.IsError())
+    return status;
+
   base::DictionaryValue params;
   const char* kMethods[] = {
-      "Debugger.enable",
       "HeapProfiler.collectGarbage",
       "HeapProfiler.takeHeapSnapshot"
   };
@@ -67,7 +146,7 @@ Status HeapSnapshotTaker::TakeSnapshotInternal() {
 
   base::DictionaryValue uid_params;
   uid_params.SetInteger("uid", snapshot_uid_);
-  Status status = client_->SendCommand(
+  status = client_->SendCommand(
       "HeapProfiler.getHeapSnapshot", uid_params);
   if (status.IsError())
     return status;
@@ -75,6 +154,11 @@ Status HeapSnapshotTaker::TakeSnapshotInternal() {
   return Status(kOk);
 }
 
+bool HeapSnapshotTaker::ListensToEvent(const std::string& method) {
+  return method == "HeapProfiler.addProfileHeader" ||
+         method == "HeapProfiler.addHeapSnapshotChunk";
+}
+
 Status HeapSnapshotTaker::OnEvent(DevToolsClient* client,
                                   const std::string& method,
                                   const base::DictionaryValue& params) {
@@ -97,7 +181,11 @@ Status HeapSnapshotTaker::OnEvent(DevToolsClient* client,
                       "HeapProfiler.addHeapSnapshotChunk has no 'chunk'");
       }
 
-      snapshot_.append(chunk);
+      if (!chunk_writer_) {
+        snapshot_.append(chunk);
+      } else if (!chunk_writer_->Write(chunk)) {
+        return Status(kUnknownError, "unable to write heap snapshot chunk");
+      }
     } else {
       LOG(WARNING) << "expect chunk event uid " << snapshot_uid_
                    << ", but got " << uid;
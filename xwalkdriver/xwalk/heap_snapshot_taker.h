@@ -14,6 +14,7 @@
 
 namespace base {
 class DictionaryValue;
+class FilePath;
 class Value;
 }
 
@@ -28,17 +29,32 @@ class HeapSnapshotTaker: public DevToolsEventListener {
 
   Status TakeSnapshot(scoped_ptr<base::Value>* snapshot);
 
+  // Takes the heap snapshot and writes it to |path| chunk by chunk as it is
+  // received, gzip-compressed if |compress| is true, so that it is never held
+  // in memory. Sets |snapshot_size| to the uncompressed size of the snapshot.
+  Status TakeSnapshotToFile(const base::FilePath& path,
+                            bool compress,
+                            int64* snapshot_size);
+
   // Overridden from DevToolsEventListener:
+  virtual bool ListensToEvent(const std::string& method) override;
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
                          const base::DictionaryValue& params) override;
 
  private:
+  class ChunkWriter;
+
+  // Takes the snapshot, then frees it in Xwalk.
+  Status TakeAndReleaseSnapshot();
   Status TakeSnapshotInternal();
 
   DevToolsClient* client_;
   int snapshot_uid_;
   std::string snapshot_;
+  // Receives the chunks instead of |snapshot_| while taking a snapshot to a
+  // file.
+  scoped_ptr<ChunkWriter> chunk_writer_;
 
   DISALLOW_COPY_AND_ASSIGN(HeapSnapshotTaker);
 };
@@ -5,9 +5,13 @@
 #include <list>
 #include <string>
 
+#include "base/files/file_path.h"
+#include "base/files/file_util.h"
+#include "base/files/scoped_temp_dir.h"
 #include "base/memory/scoped_ptr.h"
 #include "base/values.h"
 #include "testing/gtest/include/gtest/gtest.h"
+#include "third_party/zlib/zlib.h"
 #include "xwalk/test/xwalkdriver/xwalk/heap_snapshot_taker.h"
 #include "xwalk/test/xwalkdriver/xwalk/status.h"
 #include "xwalk/test/xwalkdriver/xwalk/stub_devtools_client.h"
@@ -221,3 +225,55 @@ TEST(HeapSnapshotTaker, ErrorAfterFinishEvent) {
   ASSERT_TRUE(client.IsCleared());
   ASSERT_TRUE(client.IsDisabled());
 }
+
+TEST(HeapSnapshotTaker, TakeSnapshotToFile) {
+  base::ScopedTempDir temp_dir;
+  ASSERT_TRUE(temp_dir.CreateUniqueTempDir());
+  base::FilePath path = temp_dir.path().AppendASCII("snapshot");
+  DummyDevToolsClient client("", false);
+  HeapSnapshotTaker taker(&client);
+  int64 snapshot_size = 0;
+  Status status = taker.TakeSnapshotToFile(path, false, &snapshot_size);
+  ASSERT_EQ(kOk, status.code());
+  std::string expected = std::string(chunks[0]) + chunks[1];
+  ASSERT_EQ(static_cast<int64>(expected.length()), snapshot_size);
+  std::string contents;
+  ASSERT_TRUE(base::ReadFileToString(path, &contents));
+  ASSERT_EQ(expected, contents);
+  ASSERT_TRUE(client.IsCleared());
+  ASSERT_TRUE(client.IsDisabled());
+}
+
+TEST(HeapSnapshotTaker, TakeCompressedSnapshotToFile) {
+  base::ScopedTempDir temp_dir;
+  ASSERT_TRUE(temp_dir.CreateUniqueTempDir());
+  base::FilePath path = temp_dir.path().AppendASCII("snapshot.gz");
+  DummyDevToolsClient client("", false);
+  HeapSnapshotTaker taker(&client);
+  int64 snapshot_size = 0;
+  Status status = taker.TakeSnapshotToFile(path, true, &snapshot_size);
+  ASSERT_EQ(kOk, status.code());
+
+  gzFile gz_file = gzopen(path.AsUTF8Unsafe().c_str(), "rb");
+  ASSERT_TRUE(gz_file);
+  char buffer[64];
+  int length = gzread(gz_file, buffer, sizeof(buffer));
+  gzclose(gz_file);
+  std::string expected = std::string(chunks[0]) + chunks[1];
+  ASSERT_EQ(expected, std::string(buffer, length));
+  ASSERT_EQ(static_cast<int64>(expected.length()), snapshot_size);
+}
+
+TEST(HeapSnapshotTaker, TakeSnapshotToFileDeletesFileOnError) {
+  base::ScopedTempDir temp_dir;
+  ASSERT_TRUE(temp_dir.CreateUniqueTempDir());
+  base::FilePath path = temp_dir.path().AppendASCII("snapshot");
+  DummyDevToolsClient client("HeapProfiler.getHeapSnapshot", true);
+  HeapSnapshotTaker taker(&client);
+  int64 snapshot_size = 0;
+  Status status = taker.TakeSnapshotToFile(path, false, &snapshot_size);
+  ASSERT_TRUE(status.IsError());
+  ASSERT_FALSE(base::PathExists(path));
+  ASSERT_TRUE(client.IsCleared());
+  ASSERT_TRUE(client.IsDisabled());
+}
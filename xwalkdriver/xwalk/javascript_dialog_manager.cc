@@ -50,8 +50,12 @@ Status JavaScriptDialogManager::HandleDialog(bool accept,
 
 Status JavaScriptDialogManager::OnConnected(DevToolsClient* client) {
   unhandled_dialog_queue_.clear();
-  base::DictionaryValue params;
-  return client_->SendCommand("Page.enable", params);
+  return client_->EnableDomain("Page");
+}
+
+bool JavaScriptDialogManager::ListensToEvent(const std::string& method) {
+  return method == "Page.javascriptDialogOpening" ||
+         method == "Page.javascriptDialogClosing";
 }
 
 Status JavaScriptDialogManager::OnEvent(DevToolsClient* client,
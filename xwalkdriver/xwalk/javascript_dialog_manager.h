@@ -33,6 +33,7 @@ class JavaScriptDialogManager : public DevToolsEventListener {
 
   // Overridden from DevToolsEventListener:
   virtual Status OnConnected(DevToolsClient* client) override;
+  virtual bool ListensToEvent(const std::string& method) override;
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
                          const base::DictionaryValue& params) override;
@@ -73,8 +73,16 @@ Status NavigationTracker::OnConnected(DevToolsClient* client) {
   scheduled_frame_set_.clear();
 
   // Enable page domain notifications to allow tracking navigation state.
-  base::DictionaryValue empty_params;
-  return client_->SendCommand("Page.enable", empty_params);
+  return client_->EnableDomain("Page");
+}
+
+bool NavigationTracker::ListensToEvent(const std::string& method) {
+  return method == "Page.frameStartedLoading" ||
+         method == "Page.frameStoppedLoading" ||
+         method == "Page.frameScheduledNavigation" ||
+         method == "Page.frameClearedScheduledNavigation" ||
+         method == "Page.frameNavigated" ||
+         method == "Inspector.targetCrashed";
 }
 
 Status NavigationTracker::OnEvent(DevToolsClient* client,
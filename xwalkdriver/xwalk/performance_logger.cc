@@ -16,9 +16,9 @@ namespace {
 // DevTools event domain prefixes to intercept.
 const char* const kDomains[] = {"Network.", "Page.", "Timeline."};
 
-const char* const kDomainEnableCommands[] = {
-    "Network.enable", "Page.enable", "Timeline.start"
-};
+// DevTools domains to enable. Timeline events are started separately, since
+// the domain has no enable command.
+const char* const kDomainsToEnable[] = {"Network", "Page"};
 
 // Returns whether the event belongs to one of kDomains.
 bool ShouldLogEvent(const std::string& method) {
@@ -35,13 +35,17 @@ PerformanceLogger::PerformanceLogger(Log* log)
     : log_(log) {}
 
 Status PerformanceLogger::OnConnected(DevToolsClient* client) {
-  base::DictionaryValue params;  // All our enable commands have empty params.
-  for (size_t i_cmd = 0; i_cmd < arraysize(kDomainEnableCommands); ++i_cmd) {
-    Status status = client->SendCommand(kDomainEnableCommands[i_cmd], params);
+  for (size_t i = 0; i < arraysize(kDomainsToEnable); ++i) {
+    Status status = client->EnableDomain(kDomainsToEnable[i]);
     if (status.IsError())
       return status;
   }
-  return Status(kOk);
+  base::DictionaryValue params;
+  return client->SendCommand("Timeline.start", params);
+}
+
+bool PerformanceLogger::ListensToEvent(const std::string& method) {
+  return ShouldLogEvent(method);
 }
 
 Status PerformanceLogger::OnEvent(
@@ -28,6 +28,8 @@ class PerformanceLogger : public DevToolsEventListener {
 
   // Enables Page,Network,Timeline events for client, which must not be null.
   virtual Status OnConnected(DevToolsClient* client) override;
+  // Listens to the events it logs.
+  virtual bool ListensToEvent(const std::string& method) override;
   // Translates an event into a log entry.
   virtual Status OnEvent(DevToolsClient* client,
                          const std::string& method,
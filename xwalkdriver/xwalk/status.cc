@@ -59,6 +59,8 @@ const char* DefaultMessageForStatusCode(StatusCode code) {
       return "forbidden";
     case kTabCrashed:
       return "tab crashed";
+    case kServerBusy:
+      return "server busy";
     default:
       return "<unknown>";
   }
@@ -34,6 +34,7 @@ enum StatusCode {
   kDisconnected,
   kForbidden = 103,
   kTabCrashed,
+  kServerBusy,
 };
 
 // Represents a WebDriver status, which may be an error or ok.
@@ -39,6 +39,16 @@ Status StubDevToolsClient::SendCommandAndGetResult(
   return Status(kOk);
 }
 
+Status StubDevToolsClient::EnableDomain(const std::string& domain) {
+  base::DictionaryValue params;
+  return SendCommand(domain + ".enable", params);
+}
+
+Status StubDevToolsClient::DisableDomain(const std::string& domain) {
+  base::DictionaryValue params;
+  return SendCommand(domain + ".disable", params);
+}
+
 void StubDevToolsClient::AddListener(DevToolsEventListener* listener) {
   listeners_.push_back(listener);
 }
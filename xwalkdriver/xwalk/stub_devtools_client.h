@@ -34,6 +34,9 @@ class StubDevToolsClient : public DevToolsClient {
       const std::string& method,
       const base::DictionaryValue& params,
       scoped_ptr<base::DictionaryValue>* result) override;
+  // Sends "<domain>.enable" and "<domain>.disable" on every call.
+  virtual Status EnableDomain(const std::string& domain) override;
+  virtual Status DisableDomain(const std::string& domain) override;
   virtual void AddListener(DevToolsEventListener* listener) override;
   virtual Status HandleEventsUntil(const ConditionalFunc& conditional_func,
                                    const base::TimeDelta& timeout) override;
@@ -94,6 +94,10 @@ Status StubWebView::DeleteCookie(const std::string& name,
   return Status(kOk);
 }
 
+Status StubWebView::DeleteAllBrowserCookies() {
+  return Status(kOk);
+}
+
 Status StubWebView::WaitForPendingNavigations(const std::string& frame_id,
                                               const base::TimeDelta& timeout,
                                               bool stop_load_on_timeout) {
@@ -127,3 +131,9 @@ Status StubWebView::SetFileInputFiles(
 Status StubWebView::TakeHeapSnapshot(scoped_ptr<base::Value>* snapshot) {
   return Status(kOk);
 }
+
+Status StubWebView::TakeHeapSnapshotToFile(const base::FilePath& path,
+                                           bool compress,
+                                           int64* snapshot_size) {
+  return Status(kOk);
+}
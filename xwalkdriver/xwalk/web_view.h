@@ -9,6 +9,7 @@
 #include <string>
 #include <vector>
 
+#include "base/basictypes.h"
 #include "base/memory/scoped_ptr.h"
 
 namespace base {
@@ -115,6 +116,10 @@ class WebView {
   virtual Status DeleteCookie(const std::string& name,
                               const std::string& url) = 0;
 
+  // Delete the cookies of every site, not only those visible to the current
+  // page.
+  virtual Status DeleteAllBrowserCookies() = 0;
+
   // Waits until all pending navigations have completed in the given frame.
   // If |frame_id| is "", waits for navigations on the main frame.
   // If a modal dialog appears while waiting, kUnexpectedAlertOpen will be
@@ -151,6 +156,13 @@ class WebView {
   //  1. A meta data element "snapshot" about how to parse data elements.
   //  2. Data elements: "nodes", "edges", "strings".
   virtual Status TakeHeapSnapshot(scoped_ptr<base::Value>* snapshot) = 0;
+
+  // Take a heap snapshot and write it to |path| as it is received, without
+  // holding it in memory. The file is gzip-compressed if |compress| is true.
+  // |snapshot_size| is set to the uncompressed size of the snapshot.
+  virtual Status TakeHeapSnapshotToFile(const base::FilePath& path,
+                                        bool compress,
+                                        int64* snapshot_size) = 0;
 };
 
 #endif  // XWALK_TEST_XWALKDRIVER_XWALK_WEB_VIEW_H_
@@ -326,6 +326,11 @@ Status WebViewImpl::DeleteCookie(const std::string& name,
   return client_->SendCommand("Page.deleteCookie", params);
 }
 
+Status WebViewImpl::DeleteAllBrowserCookies() {
+  base::DictionaryValue params;
+  return client_->SendCommand("Network.clearBrowserCookies", params);
+}
+
 Status WebViewImpl::WaitForPendingNavigations(const std::string& frame_id,
                                               const base::TimeDelta& timeout,
                                               bool stop_load_on_timeout) {
@@ -418,6 +423,13 @@ Status WebViewImpl::TakeHeapSnapshot(scoped_ptr<base::Value>* snapshot) {
   return heap_snapshot_taker_->TakeSnapshot(snapshot);
 }
 
+Status WebViewImpl::TakeHeapSnapshotToFile(const base::FilePath& path,
+                                           bool compress,
+                                           int64* snapshot_size) {
+  return heap_snapshot_taker_->TakeSnapshotToFile(
+      path, compress, snapshot_size);
+}
+
 Status WebViewImpl::CallAsyncFunctionInternal(const std::string& frame,
                                               const std::string& function,
                                               const base::ListValue& args,
@@ -74,6 +74,7 @@ class WebViewImpl : public WebView {
   virtual Status GetCookies(scoped_ptr<base::ListValue>* cookies) override;
   virtual Status DeleteCookie(const std::string& name,
                               const std::string& url) override;
+  virtual Status DeleteAllBrowserCookies() override;
   virtual Status WaitForPendingNavigations(const std::string& frame_id,
                                            const base::TimeDelta& timeout,
                                            bool stop_load_on_timeout) override;
@@ -87,6 +88,9 @@ class WebViewImpl : public WebView {
       const base::DictionaryValue& element,
       const std::vector<base::FilePath>& files) override;  // NOLINT
   virtual Status TakeHeapSnapshot(scoped_ptr<base::Value>* snapshot) override;
+  virtual Status TakeHeapSnapshotToFile(const base::FilePath& path,
+                                        bool compress,
+                                        int64* snapshot_size) override;
 
  private:
   Status CallAsyncFunctionInternal(const std::string& frame,
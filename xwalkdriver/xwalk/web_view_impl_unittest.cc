@@ -51,6 +51,12 @@ class FakeDevToolsClient : public DevToolsClient {
     result->reset(result_.DeepCopy());
     return Status(kOk);
   }
+  virtual Status EnableDomain(const std::string& domain) override {
+    return Status(kOk);
+  }
+  virtual Status DisableDomain(const std::string& domain) override {
+    return Status(kOk);
+  }
   virtual void AddListener(DevToolsEventListener* listener) override {}
   virtual Status HandleEventsUntil(
       const ConditionalFunc& conditional_func,